@@ -0,0 +1,251 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import engines
+
+logging.basicConfig(
+    format="{asctime} | {levelname} | {message}",
+    style="{",
+    datefmt="%Y-%m-%d %H:%M",
+    level=logging.INFO
+)
+
+# Runs every query on every installed engine at each data scale, one child
+# process per run so peak memory is that run's alone, and writes the
+# measurements as JSON:
+#
+#   python compare_engines.py --rows 1000000 10000000 --repeat 3
+#
+# wall_seconds and cpu_seconds cover the query only (the Spark session is
+# started first); cpu_utilization is cpu_seconds / wall_seconds / cores.
+# Peak RSS includes memory-mapped input pages, so peak_anon_bytes (heap,
+# sampled every 50 ms) is reported alongside it. Spark's JVM is a child of
+# the run; its CPU and memory are added in.
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+RESULTS_PATH = BASE_DIR / "results" / "engines.json"
+
+BASE = 1672531200  # 2023-01-01 00:00:00 UTC
+CHUNK_ROWS = 1_000_000
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def generate_csv(path, rows, days=365):
+    # A year of Divvy-layout trips with every column filled in.
+    import polars as pl
+
+    with open(path, "wb") as f:
+        for offset in range(0, rows, CHUNK_ROWS):
+            ids = pl.int_range(offset, min(offset + CHUNK_ROWS, rows))
+            started = pl.from_epoch(BASE + (ids * 7919) % (days * 86400), time_unit="s")
+            pl.select(
+                ids.hash(0).cast(pl.String).alias("ride_id"),
+                pl.when(ids % 2 == 0).then(pl.lit("electric_bike")).otherwise(pl.lit("classic_bike")).alias(
+                    "rideable_type"
+                ),
+                started.dt.strftime(engines.TIMESTAMP_FORMAT).alias("started_at"),
+                (started + pl.duration(seconds=60 + ids % 3600)).dt.strftime(engines.TIMESTAMP_FORMAT).alias(
+                    "ended_at"
+                ),
+                (pl.lit("Station ") + (ids % 600).cast(pl.String)).alias("start_station_name"),
+                (ids % 600).cast(pl.String).alias("start_station_id"),
+                (pl.lit("Station ") + (ids % 601).cast(pl.String)).alias("end_station_name"),
+                (ids % 601).cast(pl.String).alias("end_station_id"),
+                (41.6 + (ids % 500) / 1000).alias("start_lat"),
+                (-87.9 + (ids % 400) / 1000).alias("start_lng"),
+                (41.6 + (ids % 499) / 1000).alias("end_lat"),
+                (-87.9 + (ids % 399) / 1000).alias("end_lng"),
+                pl.when(ids % 3 == 0).then(pl.lit("casual")).otherwise(pl.lit("member")).alias("member_casual"),
+            ).write_csv(f, include_header=offset == 0)
+
+
+def dataset(data_dir, rows):
+    path = Path(data_dir) / f"divvy_{rows}.csv"
+    if not path.exists():
+        logging.info(f"Generating {rows} trips in {path}...")
+        data_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        generate_csv(tmp_path, rows)
+        os.replace(tmp_path, path)
+    return path
+
+
+def fingerprint(rows):
+    # Engines differ in float formatting and numeric types; compare values.
+    normalised = [[str(v) if not isinstance(v, float) else round(v, 6) for v in row] for row in rows]
+    return hashlib.sha256(json.dumps(normalised).encode()).hexdigest()[:16]
+
+
+def proc_status(pid, field):
+    # In bytes, from /proc/<pid>/status (kB there).
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def proc_cpu(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        # Fields after the parenthesised command name; utime and stime are
+        # the 14th and 15th of the full line.
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def self_cpu():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_child(engine, query, path):
+    _, setup, queries = engines.ENGINES[engine]
+    if setup is not None:
+        setup()
+
+    pids = ["self"]
+    jvm = engines.jvm_pid() if engine == "spark" else None
+    if jvm is not None:
+        pids.append(jvm)
+
+    peak_anon = [0]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.05):
+            peak_anon[0] = max(peak_anon[0], sum(proc_status(pid, "RssAnon") for pid in pids))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    cpu_start = self_cpu() + (proc_cpu(jvm) if jvm else 0)
+    start = time.perf_counter()
+    rows = queries[query](str(path))
+    wall = time.perf_counter() - start
+    cpu = self_cpu() + (proc_cpu(jvm) if jvm else 0) - cpu_start
+
+    done.set()
+    sampler.join()
+
+    print(json.dumps({
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "cpu_utilization": cpu / wall / os.cpu_count() if wall else 0.0,
+        "peak_rss_bytes": sum(proc_status(pid, "VmHWM") for pid in pids),
+        "peak_anon_bytes": max(peak_anon[0], sum(proc_status(pid, "RssAnon") for pid in pids)),
+        "result_rows": len(rows),
+        "fingerprint": fingerprint(rows),
+    }))
+
+
+def measure(engine, query, path, timeout):
+    start = time.perf_counter()
+    try:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", engine, query, str(path)],
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            timeout=timeout,
+        ).stdout
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        logging.error(f"{engine} {query} on {path.name} failed: {e}")
+        return {"error": str(e)}
+
+    result = json.loads(out.strip().splitlines()[-1])
+    result["process_seconds"] = time.perf_counter() - start
+    return result
+
+
+def machine():
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "memory_bytes": os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES"),
+    }
+
+
+def run(rows_list, engine_names, queries, repeat=1, data_dir=DATA_DIR, timeout=3600):
+    runs = []
+    for rows in rows_list:
+        path = dataset(Path(data_dir), rows)
+        expected = {}
+
+        for engine in engine_names:
+            for query in queries:
+                for attempt in range(repeat):
+                    result = measure(engine, query, path, timeout)
+                    result.update({
+                        "engine": engine,
+                        "query": query,
+                        "rows": rows,
+                        "file_bytes": path.stat().st_size,
+                        "repeat": attempt,
+                    })
+
+                    if "fingerprint" in result:
+                        # The first engine to answer sets the expected result.
+                        result["matches"] = expected.setdefault(query, result["fingerprint"]) == result["fingerprint"]
+                        if not result["matches"]:
+                            logging.warning(f"{engine} {query} at {rows} rows disagrees with {engine_names[0]}.")
+                        logging.info(
+                            f"{engine:>7} {query:<16} {rows:>11,} rows: {result['wall_seconds']:8.2f}s  "
+                            f"peak RSS {result['peak_rss_bytes'] / 2 ** 20:7.0f} MiB  "
+                            f"cpu {result['cpu_utilization']:6.1%}"
+                        )
+                    runs.append(result)
+
+    return runs
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare pandas, Polars, DuckDB and Spark on the Divvy queries.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000],
+                        help="synthetic data scales, in trips")
+    parser.add_argument("--engines", nargs="+", choices=list(engines.ENGINES), default=list(engines.ENGINES))
+    parser.add_argument("--queries", nargs="+", choices=engines.QUERIES, default=engines.QUERIES)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="where generated CSVs are kept between runs")
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--timeout", type=int, default=3600, help="seconds before a single run is abandoned")
+    parser.add_argument("--child", nargs=3, metavar=("ENGINE", "QUERY", "PATH"), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        run_child(*args.child)
+        return
+
+    engine_names = [name for name in args.engines if engines.available(name)]
+    for name in sorted(set(args.engines) - set(engine_names)):
+        logging.warning(f"Skipping {name}: not installed.")
+
+    started = datetime.now(timezone.utc).isoformat()
+    runs = run(args.rows, engine_names, args.queries, args.repeat, args.data_dir, args.timeout)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"started_at": started, "machine": machine(), "runs": runs}, f, indent=2)
+    logging.info(f"Wrote {len(runs)} runs to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
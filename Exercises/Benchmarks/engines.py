@@ -0,0 +1,258 @@
+import functools
+import importlib.util
+import shutil
+from pathlib import Path
+
+# The same three Divvy queries on each engine. Polars and Spark reuse the
+# Exercise-9 and Exercise-10 pipelines; pandas and DuckDB are written to
+# match them. Every query returns rows sorted by date as plain Python
+# values, so results can be compared across engines.
+#
+#   rides_per_day:       (date, rides)
+#   daily_durations:     (date, total_duration_seconds)
+#   weekly_stats:        (week_start, rides, avg, max and min daily rides),
+#                        over a dense calendar so days without rides count
+#
+# Engines are imported only when used: one harness run needs only some of
+# them installed.
+
+EXERCISES_DIR = Path(__file__).resolve().parent.parent
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+QUERIES = ["rides_per_day", "daily_durations", "weekly_stats"]
+
+
+def load_exercise(name):
+    # Every exercise's module is called main; load each under its own name.
+    path = EXERCISES_DIR / name / "main.py"
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_").lower(), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def python_date(value):
+    return value.date() if hasattr(value, "date") else value
+
+
+def as_rows(rows):
+    return [(python_date(row[0]),) + tuple(row[1:]) for row in rows]
+
+
+# pandas
+
+def pandas_trips(path, columns):
+    import pandas as pd
+
+    trips = pd.read_csv(path, usecols=columns)
+    for name in columns:
+        trips[name] = pd.to_datetime(trips[name], format=TIMESTAMP_FORMAT)
+    return trips
+
+
+def pandas_daily_rides(path):
+    trips = pandas_trips(path, ["started_at"])
+    return trips.groupby(trips["started_at"].dt.normalize()).size()
+
+
+def pandas_rides_per_day(path):
+    daily = pandas_daily_rides(path)
+    return as_rows((day, int(rides)) for day, rides in daily.items())
+
+
+def pandas_daily_durations(path):
+    trips = pandas_trips(path, ["started_at", "ended_at"])
+    duration = (trips["ended_at"] - trips["started_at"]).dt.total_seconds().astype("int64")
+    totals = duration.groupby(trips["started_at"].dt.normalize()).sum()
+    return as_rows((day, int(total)) for day, total in totals.items())
+
+
+def pandas_weekly_stats(path):
+    daily = pandas_daily_rides(path)
+    daily = daily.asfreq("D", fill_value=0)
+    weeks = daily.groupby(daily.index.to_period("W-SUN").start_time).agg(["sum", "mean", "max", "min"])
+    return as_rows(
+        (week, int(row["sum"]), float(row["mean"]), int(row["max"]), int(row["min"]))
+        for week, row in weeks.iterrows()
+    )
+
+
+# Polars (Exercise-9)
+
+@functools.lru_cache(maxsize=None)
+def exercise_9():
+    return load_exercise("Exercise-9")
+
+
+def polars_collect(query):
+    return as_rows(query.sort(query.collect_schema().names()[0]).collect(engine="streaming").rows())
+
+
+def polars_rides_per_day(path):
+    job = exercise_9()
+    return polars_collect(job.rides_per_day(job.read_trips(path)))
+
+
+def polars_daily_durations(path):
+    import polars as pl
+
+    trips = exercise_9().read_trips(path)
+    return polars_collect(
+        trips.group_by(pl.col("started_at").dt.date().alias("date")).agg(
+            (pl.col("ended_at") - pl.col("started_at")).dt.total_seconds().sum().alias("total_duration_seconds")
+        )
+    )
+
+
+def polars_weekly_stats(path):
+    job = exercise_9()
+    return polars_collect(job.weekly_stats(job.daily_calendar(job.rides_per_day(job.read_trips(path)))))
+
+
+# DuckDB
+
+def duckdb_query(path, sql):
+    import duckdb
+
+    con = duckdb.connect()
+    try:
+        trips = f"read_csv('{path}', header = true, timestampformat = '{TIMESTAMP_FORMAT}')"
+        return as_rows(con.execute(sql.format(trips=trips)).fetchall())
+    finally:
+        con.close()
+
+
+def duckdb_rides_per_day(path):
+    return duckdb_query(path, """
+        SELECT started_at::DATE AS date, count(*) AS rides
+        FROM {trips}
+        GROUP BY date
+        ORDER BY date
+    """)
+
+
+def duckdb_daily_durations(path):
+    return duckdb_query(path, """
+        SELECT started_at::DATE AS date, sum(date_diff('second', started_at, ended_at)) AS total_duration_seconds
+        FROM {trips}
+        GROUP BY date
+        ORDER BY date
+    """)
+
+
+def duckdb_weekly_stats(path):
+    return duckdb_query(path, """
+        WITH daily AS (
+            SELECT started_at::DATE AS date, count(*) AS rides
+            FROM {trips}
+            GROUP BY date
+        ),
+        calendar AS (
+            SELECT unnest(generate_series(min(date), max(date), INTERVAL 1 DAY))::DATE AS date
+            FROM daily
+        )
+        SELECT
+            date_trunc('week', date)::DATE AS week_start,
+            sum(coalesce(rides, 0))::BIGINT AS rides,
+            avg(coalesce(rides, 0)) AS avg_daily_rides,
+            max(coalesce(rides, 0)) AS max_daily_rides,
+            min(coalesce(rides, 0)) AS min_daily_rides
+        FROM calendar
+        LEFT JOIN daily USING (date)
+        GROUP BY week_start
+        ORDER BY week_start
+    """)
+
+
+# Spark (Exercise-10)
+
+@functools.lru_cache(maxsize=None)
+def exercise_10():
+    return load_exercise("Exercise-10")
+
+
+@functools.lru_cache(maxsize=None)
+def spark_session():
+    job = exercise_10()
+    spark = job.get_spark()
+    spark.sparkContext.setLogLevel("WARN")
+    spark.conf.set("spark.sql.shuffle.partitions", job.SHUFFLE_PARTITIONS)
+    return spark
+
+
+def spark_collect(df):
+    return as_rows(tuple(row) for row in df.orderBy(df.columns[0]).collect())
+
+
+def spark_daily_rides(path):
+    job = exercise_10()
+    # read_trips derives the duration too, so it needs both timestamps.
+    trips = job.read_trips(spark_session(), path, columns=job.AGGREGATE_COLUMNS)
+    return trips.groupBy("date").count().withColumnRenamed("count", "rides")
+
+
+def spark_rides_per_day(path):
+    return spark_collect(spark_daily_rides(path))
+
+
+def spark_daily_durations(path):
+    job = exercise_10()
+    return spark_collect(job.daily_durations(job.read_trips(spark_session(), path, columns=job.AGGREGATE_COLUMNS)))
+
+
+def spark_weekly_stats(path):
+    from pyspark.sql import functions as F
+
+    daily = spark_daily_rides(path).cache()
+    calendar = daily.select(F.explode(F.sequence(F.min("date"), F.max("date"))).alias("date"))
+    filled = calendar.join(daily, on="date", how="left").select(
+        F.to_date(F.date_trunc("week", "date")).alias("week_start"),
+        F.coalesce("rides", F.lit(0)).alias("rides"),
+    )
+    return spark_collect(filled.groupBy("week_start").agg(
+        F.sum("rides").alias("rides"),
+        F.avg("rides").alias("avg_daily_rides"),
+        F.max("rides").alias("max_daily_rides"),
+        F.min("rides").alias("min_daily_rides"),
+    ))
+
+
+# engine: (modules it needs, setup run before timing, {query: function})
+ENGINES = {
+    "pandas": (["pandas"], None, {
+        "rides_per_day": pandas_rides_per_day,
+        "daily_durations": pandas_daily_durations,
+        "weekly_stats": pandas_weekly_stats,
+    }),
+    "polars": (["polars"], exercise_9, {
+        "rides_per_day": polars_rides_per_day,
+        "daily_durations": polars_daily_durations,
+        "weekly_stats": polars_weekly_stats,
+    }),
+    "duckdb": (["duckdb"], None, {
+        "rides_per_day": duckdb_rides_per_day,
+        "daily_durations": duckdb_daily_durations,
+        "weekly_stats": duckdb_weekly_stats,
+    }),
+    "spark": (["pyspark"], spark_session, {
+        "rides_per_day": spark_rides_per_day,
+        "daily_durations": spark_daily_durations,
+        "weekly_stats": spark_weekly_stats,
+    }),
+}
+
+
+def available(engine):
+    modules, _, _ = ENGINES[engine]
+    if engine == "spark" and shutil.which("java") is None:
+        return False
+    return all(importlib.util.find_spec(module) is not None for module in modules)
+
+
+def jvm_pid():
+    # The local Spark JVM is a child of this process; its CPU time and
+    # memory are not in this process's own counters.
+    if spark_session.cache_info().currsize == 0:
+        return None
+    gateway = spark_session().sparkContext._gateway
+    proc = getattr(gateway, "proc", None)
+    return proc.pid if proc is not None else None
@@ -0,0 +1,75 @@
+import pytest
+import sys
+import os
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import compare_engines
+import engines
+
+HEADER = ('"ride_id","rideable_type","started_at","ended_at","start_station_name","start_station_id",'
+          '"end_station_name","end_station_id","start_lat","start_lng","end_lat","end_lng","member_casual"')
+
+INSTALLED = [name for name in engines.ENGINES if engines.available(name)]
+
+
+def trip(ride_id, started_at, ended_at):
+    return f'"{ride_id}","electric_bike","{started_at}","{ended_at}",,,,,41.91,-87.69,41.91,-87.7,"member"'
+
+
+@pytest.fixture(scope="module")
+def csv_path(tmp_path_factory):
+    # Thursday 06-01 to Monday 06-05, nothing on Saturday 06-03.
+    path = tmp_path_factory.mktemp("data") / "trips.csv"
+    rows = [
+        trip("A", "2023-06-01 08:00:00", "2023-06-01 08:10:00"),
+        trip("B", "2023-06-01 23:59:00", "2023-06-02 00:04:00"),
+        trip("C", "2023-06-02 12:00:00", "2023-06-02 12:00:30"),
+        trip("D", "2023-06-04 09:00:00", "2023-06-04 10:00:00"),
+        trip("E", "2023-06-05 07:00:00", "2023-06-05 07:01:00"),
+    ]
+    path.write_text("\n".join([HEADER] + rows) + "\n")
+    return str(path)
+
+
+EXPECTED = {
+    "rides_per_day": [
+        (date(2023, 6, 1), 2), (date(2023, 6, 2), 1), (date(2023, 6, 4), 1), (date(2023, 6, 5), 1),
+    ],
+    "daily_durations": [
+        (date(2023, 6, 1), 900), (date(2023, 6, 2), 30), (date(2023, 6, 4), 3600), (date(2023, 6, 5), 60),
+    ],
+    "weekly_stats": [
+        (date(2023, 5, 29), 4, 1.0, 2, 0),
+        (date(2023, 6, 5), 1, 1.0, 1, 1),
+    ],
+}
+
+
+@pytest.mark.parametrize("engine", INSTALLED)
+@pytest.mark.parametrize("query", engines.QUERIES)
+def test_engines_agree(engine, query, csv_path):
+    _, setup, queries = engines.ENGINES[engine]
+    if setup is not None:
+        setup()
+    assert queries[query](csv_path) == EXPECTED[query]
+
+
+def test_generated_data_matches_across_engines(tmp_path):
+    path = tmp_path / "trips.csv"
+    compare_engines.generate_csv(path, 20_000, days=30)
+
+    for query in engines.QUERIES:
+        fingerprints = {compare_engines.fingerprint(engines.ENGINES[e][2][query](str(path))) for e in INSTALLED}
+        assert len(fingerprints) == 1
+
+
+def test_measure_reports_json(tmp_path):
+    compare_engines.generate_csv(tmp_path / "trips.csv", 1_000, days=7)
+    result = compare_engines.measure(INSTALLED[0], "rides_per_day", tmp_path / "trips.csv", timeout=120)
+
+    assert result["result_rows"] == 7
+    assert result["wall_seconds"] > 0
+    assert result["peak_rss_bytes"] >= result["peak_anon_bytes"] > 0
+    assert 0 <= result["cpu_utilization"]
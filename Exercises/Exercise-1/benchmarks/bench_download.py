@@ -0,0 +1,96 @@
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from main import download_all
+
+# Local stand-in for the Divvy bucket: serves generated zips with a fixed
+# per-request latency so the serial loop pays it once per file.
+
+
+def build_archives(n_files, csv_bytes):
+    archives = {}
+    row = b"25223640,2019-10-01 00:01:39,2019-10-01 00:17:20,2215,940.0,20,Sheffield Ave,309,Leavitt St,Subscriber,Male,1987\n"
+    body = row * max(1, csv_bytes // len(row))
+
+    for i in range(n_files):
+        name = f"Divvy_Trips_2019_Q{i}"
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr(f"{name}.csv", body)
+        archives[f"/{name}.zip"] = buf.getvalue()
+
+    return archives
+
+
+def make_handler(archives, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            body = archives.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/zip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def run_mode(mode, uris, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        (path / "downloads").mkdir()
+        start = time.perf_counter()
+        results = download_all(uris, path, mode = mode, max_workers = workers)
+        return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Serial vs concurrent download benchmark.")
+    parser.add_argument("--files", type = int, default = 8)
+    parser.add_argument("--csv-mb", type = float, default = 4)
+    parser.add_argument("--latency", type = float, default = 0.25, help = "seconds added to every request")
+    parser.add_argument("--workers", type = int, default = 4)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    archives = build_archives(args.files, int(args.csv_mb * 1024 * 1024))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(archives, args.latency))
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+
+    base = f"http://127.0.0.1:{server.server_port}"
+    # Keep one bad URI in the mix, like Divvy_Trips_2220_Q1.zip in the real list.
+    uris = [f"{base}{name}" for name in archives] + [f"{base}/Divvy_Trips_2220_Q1.zip"]
+
+    try:
+        serial, _ = run_mode("serial", uris, 1)
+        print(f"{'serial':>8}: {serial:6.2f}s")
+
+        for mode in ("threads", "async"):
+            elapsed, results = run_mode(mode, uris, args.workers)
+            ok = sum(res.status == "extracted" for res in results)
+            print(f"{mode:>8}: {elapsed:6.2f}s  speedup {serial / elapsed:4.1f}x  ({ok}/{len(uris)} extracted)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
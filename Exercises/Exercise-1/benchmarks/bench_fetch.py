@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from fetch import Fetcher
+
+# Fresh requests.get per call vs the pooled Fetcher, against a local
+# keep-alive server that counts how many TCP connections it accepted.
+
+connections = 0
+connections_lock = threading.Lock()
+
+
+def make_handler(body):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            global connections
+            with connections_lock:
+                connections += 1
+            super().setup()
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def run(label, get, urls, workers):
+    global connections
+    with connections_lock:
+        connections = 0
+
+    def fetch(url):
+        with get(url) as res:
+            res.raise_for_status()
+            return len(res.content)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = workers) as pool:
+        total = sum(pool.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+
+    print(f"{label:>22}: {len(urls) / elapsed:8.0f} req/s  {connections:5d} connections  ({total} bytes)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Connection reuse benchmark.")
+    parser.add_argument("--requests", type = int, default = 2000)
+    parser.add_argument("--workers", type = int, default = 4)
+    parser.add_argument("--body-kb", type = int, default = 16)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(b"x" * args.body_kb * 1024))
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    urls = [f"http://127.0.0.1:{server.server_port}/file-{i}.csv" for i in range(args.requests)]
+
+    try:
+        fresh = run("requests.get", requests.get, urls, args.workers)
+
+        fetcher = Fetcher(per_host = args.workers)
+        pooled = run("Fetcher (pooled)", fetcher.get, urls, args.workers)
+        fetcher.close()
+
+        print(f"{'speedup':>22}: {fresh / pooled:8.1f}x")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
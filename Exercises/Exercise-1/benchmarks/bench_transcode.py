@@ -0,0 +1,102 @@
+import argparse
+import csv
+import io
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from main import extract_csv
+
+# Extracts one generated Divvy archive as CSV and as Parquet, then scans
+# the two columns a daily-duration report needs from each. Reports time,
+# size on disk and Arrow's peak allocation.
+
+HEADER = [
+    "trip_id", "start_time", "end_time", "bikeid", "tripduration", "from_station_id", "from_station_name",
+    "to_station_id", "to_station_name", "usertype", "gender", "birthyear",
+]
+SCAN_COLUMNS = {"csv": ["start_time", "tripduration"], "parquet": ["start_time", "duration_seconds"]}
+
+
+def build_archive(path, rows, stations = 600, seed = 0):
+    rng = random.Random(seed)
+    start = datetime(2019, 10, 1)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        with z.open("Divvy_Trips_2019_Q4.csv", "w") as member:
+            f = io.TextIOWrapper(member, encoding = "utf-8", newline = "")
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            for i in range(rows):
+                started = start + timedelta(seconds = rng.randrange(92 * 86400))
+                duration = rng.randint(60, 7200)
+                ended = started + timedelta(seconds = duration)
+                a, b = rng.randrange(stations), rng.randrange(stations)
+                writer.writerow([
+                    25223640 + i, f"{started:%Y-%m-%d %H:%M:%S}", f"{ended:%Y-%m-%d %H:%M:%S}",
+                    rng.randint(1, 6500), f"{duration:,.1f}", a, f"Station {a}", b, f"Station {b}",
+                    rng.choice(["Subscriber", "Customer"]), rng.choice(["Male", "Female", ""]),
+                    rng.choice([""] + list(range(1940, 2004))),
+                ])
+            f.flush()
+            f.detach()
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Exercise-1 CSV vs Parquet extraction benchmark.")
+    parser.add_argument("--rows", type = int, default = 2_000_000)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    uri = "https://example.com/Divvy_Trips_2019_Q4.zip"
+
+    with tempfile.TemporaryDirectory(dir = os.getcwd()) as tmp:
+        path = Path(tmp)
+        (path / "downloads").mkdir()
+        archive = path / "archive.zip"
+        print(f"Generating {args.rows} trips...")
+        build_archive(archive, args.rows)
+        print(f"Archive: {archive.stat().st_size / 2 ** 20:.0f} MiB")
+
+        sizes = {}
+        for output in ["csv", "parquet"]:
+            with open(archive, "rb") as f:
+                status, extract_seconds = timed(lambda: extract_csv(f, uri, path, output))
+            assert status == "extracted", status
+
+            out_path = path / "downloads" / f"Divvy_Trips_2019_Q4.{output}"
+            sizes[output] = out_path.stat().st_size
+
+            if output == "csv":
+                options = pacsv.ConvertOptions(include_columns = SCAN_COLUMNS[output])
+                scan = lambda: pacsv.read_csv(out_path, convert_options = options)
+            else:
+                scan = lambda: pq.read_table(out_path, columns = SCAN_COLUMNS[output])
+            table, scan_seconds = timed(scan)
+
+            print(
+                f"{output:>8}: extract {extract_seconds:6.2f}s  {sizes[output] / 2 ** 20:7.1f} MiB on disk  "
+                f"scan {table.num_columns} columns {scan_seconds:6.2f}s"
+            )
+
+        print(f"Parquet is {sizes['csv'] / sizes['parquet']:.1f}x smaller than the CSV.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared HTTP fetch layer: one pooled requests.Session with timeouts and
+# jittered retries. Exercise-2 carries an identical copy of this file.
+
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+
+
+class Fetcher:
+    def __init__(
+        self,
+        pool_size = 10,
+        per_host = 4,
+        retries = 3,
+        backoff = 0.5,
+        max_backoff = 30,
+        timeout = (5, 60),
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        # urllib3 keeps one connection pool per host. pool_size is how many
+        # host pools to keep alive; per_host caps the connections to any one
+        # host, and pool_block makes extra requests wait for a free
+        # connection instead of opening a throwaway one. A streamed response
+        # holds its connection until it is closed, so the cap covers body
+        # transfer too.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = per_host, pool_block = True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def backoff_delay(self, attempt, retry_after = None):
+        # Full jitter: uniform over [0, backoff * 2^attempt], capped.
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(self.max_backoff, retry_after))
+        return delay
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                res = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                logging.warning(f"Request to {host} failed ({e.__class__.__name__}), retrying...")
+            else:
+                if res.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return res
+                logging.warning(f"{host} returned {res.status_code}, retrying...")
+                retry_after = parse_retry_after(res)
+                res.close()
+
+            time.sleep(self.backoff_delay(attempt, retry_after))
+
+    def close(self):
+        self.session.close()
+
+
+def parse_retry_after(res):
+    try:
+        return float(res.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def default_fetcher():
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher()
+        return _default_fetcher
+
+
+def reset_default_fetcher():
+    # For a forked child: drop the parent's fetcher without closing it, as
+    # its pooled sockets are shared with the parent. The next call to
+    # default_fetcher() in this process opens fresh connections.
+    global _default_fetcher
+    with _default_lock:
+        _default_fetcher = None
@@ -1,8 +1,20 @@
 import requests
+import aiohttp
+import argparse
+import asyncio
 import logging
+import os
+import shutil
+import tempfile
+import time
 import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from io import BytesIO
+
+from fetch import Fetcher, default_fetcher
+from http_cache import DownloadCache
+from transcode import transcode
 
 logging.basicConfig(
     format="{asctime} | {levelname} | {message}",
@@ -21,6 +33,17 @@ download_uris = [
     "https://divvy-tripdata.s3.amazonaws.com/Divvy_Trips_2220_Q1.zip",
 ]
 
+CHUNK_SIZE = 1024 * 1024
+
+# File extension for each extraction format.
+OUTPUTS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+}
+
+# Outcome of a single URI, reported once every download has finished.
+DownloadResult = namedtuple("DownloadResult", ["uri", "status", "seconds"])
+
 # For extra credit, download the files in an async manner using the Python package aiohttp.
 # Also try using ThreadPoolExecutor in Python to download the files.
 # Also write unit tests to improve your skills.
@@ -38,7 +61,7 @@ def downloads_dir_exists(path):
     if downloads_path.exists():
         logging.info("Downloads folder found.")
         return
-        
+
     # If downloads folder is not found, create it.
     try:
         downloads_path.mkdir()
@@ -53,36 +76,126 @@ def downloads_dir_exists(path):
         raise
 
 
-def get_data(uri, path):
+def get_data(uri, path, cache = None, fetcher = None, output = "csv"):
+    if csv_exists(get_output_name(uri, output), path):
+        return "exists"
+
+    fetcher = fetcher or default_fetcher()
     try:
         logging.info(f"Retrieving data from {uri}...")
-        data = requests.get(uri)
-        data.raise_for_status()
-
-        try:
-            with zipfile.ZipFile(BytesIO(data.content)) as z:
-                logging.info("Attempting to unpack zip archive...")
-                csv_name = get_csv_name(uri)
-                
-                csv_path = path / "downloads" / csv_name
-
-                if not csv_path.exists():
-                    if csv_in_zip_archive(z, csv_name):
-                        z.extract(csv_name, path = path / "downloads")
-                        logging.info(f"{csv_name} successfully extracted.")
-                else:
-                    logging.info(f"{csv_name} already exists.")
+        if cache is not None:
+            return extract_cached(cache, cache.fetch(uri), uri, path, output)
 
-        except zipfile.BadZipFile as bzf:
-            logging.error(f"Error encountered: {z} is a bad zip file.")
-            logging.error(f"{bzf}")
+        with fetcher.get(uri, stream = True) as data:
+            data.raise_for_status()
+
+            # Spool the archive to disk chunk by chunk rather than holding it in memory.
+            with spool_file(path) as spool:
+                for chunk in data.iter_content(chunk_size = CHUNK_SIZE):
+                    spool.write(chunk)
+                return extract_csv(spool, uri, path, output)
 
     except requests.HTTPError as e:
-        logging.error(f"An HTTP error occurred: {e.response.status_code}")
+        status = e.response.status_code if e.response is not None else e
+        logging.error(f"An HTTP error occurred: {status}")
+        return "http_error"
     except requests.ConnectionError as e:
         logging.error(f"A connection error occurred: {e}")
+        return "connection_error"
     except Exception as e:
         logging.error(f"An unexpected error occurred: {e}")
+        return "error"
+
+
+def csv_exists(csv_name, path):
+    if (path / "downloads" / csv_name).exists():
+        logging.info(f"{csv_name} already exists.")
+        return True
+    return False
+
+
+def extract_cached(cache, cached, uri, path, output = "csv"):
+    with cached.open() as archive:
+        status = extract_csv(archive, uri, path, output)
+
+    # Don't keep serving a corrupt archive from the cache.
+    if status == "bad_zip":
+        cache.invalidate(uri)
+    return status
+
+
+def spool_file(path):
+    # Spool next to the output rather than in /tmp, which is often RAM-backed.
+    return tempfile.TemporaryFile(dir = path / "downloads", suffix = ".zip.part")
+
+
+def extract_csv(archive, uri, path, output = "csv"):
+    csv_name = get_csv_name(uri)
+    out_path = path / "downloads" / get_output_name(uri, output)
+
+    try:
+        with zipfile.ZipFile(archive) as z:
+            logging.info("Attempting to unpack zip archive...")
+
+            if not csv_in_zip_archive(z, csv_name):
+                logging.warning(f"{csv_name} not found in archive from {uri}.")
+                return "missing"
+
+            # Write the output in chunks and only rename once complete, so an
+            # interrupted run never leaves a partial file that passes csv_exists().
+            member = next(name for name in z.namelist() if name.endswith(csv_name))
+            part_path = out_path.with_name(out_path.name + ".part")
+            try:
+                if output == "parquet":
+                    # Straight from the archive to Parquet; no CSV touches disk.
+                    rows = transcode(lambda: z.open(member), part_path)
+                    logging.info(f"Transcoded {rows} rows from {csv_name}.")
+                else:
+                    with z.open(member) as src, open(part_path, "wb") as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            except BaseException:
+                # A failed write leaves nothing behind that looks like output.
+                part_path.unlink(missing_ok = True)
+                raise
+            os.replace(part_path, out_path)
+
+            logging.info(f"{out_path.name} successfully extracted.")
+            return "extracted"
+
+    except zipfile.BadZipFile as bzf:
+        logging.error(f"Error encountered: {uri} is a bad zip file.")
+        logging.error(f"{bzf}")
+        return "bad_zip"
+
+
+async def get_data_async(session, uri, path, cache = None, fetcher = None, output = "csv"):
+    if csv_exists(get_output_name(uri, output), path):
+        return "exists"
+
+    if cache is not None:
+        # The cache speaks requests, so run it on a worker thread.
+        return await asyncio.to_thread(get_data, uri, path, cache, fetcher, output)
+
+    try:
+        logging.info(f"Retrieving data from {uri}...")
+        with spool_file(path) as spool:
+            async with session.get(uri) as res:
+                res.raise_for_status()
+                async for chunk in res.content.iter_chunked(CHUNK_SIZE):
+                    spool.write(chunk)
+
+            # Unzipping is blocking work, keep it off the event loop.
+            return await asyncio.to_thread(extract_csv, spool, uri, path, output)
+
+    except aiohttp.ClientResponseError as e:
+        logging.error(f"An HTTP error occurred: {e.status}")
+        return "http_error"
+    except aiohttp.ClientConnectionError as e:
+        logging.error(f"A connection error occurred: {e}")
+        return "connection_error"
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {e}")
+        return "error"
 
 
 def get_csv_name(uri):
@@ -90,26 +203,129 @@ def get_csv_name(uri):
     return z.replace(".zip", ".csv")
 
 
+def get_output_name(uri, output = "csv"):
+    if output not in OUTPUTS:
+        raise ValueError(f"Unknown output format: {output}")
+    return get_csv_name(uri).replace(".csv", OUTPUTS[output])
+
+
 def csv_in_zip_archive(zip_archive, csv_name):
     return any(name.endswith(csv_name) for name in zip_archive.namelist())
 
 
-def main():
+def timed_get_data(uri, path, cache = None, fetcher = None, output = "csv"):
+    start = time.perf_counter()
+    status = get_data(uri, path, cache, fetcher, output)
+    return DownloadResult(uri, status, time.perf_counter() - start)
+
+
+def download_serial(uris, path, max_workers = None, cache = None, fetcher = None, output = "csv"):
+    return [timed_get_data(uri, path, cache, fetcher, output) for uri in uris]
+
+
+def download_threaded(uris, path, max_workers = 4, cache = None, fetcher = None, output = "csv"):
+    with ThreadPoolExecutor(max_workers = max_workers) as pool:
+        return list(pool.map(lambda uri: timed_get_data(uri, path, cache, fetcher, output), uris))
+
+
+async def _download_async(uris, path, max_workers, cache, fetcher, output):
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def timed(session, uri):
+        async with semaphore:
+            start = time.perf_counter()
+            status = await get_data_async(session, uri, path, cache, fetcher, output)
+            return DownloadResult(uri, status, time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit = max_workers)
+    async with aiohttp.ClientSession(connector = connector) as session:
+        return await asyncio.gather(*(timed(session, uri) for uri in uris))
+
+
+def download_async(uris, path, max_workers = 4, cache = None, fetcher = None, output = "csv"):
+    return asyncio.run(_download_async(uris, path, max_workers, cache, fetcher, output))
+
+
+DOWNLOADERS = {
+    "serial": download_serial,
+    "threads": download_threaded,
+    "async": download_async,
+}
+
+
+def download_all(uris, path, mode = "threads", max_workers = 4, cache = None, fetcher = None, output = "csv"):
+    if mode not in DOWNLOADERS:
+        raise ValueError(f"Unknown download mode: {mode}")
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+    if output not in OUTPUTS:
+        raise ValueError(f"Unknown output format: {output}")
+
+    logging.info(f"Downloading {len(uris)} files ({mode}, {max_workers} workers)...")
+    start = time.perf_counter()
+    results = DOWNLOADERS[mode](
+        uris, path, max_workers = max_workers, cache = cache, fetcher = fetcher, output = output
+    )
+    elapsed = time.perf_counter() - start
+
+    report_results(results, elapsed)
+    if cache is not None:
+        cache.report()
+    return results
+
+
+def report_results(results, elapsed):
+    for res in results:
+        logging.info(f"{res.status:>16} | {res.seconds:6.2f}s | {res.uri}")
+
+    failed = sum(res.status not in ("extracted", "exists") for res in results)
+    logging.info(f"Finished {len(results)} downloads in {elapsed:.2f}s, {failed} failed.")
+
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description = "Download and unzip the Divvy trip archives.")
+    parser.add_argument("--mode", choices = sorted(DOWNLOADERS), default = "threads")
+    parser.add_argument("--workers", type = int, default = 4)
+    parser.add_argument("--cache-dir", type = Path, help = "keep downloaded zips here and revalidate them on later runs")
+    parser.add_argument("--cache-max-mb", type = int, default = 2048)
+    parser.add_argument("--output", choices = sorted(OUTPUTS), default = "csv",
+                        help = "parquet: transcode each archive to one typed schema for every quarter")
+    parser.add_argument("--retries", type = int, default = 3)
+    parser.add_argument("--timeout", type = float, default = 60, help = "read timeout in seconds")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    args = parse_args(argv)
+
     logging.info("Beginning execution.")
-    path = Path(__file__).resolve.parents[0]
+    path = Path(__file__).resolve().parent
     try:
         downloads_dir_exists(path)
     except Exception as e:
         logging.critical(f"Pipeline failed with an unexpected error: {e}")
         raise
 
-    for uri in download_uris:
-        try:
-            get_data(uri, path)
-        except Exception as e:
-            logging.critical(f"Pipeline failed with an unexpected error: {e}")
-            raise
+    try:
+        fetcher = Fetcher(per_host = args.workers, retries = args.retries, timeout = (5, args.timeout))
+
+        cache = None
+        if args.cache_dir is not None:
+            cache = DownloadCache(args.cache_dir, max_bytes = args.cache_max_mb * 1024 * 1024, session = fetcher)
+
+        download_all(
+            download_uris,
+            path,
+            mode = args.mode,
+            max_workers = args.workers,
+            cache = cache,
+            fetcher = fetcher,
+            output = args.output,
+        )
+    except Exception as e:
+        logging.critical(f"Pipeline failed with an unexpected error: {e}")
+        raise
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,184 @@
+import csv
+import io
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+BLOCK_SIZE = 8 * 1024 * 1024
+ROW_GROUP_SIZE = 500_000
+
+# One typed schema for every quarter. Timestamps are ms because Parquet
+# has no seconds unit; a seconds schema would read back as ms anyway.
+SCHEMA = pa.schema([
+    ("trip_id", pa.string()),
+    ("start_time", pa.timestamp("ms")),
+    ("end_time", pa.timestamp("ms")),
+    ("duration_seconds", pa.float64()),
+    ("bike_id", pa.int32()),
+    ("rideable_type", pa.string()),
+    ("start_station_id", pa.int32()),
+    ("start_station_name", pa.string()),
+    ("end_station_id", pa.int32()),
+    ("end_station_name", pa.string()),
+    ("start_lat", pa.float64()),
+    ("start_lng", pa.float64()),
+    ("end_lat", pa.float64()),
+    ("end_lng", pa.float64()),
+    ("user_type", pa.string()),
+    ("gender", pa.string()),
+    ("birth_year", pa.int16()),
+])
+
+# Source column for each canonical column, per Divvy export layout. Columns
+# a layout lacks are left null, except duration, which is end - start.
+LAYOUTS = {
+    "2018-2019": {
+        "trip_id": "trip_id",
+        "start_time": "start_time",
+        "end_time": "end_time",
+        "duration_seconds": "tripduration",
+        "bike_id": "bikeid",
+        "start_station_id": "from_station_id",
+        "start_station_name": "from_station_name",
+        "end_station_id": "to_station_id",
+        "end_station_name": "to_station_name",
+        "user_type": "usertype",
+        "gender": "gender",
+        "birth_year": "birthyear",
+    },
+    "2019-Q2": {
+        "trip_id": "01 - Rental Details Rental ID",
+        "start_time": "01 - Rental Details Local Start Time",
+        "end_time": "01 - Rental Details Local End Time",
+        "duration_seconds": "01 - Rental Details Duration In Seconds Uncapped",
+        "bike_id": "01 - Rental Details Bike ID",
+        "start_station_id": "03 - Rental Start Station ID",
+        "start_station_name": "03 - Rental Start Station Name",
+        "end_station_id": "02 - Rental End Station ID",
+        "end_station_name": "02 - Rental End Station Name",
+        "user_type": "User Type",
+        "gender": "Member Gender",
+        "birth_year": "05 - Member Details Member Birthday Year",
+    },
+    "2020": {
+        "trip_id": "ride_id",
+        "start_time": "started_at",
+        "end_time": "ended_at",
+        "rideable_type": "rideable_type",
+        "start_station_id": "start_station_id",
+        "start_station_name": "start_station_name",
+        "end_station_id": "end_station_id",
+        "end_station_name": "end_station_name",
+        "start_lat": "start_lat",
+        "start_lng": "start_lng",
+        "end_lat": "end_lat",
+        "end_lng": "end_lng",
+        "user_type": "member_casual",
+    },
+}
+
+# Older quarters call members and casual riders subscribers and customers.
+USER_TYPES = {"Subscriber": "member", "Customer": "casual"}
+
+
+def read_header(member):
+    with io.TextIOWrapper(member, encoding = "utf-8-sig", newline = "") as f:
+        return next(csv.reader(f), [])
+
+
+def find_layout(header):
+    columns = set(header)
+    for name, layout in LAYOUTS.items():
+        if set(layout.values()) <= columns:
+            return name, layout
+    raise ValueError(f"Unrecognised Divvy columns: {header}")
+
+
+def map_values(column, mapping):
+    # Maps the few distinct values once and gathers, rather than comparing
+    # every row against every key.
+    values = pc.unique(column)
+    mapped = values
+    for old, new in mapping.items():
+        mapped = pc.if_else(pc.equal(mapped, old), new, mapped)
+    return pc.take(mapped, pc.index_in(column, value_set = values))
+
+
+def convert(column, field):
+    if pa.types.is_timestamp(field.type):
+        return pc.cast(pc.strptime(column, format = TIMESTAMP_FORMAT, unit = "s"), field.type)
+    if field.name == "duration_seconds":
+        # 2018-2019 durations are quoted with thousands separators ("1,090.0").
+        column = pc.replace_substring(column, ",", "")
+    if field.name == "user_type":
+        column = map_values(column, USER_TYPES)
+    if pa.types.is_integer(field.type):
+        # Some quarters write whole numbers as floats ("1987.0").
+        column = pc.cast(column, pa.float64())
+    return pc.cast(column, field.type)
+
+
+def to_canonical(batch, layout):
+    columns = {}
+    for field in SCHEMA:
+        source = layout.get(field.name)
+        if source is None:
+            columns[field.name] = pa.nulls(batch.num_rows, field.type)
+        else:
+            columns[field.name] = convert(batch.column(source), field)
+
+    if "duration_seconds" not in layout:
+        elapsed = pc.subtract(columns["end_time"], columns["start_time"])
+        columns["duration_seconds"] = pc.divide(pc.cast(pc.cast(elapsed, pa.int64()), pa.float64()), 1000.0)
+
+    return pa.Table.from_pydict(columns, schema = SCHEMA)
+
+
+def iter_canonical(open_member, block_size = BLOCK_SIZE):
+    # The member is opened twice: once for its header, to pick the layout
+    # and read every column as text, then again to stream the rows.
+    with open_member() as member:
+        header = read_header(member)
+    _, layout = find_layout(header)
+
+    read_options = pacsv.ReadOptions(block_size = block_size)
+    convert_options = pacsv.ConvertOptions(
+        column_types = {name: pa.string() for name in header},
+        include_columns = sorted(set(layout.values())),
+        strings_can_be_null = True,
+    )
+    with open_member() as member:
+        reader = pacsv.open_csv(member, read_options = read_options, convert_options = convert_options)
+        for batch in reader:
+            yield to_canonical(batch, layout)
+
+
+def transcode(open_member, out_path, row_group_size = ROW_GROUP_SIZE, block_size = BLOCK_SIZE,
+              compression = "zstd"):
+    # Streams one zip member into Parquet: one CSV block in memory at a
+    # time, plus whatever is buffered towards the next row group.
+    rows = 0
+    buffered = []
+    buffered_rows = 0
+
+    with pq.ParquetWriter(out_path, SCHEMA, compression = compression) as writer:
+        for table in iter_canonical(open_member, block_size):
+            buffered.append(table)
+            buffered_rows += table.num_rows
+            if buffered_rows >= row_group_size:
+                # Write whole row groups only; the remainder starts the next one.
+                table = pa.concat_tables(buffered)
+                full = buffered_rows - buffered_rows % row_group_size
+                writer.write_table(table.slice(0, full), row_group_size = row_group_size)
+                rows += full
+                rest = table.slice(full)
+                buffered, buffered_rows = [rest], rest.num_rows
+
+        if buffered_rows:
+            writer.write_table(pa.concat_tables(buffered), row_group_size = row_group_size)
+            rows += buffered_rows
+
+    return rows
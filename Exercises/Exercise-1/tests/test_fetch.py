@@ -0,0 +1,89 @@
+import pytest
+import requests
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.fetch import Fetcher
+
+
+def make_response(mocker, status_code, headers = None):
+    res = mocker.MagicMock(spec = requests.Response)
+    res.status_code = status_code
+    res.headers = headers or {}
+    return res
+
+
+@pytest.fixture
+def no_sleep(mocker):
+    return mocker.patch("src.fetch.time.sleep")
+
+
+def test_retries_5xx_then_succeeds(mocker, no_sleep):
+    fetcher = Fetcher(retries = 3)
+    responses = [make_response(mocker, 503), make_response(mocker, 502), make_response(mocker, 200)]
+    mocker.patch.object(fetcher.session, "get", side_effect = responses)
+
+    res = fetcher.get("http://example.com/file.zip")
+
+    assert res is responses[-1]
+    assert fetcher.session.get.call_count == 3
+    assert no_sleep.call_count == 2
+    # Failed attempts release their connection before sleeping.
+    responses[0].close.assert_called_once()
+
+
+def test_gives_up_after_retries_and_returns_last_response(mocker, no_sleep):
+    fetcher = Fetcher(retries = 2)
+    mocker.patch.object(fetcher.session, "get", return_value = make_response(mocker, 500))
+
+    assert fetcher.get("http://example.com/file.zip").status_code == 500
+    assert fetcher.session.get.call_count == 3
+
+
+def test_client_errors_are_not_retried(mocker, no_sleep):
+    fetcher = Fetcher(retries = 3)
+    mocker.patch.object(fetcher.session, "get", return_value = make_response(mocker, 404))
+
+    assert fetcher.get("http://example.com/file.zip").status_code == 404
+    fetcher.session.get.assert_called_once()
+    no_sleep.assert_not_called()
+
+
+def test_connection_errors_are_retried_then_raised(mocker, no_sleep):
+    fetcher = Fetcher(retries = 2)
+    mocker.patch.object(fetcher.session, "get", side_effect = requests.ConnectionError("reset"))
+
+    with pytest.raises(requests.ConnectionError):
+        fetcher.get("http://example.com/file.zip")
+
+    assert fetcher.session.get.call_count == 3
+
+
+def test_default_timeout_is_applied(mocker):
+    fetcher = Fetcher(timeout = (1, 2))
+    mocker.patch.object(fetcher.session, "get", return_value = make_response(mocker, 200))
+
+    fetcher.get("http://example.com/file.zip", stream = True)
+
+    fetcher.session.get.assert_called_once_with("http://example.com/file.zip", stream = True, timeout = (1, 2))
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    fetcher = Fetcher(backoff = 1, max_backoff = 5)
+
+    delays = [fetcher.backoff_delay(attempt) for attempt in range(10) for _ in range(20)]
+
+    assert all(0 <= d <= 5 for d in delays)
+    assert len(set(delays)) > 1
+    assert fetcher.backoff_delay(0, retry_after = 3) >= 3
+
+
+def test_per_host_limit_sizes_the_connection_pool():
+    fetcher = Fetcher(pool_size = 7, per_host = 2)
+    adapter = fetcher.session.get_adapter("https://example.com")
+
+    assert adapter._pool_connections == 7
+    assert adapter._pool_maxsize == 2
+    assert adapter._pool_block is True
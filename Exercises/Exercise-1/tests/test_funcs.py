@@ -1,4 +1,7 @@
 import pytest
+import threading
+import time
+import tracemalloc
 import zipfile
 import requests
 from pathlib import Path
@@ -7,7 +10,15 @@ import os
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.main import downloads_dir_exists, get_data, get_csv_name, csv_in_zip_archive
+from src.main import (
+    downloads_dir_exists,
+    get_data,
+    get_csv_name,
+    csv_in_zip_archive,
+    download_all,
+    extract_csv,
+    DownloadResult,
+)
 
 def test_downloads_dir_exists(mocker):
     # Create mock of Path object to simulate when downloads dir does not exist.
@@ -93,43 +104,149 @@ def test_csv_in_zip_archive(mocker):
 #         path = mock_path / "downloads"
 #     )
 
-def test_get_data_success(mocker):
-    # 1. Setup all mocks FIRST
-    mock_res = mocker.MagicMock()
-    mock_res.content = b"zip_content"
+def make_zip(path, csv_name, payload, compression = zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(path, "w", compression) as z:
+        z.writestr(csv_name, payload)
+    return path
+
+
+def mock_stream_response(mocker, archive_path):
+    # Stand-in for Session.get(..., stream=True) that yields the archive in chunks.
+    def iter_content(chunk_size = 1024 * 1024):
+        with open(archive_path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    mock_res = mocker.MagicMock(spec = requests.Response)
+    mock_res.__enter__.return_value = mock_res
+    mock_res.status_code = 200
     mock_res.raise_for_status.return_value = None
-    mocker.patch("requests.get", return_value=mock_res)
-
-    mock_zip = mocker.MagicMock()
-    mocker.patch("zipfile.ZipFile", return_value=mock_zip)
-
-    # 2. CRITICAL: Mock Path behavior PROPERLY
-    mock_path = mocker.MagicMock()
-    mock_path.__truediv__.side_effect = lambda x: mock_path  # Simulate path joining
-    mock_path.exists.return_value = False  # File doesn't exist
-    
-    # 3. Mock ALL helper functions
-    mocker.patch("src.main.get_csv_name", return_value="example.csv")
-    mocker.patch("src.main.csv_in_zip_archive", return_value=True)
-
-    # 4. Execute
-    get_data("http://example.com/file.zip", mock_path)
-
-    # 5. Verify
-    mock_zip.extract.assert_called_once_with(
-        "example.csv", 
-        path=mock_path / "downloads"
-    )
+    mock_res.iter_content.side_effect = iter_content
+    return mock_res
+
+
+def test_get_data_success(mocker, tmp_path):
+    archive = make_zip(tmp_path / "example.zip", "example.csv", b"a,b\n1,2\n")
+    (tmp_path / "downloads").mkdir()
+
+    mocker.patch("requests.Session.get", return_value = mock_stream_response(mocker, archive))
+
+    assert get_data("http://example.com/example.zip", tmp_path) == "extracted"
+
+    requests.Session.get.assert_called_once_with("http://example.com/example.zip", stream = True, timeout = (5, 60))
+    assert (tmp_path / "downloads" / "example.csv").read_bytes() == b"a,b\n1,2\n"
+    # Neither the spooled archive nor a partial CSV is left behind.
+    assert [p.name for p in (tmp_path / "downloads").iterdir()] == ["example.csv"]
+
+
+def test_get_data_skips_download_when_csv_exists(mocker, tmp_path):
+    (tmp_path / "downloads").mkdir()
+    (tmp_path / "downloads" / "example.csv").write_bytes(b"already here")
+    mocker.patch("requests.Session.get")
+
+    assert get_data("http://example.com/example.zip", tmp_path) == "exists"
+
+    requests.Session.get.assert_not_called()
+
+
+def test_get_data_csv_missing_from_archive(mocker, tmp_path):
+    archive = make_zip(tmp_path / "example.zip", "other.csv", b"a,b\n")
+    (tmp_path / "downloads").mkdir()
+    mocker.patch("requests.Session.get", return_value = mock_stream_response(mocker, archive))
+
+    assert get_data("http://example.com/example.zip", tmp_path) == "missing"
+    assert not (tmp_path / "downloads" / "example.csv").exists()
+
+
+def test_extract_csv_failure_leaves_no_part_file(mocker, tmp_path):
+    archive = make_zip(tmp_path / "example.zip", "example.csv", b"a,b\n1,2\n")
+    (tmp_path / "downloads").mkdir()
+    mocker.patch("src.main.shutil.copyfileobj", side_effect = OSError("No space left on device"))
+
+    with open(archive, "rb") as f, pytest.raises(OSError):
+        extract_csv(f, "http://example.com/example.zip", tmp_path)
+
+    assert list((tmp_path / "downloads").iterdir()) == []
 
 
 def test_get_data_http_error(mocker):
     mock_res = mocker.MagicMock(spec = requests.Response)
+    mock_res.__enter__.return_value = mock_res
+    mock_res.status_code = 404
     mock_res.raise_for_status.side_effect = requests.HTTPError("404 Not Found")
 
-    mocker.patch("requests.get", return_value = mock_res)
+    mocker.patch("requests.Session.get", return_value = mock_res)
 
     mock_path = mocker.MagicMock(spec = Path)
+    mock_path.__truediv__.return_value = mock_path
+    mock_path.exists.return_value = False
+
+    assert get_data("http://example.com/example.zip", mock_path) == "http_error"
+
+    mock_res.raise_for_status.assert_called_once()
+
+
+def test_get_data_memory_ceiling(mocker, tmp_path):
+    # A 48 MiB stored archive must never be held in memory: both the spool
+    # and the extraction work in CHUNK_SIZE pieces.
+    archive_size = 48 * 1024 * 1024
+    archive = make_zip(tmp_path / "big.zip", "big.csv", os.urandom(archive_size), zipfile.ZIP_STORED)
+    (tmp_path / "downloads").mkdir()
+    mocker.patch("requests.Session.get", return_value = mock_stream_response(mocker, archive))
+
+    tracemalloc.start()
+    try:
+        status = get_data("http://example.com/big.zip", tmp_path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert status == "extracted"
+    assert (tmp_path / "downloads" / "big.csv").stat().st_size == archive_size
+    assert peak < 8 * 1024 * 1024
+
+
+@pytest.mark.parametrize("mode", ["serial", "threads", "async"])
+def test_download_all_reports_every_uri(mocker, mode):
+    uris = ["http://example.com/a.zip", "http://example.com/bad.zip", "http://example.com/c.zip"]
+    status = {uri: ("http_error" if "bad" in uri else "extracted") for uri in uris}
+
+    async def fake_get_data_async(session, uri, path, cache = None, fetcher = None, output = "csv"):
+        return status[uri]
+
+    mocker.patch(
+        "src.main.get_data", side_effect = lambda uri, path, cache = None, fetcher = None, output = "csv": status[uri]
+    )
+    mocker.patch("src.main.get_data_async", side_effect = fake_get_data_async)
+
+    results = download_all(uris, Path("."), mode = mode, max_workers = 2)
+
+    # Results come back in input order, one per URI, and a bad URI doesn't stop the rest.
+    assert [res.uri for res in results] == uris
+    assert [res.status for res in results] == ["extracted", "http_error", "extracted"]
+    assert all(isinstance(res, DownloadResult) for res in results)
+
+
+def test_download_all_respects_concurrency_limit(mocker):
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def fake_get_data(uri, path, cache = None, fetcher = None, output = "csv"):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return "extracted"
+
+    mocker.patch("src.main.get_data", side_effect = fake_get_data)
+
+    download_all([f"http://example.com/{i}.zip" for i in range(12)], Path("."), mode = "threads", max_workers = 3)
+
+    assert 1 < active["peak"] <= 3
 
-    get_data("http://example.com/example.zip", mock_path)
 
-    mock_res.raise_for_status.assert_called_once()
\ No newline at end of file
+def test_download_all_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        download_all([], Path("."), mode = "carrier-pigeon")
@@ -0,0 +1,207 @@
+import pytest
+import requests
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.fetch import Fetcher
+from src.http_cache import DownloadCache
+
+BODY = bytes(range(256)) * 4096  # 1 MiB
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Minimal server honouring If-None-Match and Range/If-Range.
+    requests_seen = []
+
+    def do_GET(self):
+        Handler.requests_seen.append(dict(self.headers))
+
+        if self.path == "/missing.zip":
+            self.send_error(404)
+            return
+
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+
+        body = BODY
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") == ETAG:
+            start = int(range_header.split("=")[1].rstrip("-"))
+            if start >= len(BODY):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(BODY)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = BODY[start:]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+        else:
+            self.send_response(200)
+
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests_seen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target = httpd.serve_forever, daemon = True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+def mark_partial(cache, url, size):
+    body_path, meta_path = cache._paths(url)
+    meta = cache._read_meta(meta_path)
+    meta["complete"] = False
+    cache._write_meta(meta_path, meta)
+    with open(body_path, "r+b") as f:
+        f.truncate(size)
+
+
+def test_second_fetch_is_a_conditional_hit(server, tmp_path):
+    cache = DownloadCache(tmp_path)
+    url = f"{server}/Divvy_Trips_2019_Q4.zip"
+
+    first = cache.fetch(url)
+    second = cache.fetch(url)
+
+    assert first.status == "miss"
+    assert second.status == "hit"
+    assert second.content == BODY
+    assert Handler.requests_seen[-1]["If-None-Match"] == ETAG
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+    assert cache.stats["bytes_downloaded"] == len(BODY)
+
+
+def test_partial_download_is_resumed_with_range(server, tmp_path):
+    cache = DownloadCache(tmp_path)
+    url = f"{server}/Divvy_Trips_2019_Q4.zip"
+    cache.fetch(url)
+
+    # Simulate a run that died half way through the body.
+    mark_partial(cache, url, 1000)
+
+    resumed = DownloadCache(tmp_path).fetch(url)
+
+    assert resumed.status == "resumed"
+    assert resumed.content == BODY
+    assert Handler.requests_seen[-1]["Range"] == "bytes=1000-"
+
+
+def test_partial_entry_holding_the_whole_body_is_completed(server, tmp_path):
+    cache = DownloadCache(tmp_path)
+    url = f"{server}/Divvy_Trips_2019_Q4.zip"
+    cache.fetch(url)
+    # Died after the last byte was written but before the entry was marked complete.
+    mark_partial(cache, url, len(BODY))
+
+    cache = DownloadCache(tmp_path)
+    first = cache.fetch(url)
+    second = cache.fetch(url)
+
+    assert (first.status, second.status) == ("hit", "hit")
+    assert second.content == BODY
+    assert Handler.requests_seen[-1]["If-None-Match"] == ETAG
+    assert cache.stats["bytes_downloaded"] == 0
+
+
+def test_oversized_partial_entry_is_refetched(server, tmp_path):
+    cache = DownloadCache(tmp_path)
+    url = f"{server}/Divvy_Trips_2019_Q4.zip"
+    cache.fetch(url)
+    mark_partial(cache, url, len(BODY))
+    with open(cache._paths(url)[0], "ab") as f:
+        f.write(b"junk")
+
+    refetched = DownloadCache(tmp_path).fetch(url)
+
+    assert refetched.status == "miss"
+    assert refetched.content == BODY
+
+
+def test_refetch_releases_the_connection_first(server, tmp_path):
+    # With one pooled connection per host and pool_block, a refetch that
+    # still holds the first response would wait forever.
+    fetcher = Fetcher(per_host = 1)
+    cache = DownloadCache(tmp_path, session = fetcher.session)
+    url = f"{server}/Divvy_Trips_2019_Q4.zip"
+    cache.fetch(url)
+    mark_partial(cache, url, len(BODY))
+    with open(cache._paths(url)[0], "ab") as f:
+        f.write(b"junk")
+
+    results = []
+    worker = threading.Thread(target = lambda: results.append(cache.fetch(url)), daemon = True)
+    worker.start()
+    worker.join(timeout = 10)
+    fetcher.close()
+
+    assert not worker.is_alive()
+    assert results[0].status == "miss"
+    assert results[0].content == BODY
+
+def test_timeout_is_only_passed_when_given(mocker, tmp_path):
+    session = mocker.MagicMock()
+    session.get.return_value.__enter__.return_value.status_code = 404
+    session.get.return_value.__enter__.return_value.raise_for_status.side_effect = requests.HTTPError
+
+    for cache, expected in [(DownloadCache(tmp_path, session = session), {}),
+                            (DownloadCache(tmp_path, session = session, timeout = 5), {"timeout": 5})]:
+        with pytest.raises(requests.HTTPError):
+            cache.fetch("http://example.com/a.zip")
+        kwargs = session.get.call_args.kwargs
+        assert {k: v for k, v in kwargs.items() if k == "timeout"} == expected
+
+
+def test_lru_eviction_keeps_cache_under_limit(server, tmp_path):
+    cache = DownloadCache(tmp_path, max_bytes = int(len(BODY) * 2.5))
+    urls = [f"{server}/file-{i}.zip" for i in range(3)]
+
+    for url in urls[:2]:
+        cache.fetch(url)
+    # Touch the first entry so the second becomes least recently used.
+    cache.fetch(urls[0])
+    cache.fetch(urls[2])
+
+    assert cache.stats["evictions"] == 1
+    assert cache._paths(urls[0])[0].exists()
+    assert not cache._paths(urls[1])[0].exists()
+    assert cache._paths(urls[2])[0].exists()
+
+
+def test_eviction_skips_incomplete_entries(server, tmp_path):
+    cache = DownloadCache(tmp_path, max_bytes = int(len(BODY) * 1.5))
+    urls = [f"{server}/file-{i}.zip" for i in range(2)]
+    cache.fetch(urls[0])
+    # As if another worker were still streaming the first body.
+    mark_partial(cache, urls[0], 1000)
+    with open(cache._paths(urls[0])[0], "ab") as f:
+        f.write(BODY[1000:])
+
+    cache.fetch(urls[1])
+
+    assert cache.stats["evictions"] == 0
+    assert cache._paths(urls[0])[0].stat().st_size == len(BODY)
+
+def test_http_errors_are_raised(server, tmp_path):
+    cache = DownloadCache(tmp_path)
+
+    with pytest.raises(requests.HTTPError):
+        cache.fetch(f"{server}/missing.zip")
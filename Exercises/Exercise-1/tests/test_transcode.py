@@ -0,0 +1,127 @@
+import pytest
+import zipfile
+from datetime import datetime
+import sys
+import os
+
+import pyarrow.parquet as pq
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.main import extract_csv, get_data
+from src.transcode import SCHEMA, find_layout, transcode
+from tests.test_funcs import make_zip, mock_stream_response
+
+CSV_2019 = (
+    "trip_id,start_time,end_time,bikeid,tripduration,from_station_id,from_station_name,to_station_id,"
+    "to_station_name,usertype,gender,birthyear\n"
+    '25223640,2019-10-01 00:01:39,2019-10-01 00:17:20,2215,"1,090.0",20,Sheffield Ave,309,Leavitt St,'
+    "Subscriber,Male,1987\n"
+    "25223641,2019-10-01 00:02:16,2019-10-01 00:06:34,6328,258.0,19,Throop,241,Morgan,Customer,,\n"
+)
+
+CSV_2019_Q2 = (
+    '"01 - Rental Details Rental ID","01 - Rental Details Local Start Time","01 - Rental Details Local End Time",'
+    '"01 - Rental Details Bike ID","01 - Rental Details Duration In Seconds Uncapped",'
+    '"03 - Rental Start Station ID","03 - Rental Start Station Name","02 - Rental End Station ID",'
+    '"02 - Rental End Station Name","User Type","Member Gender","05 - Member Details Member Birthday Year"\n'
+    "22178529,2019-04-01 00:02:22,2019-04-01 00:09:48,6251,446.0,81,Daley Center Plaza,56,Desplaines St,"
+    "Subscriber,Male,1975.0\n"
+)
+
+CSV_2020 = (
+    '"ride_id","rideable_type","started_at","ended_at","start_station_name","start_station_id",'
+    '"end_station_name","end_station_id","start_lat","start_lng","end_lat","end_lng","member_casual"\n'
+    '"EACB19130B0CDA4A","docked_bike","2020-01-21 20:06:59","2020-01-21 20:14:30","Western Ave",239,'
+    '"Clark St",326,41.9665,-87.6884,41.9671,-87.6674,"casual"\n'
+)
+
+
+def transcode_text(tmp_path, text, **kwargs):
+    archive = make_zip(tmp_path / "trips.zip", "trips.csv", text.encode())
+    out_path = tmp_path / "trips.parquet"
+    with zipfile.ZipFile(archive) as z:
+        rows = transcode(lambda: z.open("trips.csv"), out_path, **kwargs)
+    return rows, pq.read_table(out_path)
+
+
+@pytest.mark.parametrize("text", [CSV_2019, CSV_2019_Q2, CSV_2020], ids = ["2019", "2019-Q2", "2020"])
+def test_every_layout_has_the_canonical_schema(tmp_path, text):
+    _, table = transcode_text(tmp_path, text)
+    assert table.schema == SCHEMA
+
+
+def test_transcode_2019(tmp_path):
+    rows, table = transcode_text(tmp_path, CSV_2019)
+    first, second = table.to_pylist()
+
+    assert rows == 2
+    assert first["start_time"] == datetime(2019, 10, 1, 0, 1, 39)
+    assert first["duration_seconds"] == 1090.0
+    assert (first["start_station_id"], first["end_station_id"]) == (20, 309)
+    assert (first["user_type"], second["user_type"]) == ("member", "casual")
+    assert (first["birth_year"], second["birth_year"]) == (1987, None)
+    assert second["gender"] is None
+    assert first["start_lat"] is None
+
+
+def test_transcode_2019_q2(tmp_path):
+    _, table = transcode_text(tmp_path, CSV_2019_Q2)
+    row = table.to_pylist()[0]
+
+    assert row["trip_id"] == "22178529"
+    assert row["end_station_name"] == "Desplaines St"
+    assert row["birth_year"] == 1975
+
+
+def test_transcode_2020_derives_duration(tmp_path):
+    _, table = transcode_text(tmp_path, CSV_2020)
+    row = table.to_pylist()[0]
+
+    assert row["duration_seconds"] == 451.0
+    assert row["rideable_type"] == "docked_bike"
+    assert row["user_type"] == "casual"
+    assert row["start_lat"] == 41.9665
+    assert row["bike_id"] is None
+
+
+def test_transcode_streams_into_row_groups(tmp_path):
+    header, line = CSV_2019.splitlines()[0], CSV_2019.splitlines()[2]
+    text = "\n".join([header] + [line] * 5000) + "\n"
+
+    rows, table = transcode_text(tmp_path, text, row_group_size = 1000, block_size = 16 * 1024)
+
+    assert rows == table.num_rows == 5000
+    assert pq.ParquetFile(tmp_path / "trips.parquet").metadata.num_row_groups == 5
+
+
+def test_find_layout_rejects_unknown_columns():
+    with pytest.raises(ValueError):
+        find_layout(["a", "b"])
+
+
+def test_get_data_parquet_output(mocker, tmp_path):
+    archive = make_zip(tmp_path / "Divvy_Trips_2019_Q4.zip", "Divvy_Trips_2019_Q4.csv", CSV_2019.encode())
+    (tmp_path / "downloads").mkdir()
+    mocker.patch("requests.Session.get", return_value = mock_stream_response(mocker, archive))
+
+    uri = "http://example.com/Divvy_Trips_2019_Q4.zip"
+    assert get_data(uri, tmp_path, output = "parquet") == "extracted"
+
+    # Only the Parquet file is written: no CSV and no partial file.
+    assert [p.name for p in (tmp_path / "downloads").iterdir()] == ["Divvy_Trips_2019_Q4.parquet"]
+    assert pq.read_table(tmp_path / "downloads" / "Divvy_Trips_2019_Q4.parquet").num_rows == 2
+
+    assert get_data(uri, tmp_path, output = "parquet") == "exists"
+    requests.Session.get.assert_called_once()
+
+
+def test_failed_transcode_leaves_no_part_file(tmp_path):
+    archive = make_zip(tmp_path / "Divvy_Trips_2019_Q4.zip", "Divvy_Trips_2019_Q4.csv", b"a,b\n1,2\n")
+    (tmp_path / "downloads").mkdir()
+
+    with open(archive, "rb") as f, pytest.raises(ValueError):
+        extract_csv(f, "http://example.com/Divvy_Trips_2019_Q4.zip", tmp_path, output = "parquet")
+
+    assert list((tmp_path / "downloads").iterdir()) == []
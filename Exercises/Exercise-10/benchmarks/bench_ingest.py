@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main as job
+
+# Daily durations over a synthetic Divvy CSV, three ways: the legacy
+# reader (string columns, to_timestamp, unix_timestamp, date_format), the
+# native reader over all 13 columns, and the native reader pruned to the
+# two timestamp columns the aggregate needs.
+#
+#   docker-compose run bench
+#   /spark/bin/spark-submit benchmarks/bench_ingest.py --rows 50000000
+
+BASE = 1685577600  # 2023-06-01 00:00:00 UTC
+
+
+def generate_csv(spark, path, rows, files):
+    # Written by Spark itself so tens of millions of rows take seconds.
+    from pyspark.sql import functions as F
+
+    start = F.lit(BASE) + (F.col("id") * 7919) % (30 * 86400)
+    df = spark.range(rows).select(
+        F.upper(F.hex(F.col("id") * 2654435761)).alias("ride_id"),
+        F.when(F.col("id") % 2 == 0, "electric_bike").otherwise("classic_bike").alias("rideable_type"),
+        F.from_unixtime(start).alias("started_at"),
+        F.from_unixtime(start + 60 + F.col("id") % 3600).alias("ended_at"),
+        F.concat(F.lit("Station "), (F.col("id") % 600).cast("string")).alias("start_station_name"),
+        (F.col("id") % 600).cast("string").alias("start_station_id"),
+        F.concat(F.lit("Station "), (F.col("id") % 601).cast("string")).alias("end_station_name"),
+        (F.col("id") % 601).cast("string").alias("end_station_id"),
+        (41.6 + F.rand(1) * 0.5).alias("start_lat"),
+        (-87.9 + F.rand(2) * 0.4).alias("start_lng"),
+        (41.6 + F.rand(3) * 0.5).alias("end_lat"),
+        (-87.9 + F.rand(4) * 0.4).alias("end_lng"),
+        F.when(F.col("id") % 3 == 0, "casual").otherwise("member").alias("member_casual"),
+    )
+    df.repartition(files).write.mode("overwrite").option("header", True).csv(path)
+
+
+def timed(label, rows, df):
+    start = time.perf_counter()
+    job.daily_durations(df).write.format("noop").mode("overwrite").save()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>28}: {elapsed:7.1f}s  {rows / elapsed / 1e6:6.2f}M rows/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise-10 CSV ingestion benchmark.")
+    parser.add_argument("--rows", type=int, default=20_000_000)
+    parser.add_argument("--files", type=int, default=16)
+    parser.add_argument("--shuffle-partitions", type=int, default=job.SHUFFLE_PARTITIONS)
+    args = parser.parse_args()
+
+    spark = job.get_spark()
+    spark.sparkContext.setLogLevel("WARN")
+    spark.conf.set("spark.sql.shuffle.partitions", args.shuffle_partitions)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "trips")
+        print(f"Generating {args.rows} trips...")
+        generate_csv(spark, path, args.rows, args.files)
+
+        try:
+            legacy = timed("legacy, all columns", args.rows, job.read_trips(spark, path, "legacy"))
+            timed("native, all columns", args.rows, job.read_trips(spark, path, "native"))
+            native = timed(
+                "native, pruned",
+                args.rows,
+                job.read_trips(spark, path, "native", job.AGGREGATE_COLUMNS),
+            )
+            print(f"{'speedup':>28}: {legacy / native:7.1f}x")
+        finally:
+            spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,260 @@
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import (
-    col,
-    to_timestamp,
-    unix_timestamp,
-    sum as _sum,
-    date_format,
-)
-from pyspark.sql.types import (
-    StructType,
-    StructField,
-    StringType,
-    DoubleType,
-    TimestampType,
-)
+import argparse
+import functools
+import logging
+import math
+import time
+from contextlib import contextmanager
 
-# Create a SparkSession
-spark = SparkSession.builder.appName("BikeRideDuration").getOrCreate()
-
-# Define the schema based on the provided CSV structure
-schema = StructType([
-    StructField("ride_id", StringType(), True),
-    StructField("rideable_type", StringType(), True),
-    StructField("started_at", StringType(), True),
-    StructField("ended_at", StringType(), True),
-    StructField("start_station_name", StringType(), True),
-    StructField("start_station_id", StringType(), True),
-    StructField("end_station_name", StringType(), True),
-    StructField("end_station_id", StringType(), True),
-    StructField("start_lat", DoubleType(), True),
-    StructField("start_lng", DoubleType(), True),
-    StructField("end_lat", DoubleType(), True),
-    StructField("end_lng", DoubleType(), True),
-    StructField("member_casual", StringType(), True),
-])
-
-input_csv_path = "data/202306-divvy-tripdata.csv"
-
-df = spark.read.csv(
-    input_csv_path,
-    header=True,
-    schema=schema,
-    mode="DROPMALFORMED"
-)
+# pyspark is imported inside the functions that use it, so importing this
+# module (from tests or a scheduler) stays cheap and never starts a JVM.
 
-df = df.withColumn(
-    "started_at", to_timestamp(col("started_at"), "yyyy-MM-dd HH:mm:ss")
-).withColumn(
-    "ended_at", to_timestamp(col("ended_at"), "yyyy-MM-dd HH:mm:ss")
+logging.basicConfig(
+    format="{asctime} | {levelname} | {message}",
+    style="{",
+    datefmt="%Y-%m-%d %H:%M",
+    level=logging.INFO
 )
 
-df = df.withColumn(
-    "duration_seconds",
-    unix_timestamp(col("ended_at")) - unix_timestamp(col("started_at"))
-)
+INPUT_PATH = "data/202306-divvy-tripdata.csv"
+OUTPUT_DIR = "results"
+# A month of trips is well under a GB and ~30 dates; Spark's default of 200
+# shuffle partitions would be mostly empty tasks.
+SHUFFLE_PARTITIONS = 8
+TIMESTAMP_FORMAT = "yyyy-MM-dd HH:mm:ss"
+# All the daily aggregate needs from each trip.
+AGGREGATE_COLUMNS = ["started_at", "ended_at"]
 
-df = df.withColumn(
-    "date", date_format(col("started_at"), "yyyy-MM-dd")
-)
 
-daily_durations = df.groupBy("date").agg(
-    _sum("duration_seconds").alias("total_duration_seconds")
-)
+@functools.lru_cache(maxsize=None)
+def get_spark():
+    from pyspark.sql import SparkSession
+
+    return SparkSession.builder.appName("BikeRideDuration").getOrCreate()
+
+
+@contextmanager
+def timed(stage, timings):
+    start = time.perf_counter()
+    yield
+    timings[stage] = time.perf_counter() - start
+    logging.info(f"{stage}: {timings[stage]:.2f}s")
+
+
+def trip_schema(timestamps=False):
+    from pyspark.sql.types import DoubleType, StringType, StructField, StructType, TimestampType
+
+    time_type = TimestampType() if timestamps else StringType()
+    return StructType([
+        StructField("ride_id", StringType(), True),
+        StructField("rideable_type", StringType(), True),
+        StructField("started_at", time_type, True),
+        StructField("ended_at", time_type, True),
+        StructField("start_station_name", StringType(), True),
+        StructField("start_station_id", StringType(), True),
+        StructField("end_station_name", StringType(), True),
+        StructField("end_station_id", StringType(), True),
+        StructField("start_lat", DoubleType(), True),
+        StructField("start_lng", DoubleType(), True),
+        StructField("end_lat", DoubleType(), True),
+        StructField("end_lng", DoubleType(), True),
+        StructField("member_casual", StringType(), True),
+    ])
+
+
+def read_trips_legacy(spark, input_path=INPUT_PATH):
+    from pyspark.sql.functions import col, date_format, to_timestamp, unix_timestamp
+
+    df = spark.read.csv(
+        input_path,
+        header=True,
+        schema=trip_schema(),
+        mode="DROPMALFORMED"
+    )
+
+    df = df.withColumn(
+        "started_at", to_timestamp(col("started_at"), "yyyy-MM-dd HH:mm:ss")
+    ).withColumn(
+        "ended_at", to_timestamp(col("ended_at"), "yyyy-MM-dd HH:mm:ss")
+    )
+
+    df = df.withColumn(
+        "duration_seconds",
+        unix_timestamp(col("ended_at")) - unix_timestamp(col("started_at"))
+    )
+
+    return df.withColumn(
+        "date", date_format(col("started_at"), "yyyy-MM-dd")
+    )
+
+
+def read_trips_native(spark, input_path=INPUT_PATH, columns=None):
+    # The CSV reader parses the timestamps itself, and with `columns` set
+    # only those are parsed at all (Spark prunes unread CSV columns).
+    from pyspark.sql.functions import col, to_date
+
+    df = spark.read.csv(
+        input_path,
+        header=True,
+        schema=trip_schema(timestamps=True),
+        timestampFormat=TIMESTAMP_FORMAT,
+        mode="DROPMALFORMED"
+    )
+    if columns is not None:
+        df = df.select(*columns)
+
+    return df.withColumn(
+        "duration_seconds",
+        col("ended_at").cast("long") - col("started_at").cast("long")
+    ).withColumn(
+        "date", to_date(col("started_at"))
+    )
+
+
+def read_trips(spark, input_path=INPUT_PATH, reader="native", columns=None):
+    if reader == "legacy":
+        return read_trips_legacy(spark, input_path)
+    return read_trips_native(spark, input_path, columns)
+
+
+def daily_durations(df):
+    from pyspark.sql.functions import sum as _sum
+
+    return df.groupBy("date").agg(
+        _sum("duration_seconds").alias("total_duration_seconds")
+    )
+
+
+def hadoop_path(spark, path):
+    # Filesystem-agnostic file listing and renames through the Hadoop API,
+    # so the lake can live on local disk, HDFS or S3 alike.
+    jpath = spark._jvm.org.apache.hadoop.fs.Path(path)
+    return jpath.getFileSystem(spark._jsc.hadoopConfiguration()), jpath
+
+
+def write_trips(df, trips_path):
+    # With dynamic partition overwrite only the dates present in df are
+    # replaced; every other partition in the lake is left alone.
+    df.repartition("date").write.mode("overwrite").partitionBy("date").parquet(trips_path)
+    return sorted(row["date"] for row in df.select("date").distinct().collect())
+
+
+def compact_partition(spark, lake_path, date, target_bytes):
+    partition_path = f"{lake_path}/date={date}"
+    fs, path = hadoop_path(spark, partition_path)
+    if not fs.exists(path):
+        return False
+
+    files = [f for f in fs.listStatus(path) if f.getPath().getName().endswith(".parquet")]
+    total = sum(f.getLen() for f in files)
+    n = max(1, math.ceil(total / target_bytes))
+    if n >= len(files):
+        return False
+
+    # Spark can't overwrite a path it is reading from: write the merged
+    # files under _compacting (hidden from partition discovery), then swap
+    # the directories.
+    tmp_path = f"{lake_path}/_compacting/date={date}"
+    spark.read.parquet(partition_path).repartition(n).write.mode("overwrite").parquet(tmp_path)
+    fs.delete(path, True)
+    fs.rename(spark._jvm.org.apache.hadoop.fs.Path(tmp_path), path)
+    logging.info(f"Compacted {partition_path}: {len(files)} files -> {n}.")
+    return True
+
+
+def compact_partitions(spark, lake_path, dates, target_bytes):
+    return sum(compact_partition(spark, lake_path, d, target_bytes) for d in dates)
+
+
+def update_daily_durations(spark, trips_path, daily_path, dates):
+    from pyspark.sql.functions import col
+
+    # Partition pruning means only the changed dates are read back.
+    changed = spark.read.parquet(trips_path).where(col("date").isin(dates))
+    daily = daily_durations(changed)
+    daily.repartition("date").write.mode("overwrite").partitionBy("date").parquet(daily_path)
+
+
+def run(
+    input_path=INPUT_PATH,
+    output_dir=OUTPUT_DIR,
+    incremental=False,
+    compact=False,
+    target_file_mb=128,
+    shuffle_partitions=SHUFFLE_PARTITIONS,
+    reader="native",
+):
+    timings = {}
+    with timed("start spark", timings):
+        spark = get_spark()
+        spark.conf.set("spark.sql.shuffle.partitions", shuffle_partitions)
+
+    # The lake keeps whole trips; the plain aggregate only needs two columns.
+    df = read_trips(spark, input_path, reader, None if incremental else AGGREGATE_COLUMNS)
+
+    if incremental:
+        spark.conf.set("spark.sql.sources.partitionOverwriteMode", "dynamic")
+        trips_path = f"{output_dir}/trips"
+        daily_path = f"{output_dir}/daily_durations"
+
+        # Cached: the partition write and the list of its dates both read it.
+        df = df.cache()
+        with timed("write trips", timings):
+            dates = write_trips(df, trips_path)
+        logging.info(f"Rewrote {len(dates)} date partitions in {trips_path}.")
+
+        if compact:
+            with timed("compact", timings):
+                compact_partitions(spark, trips_path, dates, target_file_mb * 1024 * 1024)
+
+        with timed("daily durations", timings):
+            update_daily_durations(spark, trips_path, daily_path, dates)
+
+    else:
+        with timed("daily durations", timings):
+            daily_durations(df).write.mode("overwrite").parquet(f"{output_dir}/output_file.parquet")
+
+    return timings
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Daily bike ride durations.")
+    parser.add_argument("--input", default=INPUT_PATH)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--shuffle-partitions", type=int, default=SHUFFLE_PARTITIONS)
+    parser.add_argument(
+        "--reader",
+        choices=["native", "legacy"],
+        default="native",
+        help="native: timestamps parsed by the CSV reader, unused columns pruned; legacy: strings + to_timestamp",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="write trips to a date-partitioned lake and only rebuild the dates in the input",
+    )
+    parser.add_argument("--compact", action="store_true", help="merge small files in the rewritten partitions")
+    parser.add_argument("--target-file-mb", type=int, default=128, help="compaction target file size")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        timings = run(
+            args.input,
+            args.output_dir,
+            args.incremental,
+            args.compact,
+            args.target_file_mb,
+            args.shuffle_partitions,
+            args.reader,
+        )
+        logging.info(f"Finished in {sum(timings.values()):.2f}s.")
 
-output_parquet_path = "results/output_file.parquet"
-daily_durations.write.mode("overwrite").parquet(output_parquet_path)
+    except Exception as e:
+        logging.error(f"Pipeline failed: {e.__class__.__name__}: {e}")
+        raise
 
 
+if __name__ == "__main__":
+    main()
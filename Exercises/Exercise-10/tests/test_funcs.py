@@ -0,0 +1,91 @@
+import subprocess
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+
+HEADER = ('"ride_id","rideable_type","started_at","ended_at","start_station_name","start_station_id",'
+          '"end_station_name","end_station_id","start_lat","start_lng","end_lat","end_lng","member_casual"')
+
+
+def trip(ride_id, started_at, ended_at):
+    return f'"{ride_id}","electric_bike","{started_at}","{ended_at}",,,,,41.91,-87.69,41.91,-87.7,"member"'
+
+
+def write_csv(path, rows):
+    path.write_text("\n".join([HEADER] + rows) + "\n")
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def spark():
+    from pyspark.sql import SparkSession
+    spark = SparkSession.builder.master("local[1]").appName("Exercise10-tests").getOrCreate()
+    yield spark
+    spark.stop()
+    main.get_spark.cache_clear()
+
+
+def test_import_does_not_load_pyspark():
+    code = "import sys, main; print('pyspark' in sys.modules, main.get_spark.cache_info().currsize)"
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(main.__file__),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert out.split() == ["False", "0"]
+
+
+@pytest.mark.parametrize("reader", ["native", "legacy"])
+def test_run_daily_durations(spark, tmp_path, reader):
+    path = write_csv(tmp_path / "trips.csv", [
+        trip("A", "2023-06-05 13:34:12", "2023-06-05 14:31:56"),
+        trip("B", "2023-06-05 01:30:22", "2023-06-05 01:33:06"),
+        trip("C", "2023-06-06 10:00:00", "2023-06-06 10:10:00"),
+    ])
+
+    timings = main.run(path, str(tmp_path / "results"), shuffle_partitions=2, reader=reader)
+
+    daily = spark.read.parquet(str(tmp_path / "results" / "output_file.parquet"))
+    assert {str(r.date): r.total_duration_seconds for r in daily.collect()} == {
+        "2023-06-05": 3464 + 164, "2023-06-06": 600
+    }
+    assert "daily durations" in timings
+    assert spark.conf.get("spark.sql.shuffle.partitions") == "2"
+
+
+def test_read_trips_native_prunes_columns(spark, tmp_path):
+    path = write_csv(tmp_path / "trips.csv", [trip("A", "2023-06-05 13:34:12", "2023-06-05 14:31:56")])
+
+    df = main.read_trips(spark, path, columns=main.AGGREGATE_COLUMNS)
+
+    assert df.columns == ["started_at", "ended_at", "duration_seconds", "date"]
+    assert dict(df.dtypes)["started_at"] == "timestamp"
+    assert dict(df.dtypes)["date"] == "date"
+    assert df.first().duration_seconds == 3464
+
+
+def test_run_incremental_only_rewrites_new_dates(spark, tmp_path):
+    results = str(tmp_path / "results")
+    main.run(write_csv(tmp_path / "day1.csv", [
+        trip("A", "2023-06-05 13:34:12", "2023-06-05 14:31:56"),
+        trip("C", "2023-06-06 10:00:00", "2023-06-06 10:10:00"),
+    ]), results, incremental=True, compact=True, shuffle_partitions=2)
+    main.run(write_csv(tmp_path / "day2.csv", [
+        trip("D", "2023-06-06 11:00:00", "2023-06-06 11:01:00"),
+        trip("E", "2023-06-07 09:00:00", "2023-06-07 09:02:00"),
+    ]), results, incremental=True, shuffle_partitions=2)
+
+    trips = spark.read.parquet(f"{results}/trips")
+    assert sorted(r.ride_id for r in trips.collect()) == ["A", "D", "E"]
+
+    daily = spark.read.parquet(f"{results}/daily_durations")
+    assert {str(r.date): r.total_duration_seconds for r in daily.collect()} == {
+        "2023-06-05": 3464, "2023-06-06": 60, "2023-06-07": 120
+    }
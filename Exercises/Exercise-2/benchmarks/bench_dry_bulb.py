@@ -0,0 +1,103 @@
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from http_cache import CachedResponse
+from main import get_highest_hourly_dry_bulb_temp
+
+# Whole-file vs chunked reader on a synthetic LCD file. Each mode runs in its
+# own process so peak RSS is measured independently.
+
+EXTRA_COLUMNS = [
+    "REPORT_TYPE", "SOURCE", "HourlyAltimeterSetting", "HourlyDewPointTemperature",
+    "HourlyPrecipitation", "HourlyPresentWeatherType", "HourlyPressureChange",
+    "HourlyPressureTendency", "HourlyRelativeHumidity", "HourlySkyConditions",
+    "HourlySeaLevelPressure", "HourlyStationPressure", "HourlyVisibility",
+    "HourlyWetBulbTemperature", "HourlyWindDirection", "HourlyWindGustSpeed",
+    "HourlyWindSpeed", "DailyAverageDryBulbTemperature", "DailyMaximumDryBulbTemperature",
+    "DailyMinimumDryBulbTemperature", "REM",
+]
+
+
+def generate(path, rows, batch = 250_000):
+    rng = np.random.default_rng(0)
+    start = pd.Timestamp("2021-01-01")
+
+    with open(path, "w", encoding = "utf-8") as f:
+        for offset in range(0, rows, batch):
+            n = min(batch, rows - offset)
+            temps = rng.integers(-20, 105, n).astype(str).astype(object)
+            suspect = rng.random(n) < 0.02
+            temps[suspect] = temps[suspect] + "s"
+            temps[rng.random(n) < 0.01] = "M"
+
+            df = pd.DataFrame({
+                "STATION": "01001099999",
+                "DATE": (start + pd.to_timedelta(np.arange(offset, offset + n) * 20, unit = "min")).strftime("%Y-%m-%dT%H:%M:%S"),
+                "HourlyDryBulbTemperature": temps,
+            })
+            for col in EXTRA_COLUMNS:
+                df[col] = rng.integers(0, 1000, n)
+            df["REM"] = "MET10301/01/21 00:20:02 METAR ENJA 010020Z AUTO 05013KT 9999 FEW009 M01/M03 Q1007"
+
+            df.to_csv(f, header = offset == 0, index = False)
+
+
+def run_one(mode, path, chunksize):
+    logging.getLogger().setLevel(logging.WARNING)
+    csv_res = CachedResponse("file://" + str(path), Path(path), "hit")
+
+    start = time.perf_counter()
+    if mode == "whole":
+        res = get_highest_hourly_dry_bulb_temp(csv_res)
+    else:
+        res = get_highest_hourly_dry_bulb_temp(csv_res, chunksize = chunksize)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "mode": mode,
+        "seconds": elapsed,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rows": len(res),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Whole-file vs chunked dry bulb reader.")
+    parser.add_argument("--rows", type = int, default = 2_000_000)
+    parser.add_argument("--chunksize", type = int, default = 100_000)
+    parser.add_argument("--file", type = Path, default = Path("bench_lcd.csv"))
+    parser.add_argument("--run-mode", choices = ["whole", "chunked"], help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_one(args.run_mode, args.file, args.chunksize)
+        return
+
+    if not args.file.exists():
+        print(f"Generating {args.rows} rows into {args.file}...")
+        generate(args.file, args.rows)
+    print(f"File size: {args.file.stat().st_size / 1024 ** 2:.0f} MB")
+
+    for mode in ("whole", "chunked"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--run-mode", mode, "--file", str(args.file), "--chunksize", str(args.chunksize)],
+            check = True, capture_output = True, text = True,
+        ).stdout
+        res = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:>8}: {res['seconds']:6.2f}s  peak RSS {res['max_rss_mb']:7.0f} MB  ({res['rows']} max rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+import urllib3
+
+from fetch import default_fetcher, reset_default_fetcher
+from main import TEMP_COLUMN, TEMP_COLUMNS, get_csv, open_csv_stream, parse_temperature
+
+# Batch mode: max dry bulb temperature across every station file in one year's
+# NOAA directory. The listing is fetched and parsed once, each file is
+# streamed and reduced to its own top N rows in a worker process, and the
+# per-file results are merged into a global top N.
+
+URL = "https://www.ncei.noaa.gov/data/local-climatological-data/access/2021/"
+
+# One row of the Apache index: file name, last modified, size.
+LISTING_RE = re.compile(
+    r'<a href="([^"/?]+\.csv)">[^<]*</a></td>\s*'
+    r'<td[^>]*>\s*([^<]*?)\s*</td>\s*'
+    r'<td[^>]*>\s*([^<]*?)\s*</td>'
+)
+
+
+def list_csv_files(url, fetcher = None):
+    logging.info(f"Listing {url}...")
+    res = (fetcher or default_fetcher()).get(url)
+    res.raise_for_status()
+
+    files = [
+        {"name": name, "modified": modified, "size": size}
+        for name, modified, size in LISTING_RE.findall(res.text)
+    ]
+    logging.info(f"Found {len(files)} CSV files.")
+    return files
+
+
+def merge_top_n(best, df, n):
+    if df is None or df.empty:
+        return best
+    if best is None:
+        return df.nlargest(n, TEMP_COLUMN, keep = "all")
+    return pd.concat([best, df]).nlargest(n, TEMP_COLUMN, keep = "all")
+
+
+def top_n_dry_bulb_temps(csv_res, n, chunksize = 100_000):
+    best = None
+    with open_csv_stream(csv_res) as stream:
+        reader = pd.read_csv(
+            stream,
+            usecols = TEMP_COLUMNS,
+            dtype = {col: "str" for col in TEMP_COLUMNS},
+            chunksize = chunksize,
+        )
+        for chunk in reader:
+            chunk[TEMP_COLUMN] = parse_temperature(chunk[TEMP_COLUMN])
+            best = merge_top_n(best, chunk.dropna(subset = [TEMP_COLUMN]), n)
+        nbytes = stream.tell()
+
+    return best, nbytes
+
+
+def process_file(url, fname, n, chunksize):
+    # Runs in a worker process, on that process's own pooled fetcher.
+    csv_res = get_csv(url, fname, stream = True)
+    if csv_res is None:
+        return fname, None, 0
+
+    try:
+        best, nbytes = top_n_dry_bulb_temps(csv_res, n, chunksize)
+    # The body is read off csv_res.raw, so a dropped or short transfer
+    # surfaces as a urllib3 error rather than a requests one.
+    except (pd.errors.ParserError, requests.RequestException, urllib3.exceptions.HTTPError, ValueError) as e:
+        logging.error(f"Failed to process {fname}: {e}")
+        return fname, None, 0
+    finally:
+        csv_res.close()
+
+    return fname, best, nbytes
+
+
+def run_batch(url = URL, workers = 4, n = 10, chunksize = 100_000, limit = None, progress_every = 25):
+    files = list_csv_files(url)
+    if limit is not None:
+        files = files[:limit]
+
+    best = None
+    done = failed = total_bytes = 0
+    start = time.perf_counter()
+
+    # Forked workers inherit the fetcher used for the listing, keep-alive
+    # socket included; each must open its own connections instead.
+    with ProcessPoolExecutor(max_workers = workers, initializer = reset_default_fetcher) as pool:
+        futures = [pool.submit(process_file, url, f["name"], n, chunksize) for f in files]
+
+        for future in as_completed(futures):
+            fname, df, nbytes = future.result()
+            done += 1
+            total_bytes += nbytes
+            if df is None:
+                failed += 1
+            best = merge_top_n(best, df, n)
+
+            if done % progress_every == 0 or done == len(files):
+                elapsed = time.perf_counter() - start
+                logging.info(
+                    f"{done}/{len(files)} files | {done / elapsed:.1f} files/s | "
+                    f"{total_bytes / 1024 ** 2 / elapsed:.1f} MB/s | {failed} failed"
+                )
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Top dry bulb temperatures across a NOAA LCD directory.")
+    parser.add_argument("--url", default = URL)
+    parser.add_argument("--workers", type = int, default = 4)
+    parser.add_argument("--top", type = int, default = 10)
+    parser.add_argument("--chunksize", type = int, default = 100_000)
+    parser.add_argument("--limit", type = int, help = "only process the first N files")
+    args = parser.parse_args()
+
+    res = run_batch(args.url, args.workers, args.top, args.chunksize, args.limit)
+
+    logging.info(f"Top {args.top} hourly dry bulb temperatures:")
+    print(res)
+
+
+if __name__ == "__main__":
+    main()
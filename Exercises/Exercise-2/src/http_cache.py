@@ -0,0 +1,211 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+# On-disk cache for HTTP downloads, keyed by URL. The same module lives in
+# Exercise-1 and Exercise-2; keep the two copies in sync.
+#
+# Each entry is a body file plus a small JSON sidecar holding the validators
+# (ETag / Last-Modified) the server gave us. Complete entries are revalidated
+# with a conditional GET, partial entries are resumed with a Range request,
+# and the whole directory is kept under max_bytes by evicting the least
+# recently used entries.
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class CachedResponse:
+    def __init__(self, url, path, status):
+        self.url = url
+        self.path = path
+        self.status = status
+
+    @property
+    def content(self):
+        return self.path.read_bytes()
+
+    def open(self):
+        return open(self.path, "rb")
+
+
+class DownloadCache:
+    def __init__(self, cache_dir, max_bytes = 2 * 1024 ** 3, session = None, timeout = None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents = True, exist_ok = True)
+        self.max_bytes = max_bytes
+        self.session = session if session is not None else requests
+        self.timeout = timeout
+        self.stats = {"hits": 0, "misses": 0, "resumes": 0, "evictions": 0, "bytes_downloaded": 0}
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.json"
+
+    def _read_meta(self, meta_path):
+        try:
+            with open(meta_path, encoding = "utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self, meta_path, meta):
+        tmp_path = meta_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding = "utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _count(self, stat, n = 1):
+        with self._lock:
+            self.stats[stat] += n
+
+    def fetch(self, url):
+        body_path, meta_path = self._paths(url)
+        meta = self._read_meta(meta_path)
+        if meta is not None and not body_path.exists():
+            meta = None
+
+        headers = {}
+        offset = 0
+        validator = None
+        if meta is not None:
+            validator = meta.get("etag") or meta.get("last_modified")
+
+        if meta is not None and meta["complete"]:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        elif meta is not None and validator:
+            # Only resume when the server can tell us the entity hasn't changed.
+            offset = body_path.stat().st_size
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+
+        # A Fetcher session brings its own (connect, read) timeout; only
+        # override it when the caller asked for one.
+        kwargs = {"timeout": self.timeout} if self.timeout is not None else {}
+        with self.session.get(url, headers = headers, stream = True, **kwargs) as res:
+            if res.status_code == 304:
+                logging.info(f"Cache hit for {url}.")
+                meta["last_access"] = time.time()
+                self._write_meta(meta_path, meta)
+                self._count("hits")
+                return CachedResponse(url, body_path, "hit")
+
+            if res.status_code == 416 and offset:
+                # The partial entry already holds every byte there is.
+                if content_range_total(res) == offset:
+                    logging.info(f"Cache hit for {url}, partial entry was complete.")
+                    meta["complete"] = True
+                    meta["size"] = offset
+                    meta["last_access"] = time.time()
+                    self._write_meta(meta_path, meta)
+                    self._count("hits")
+                    return CachedResponse(url, body_path, "hit")
+                # Longer than the entity, or no length given: start over.
+                # Release the connection first; with a blocking pool of one
+                # the refetch would wait for it forever.
+                res.close()
+                self.invalidate(url)
+                return self.fetch(url)
+
+            res.raise_for_status()
+
+            if res.status_code == 206 and content_range_start(res) != offset:
+                # Not the range we asked for; drop the partial body and start over.
+                res.close()
+                self.invalidate(url)
+                return self.fetch(url)
+
+            if res.status_code == 206:
+                logging.info(f"Resuming {url} from byte {offset}.")
+                mode = "ab"
+                status = "resumed"
+                self._count("resumes")
+            else:
+                mode = "wb"
+                status = "miss"
+                self._count("misses")
+
+            meta = {
+                "url": url,
+                "etag": res.headers.get("ETag"),
+                "last_modified": res.headers.get("Last-Modified"),
+                "complete": False,
+                "size": 0,
+                "last_access": time.time(),
+            }
+            # Record the validators before streaming so an interrupted
+            # download can be resumed on the next run.
+            self._write_meta(meta_path, meta)
+
+            with open(body_path, mode) as f:
+                for chunk in res.iter_content(chunk_size = CHUNK_SIZE):
+                    f.write(chunk)
+                    self._count("bytes_downloaded", len(chunk))
+
+        meta["complete"] = True
+        meta["size"] = body_path.stat().st_size
+        self._write_meta(meta_path, meta)
+
+        self.evict(keep = body_path)
+        return CachedResponse(url, body_path, status)
+
+    def invalidate(self, url):
+        for p in self._paths(url):
+            p.unlink(missing_ok = True)
+
+    def evict(self, keep = None):
+        with self._lock:
+            entries = []
+            for meta_path in self.cache_dir.glob("*.json"):
+                meta = self._read_meta(meta_path)
+                body_path = meta_path.with_suffix(".body")
+                # An incomplete entry may be downloading right now, in this
+                # process or another; it is left for its next fetch to finish.
+                if meta is None or not meta.get("complete") or not body_path.exists():
+                    continue
+                entries.append((meta.get("last_access", 0), body_path.stat().st_size, body_path, meta_path))
+
+            total = sum(size for _, size, _, _ in entries)
+            for _, size, body_path, meta_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if body_path == keep:
+                    continue
+                logging.info(f"Evicting {body_path.name} from cache ({size} bytes).")
+                body_path.unlink(missing_ok = True)
+                meta_path.unlink(missing_ok = True)
+                total -= size
+                self.stats["evictions"] += 1
+
+    def report(self):
+        logging.info(
+            "Cache stats: {hits} hits, {misses} misses, {resumes} resumes, "
+            "{evictions} evictions, {bytes_downloaded} bytes downloaded.".format(**self.stats)
+        )
+
+
+def content_range_total(res):
+    # "bytes */200" or "bytes 100-199/200" -> 200
+    value = res.headers.get("Content-Range", "")
+    try:
+        return int(value.rsplit("/", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def content_range_start(res):
+    # "bytes 100-199/200" -> 100
+    value = res.headers.get("Content-Range", "")
+    try:
+        return int(value.split()[1].split("-")[0])
+    except (IndexError, ValueError):
+        return None
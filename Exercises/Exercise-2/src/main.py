@@ -3,6 +3,10 @@ import pandas as pd
 import logging
 from bs4 import BeautifulSoup
 from io import StringIO
+from pathlib import Path
+
+from fetch import Fetcher, default_fetcher
+from http_cache import DownloadCache
 
 logging.basicConfig(
     format="{asctime} | {levelname} | {message}",
@@ -11,11 +15,19 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-def find_csv_filename(url, date):
+TEMP_COLUMN = "HourlyDryBulbTemperature"
+# Columns read by the chunked reader; everything else in the LCD file is skipped.
+TEMP_COLUMNS = ["STATION", "DATE", TEMP_COLUMN]
+
+
+def find_csv_filename(url, date, cache = None, fetcher = None):
     try:
         logging.info("Scanning for CSV file...")
-        html = requests.get(url)
-        html.raise_for_status()
+        if cache is not None:
+            html = cache.fetch(url)
+        else:
+            html = (fetcher or default_fetcher()).get(url)
+            html.raise_for_status()
 
         soup = BeautifulSoup(html.content, "html.parser")
         target = soup.find("td", string = date)
@@ -32,12 +44,17 @@ def find_csv_filename(url, date):
         logging.error(f"An unexpected error occurred: {e}")
 
 
-def get_csv(url, fname):
+def get_csv(url, fname, cache = None, fetcher = None, stream = False):
     target = f"{url}{fname}"
 
     try:
         logging.info(f"Downloading {fname} from {target}.")
-        f = requests.get(target)
+        if cache is not None:
+            return cache.fetch(target)
+
+        # stream=True leaves the body on the socket for the chunked reader.
+        kwargs = {"stream": True} if stream else {}
+        f = (fetcher or default_fetcher()).get(target, **kwargs)
         f.raise_for_status()
         return f
     
@@ -49,7 +66,10 @@ def get_csv(url, fname):
         logging.error(f"An unexpected error occurred: {e}")
 
     
-def get_highest_hourly_dry_bulb_temp(csv_res):
+def get_highest_hourly_dry_bulb_temp(csv_res, chunksize = None, usecols = TEMP_COLUMNS):
+    if chunksize is not None:
+        return get_highest_hourly_dry_bulb_temp_chunked(csv_res, chunksize, usecols)
+
     try:
         logging.info("Reading in CSV...")
         df = pd.read_csv(StringIO(csv_res.content.decode('utf-8')))
@@ -73,15 +93,70 @@ def get_highest_hourly_dry_bulb_temp(csv_res):
         logging.error(f"An unexpected exception occurred: {e}")
 
 
+def open_csv_stream(csv_res):
+    # Cached downloads are files on disk; live responses are read off the socket.
+    if hasattr(csv_res, "open"):
+        return csv_res.open()
+    csv_res.raw.decode_content = True
+    return csv_res.raw
+
+
+def parse_temperature(col):
+    # LCD temperatures are whole degrees F with an "s" suffix for suspect
+    # values; "M", "*" and blanks become NaN rather than 0.
+    return pd.to_numeric(col.str.rstrip("s"), errors = "coerce")
+
+
+def get_highest_hourly_dry_bulb_temp_chunked(csv_res, chunksize, usecols = TEMP_COLUMNS):
+    try:
+        logging.info(f"Streaming CSV in chunks of {chunksize} rows...")
+        dtype = None if usecols is None else {col: "str" for col in usecols}
+
+        max_val = None
+        best = []
+        with open_csv_stream(csv_res) as stream:
+            reader = pd.read_csv(stream, usecols = usecols, dtype = dtype, chunksize = chunksize)
+
+            # Keep only the running max and the rows that match it.
+            for chunk in reader:
+                temps = parse_temperature(chunk[TEMP_COLUMN].astype(str))
+                chunk_max = temps.max()
+                if pd.isna(chunk_max) or (max_val is not None and chunk_max < max_val):
+                    continue
+
+                rows = chunk.loc[temps == chunk_max].assign(**{TEMP_COLUMN: temps[temps == chunk_max]})
+                if max_val is None or chunk_max > max_val:
+                    max_val = chunk_max
+                    best = [rows]
+                else:
+                    best.append(rows)
+
+        if not best:
+            logging.warning(f"No {TEMP_COLUMN} readings found.")
+            return None
+
+        return pd.concat(best)
+
+    except pd.errors.EmptyDataError as e:
+        logging.error(f"Empty file: {e}")
+    except pd.errors.ParserError as e:
+        logging.error(f"Error parsing file: {e}")
+    except Exception as e:
+        logging.error(f"An unexpected exception occurred: {e}")
+
+
 def main():
     url = "https://www.ncei.noaa.gov/data/local-climatological-data/access/2021/"
     date = "2024-01-19 10:27  "
+    fetcher = Fetcher()
+    cache = DownloadCache(Path(__file__).resolve().parents[1] / "cache", session = fetcher)
 
-    csv_name = find_csv_filename(url, date)
+    csv_name = find_csv_filename(url, date, cache, fetcher)
 
-    csv_file = get_csv(url, csv_name)
+    csv_file = get_csv(url, csv_name, cache, fetcher)
+    cache.report()
 
-    res = get_highest_hourly_dry_bulb_temp(csv_file)
+    res = get_highest_hourly_dry_bulb_temp(csv_file, chunksize = 100_000)
 
     logging.info("Row with highest hourly dry bulb temperature found:")
     print(res)
@@ -0,0 +1,140 @@
+import sys
+import os
+import threading
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from batch import list_csv_files, merge_top_n, top_n_dry_bulb_temps, run_batch
+
+LISTING = b'''<html><body><table>
+<tr><th><a href="?C=N;O=D">Name</a></th><th><a href="?C=M;O=A">Last modified</a></th><th><a href="?C=S;O=A">Size</a></th></tr>
+<tr><td><a href="/data/local-climatological-data/access/">Parent Directory</a></td><td>&nbsp;</td><td align="right">  - </td><td>&nbsp;</td></tr>
+<tr><td><a href="01001099999.csv">01001099999.csv</a></td><td align="right">2024-01-19 09:51  </td><td align="right">4.0M</td><td>&nbsp;</td></tr>
+<tr><td><a href="01001499999.csv">01001499999.csv</a></td><td align="right">2024-01-19 10:27  </td><td align="right">1.2M</td><td>&nbsp;</td></tr>
+</table></body></html>'''
+
+STATIONS = {
+    "/01001099999.csv": b'"STATION","DATE","HourlyDryBulbTemperature"\n"A","d1","50"\n"A","d2","88s"\n"A","d3","M"\n',
+    "/01001499999.csv": b'"STATION","DATE","HourlyDryBulbTemperature"\n"B","d1","91"\n"B","d2","-4"\n"B","d3","88"\n',
+}
+
+
+def test_list_csv_files(mocker):
+    fetcher = mocker.MagicMock()
+    fetcher.get.return_value.text = LISTING.decode()
+
+    files = list_csv_files("http://example.com/", fetcher = fetcher)
+
+    assert files == [
+        {"name": "01001099999.csv", "modified": "2024-01-19 09:51", "size": "4.0M"},
+        {"name": "01001499999.csv", "modified": "2024-01-19 10:27", "size": "1.2M"},
+    ]
+
+
+def test_top_n_dry_bulb_temps(mocker):
+    csv_res = mocker.MagicMock(spec = ["raw"])
+    csv_res.raw = BytesIO(STATIONS["/01001499999.csv"])
+
+    best, nbytes = top_n_dry_bulb_temps(csv_res, 2, chunksize = 1)
+
+    assert list(best["HourlyDryBulbTemperature"]) == [91, 88]
+    assert nbytes == len(STATIONS["/01001499999.csv"])
+
+
+def test_merge_top_n_keeps_ties():
+    a = pd.DataFrame({"STATION": ["A", "A"], "HourlyDryBulbTemperature": [90.0, 80.0]})
+    b = pd.DataFrame({"STATION": ["B", "B"], "HourlyDryBulbTemperature": [90.0, 70.0]})
+
+    best = merge_top_n(merge_top_n(None, a, 1), b, 1)
+
+    assert list(best["STATION"]) == ["A", "B"]
+    assert merge_top_n(best, None, 1) is best
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = LISTING if self.path == "/" else STATIONS.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_run_batch_merges_every_station():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target = httpd.serve_forever, daemon = True).start()
+    try:
+        best = run_batch(f"http://127.0.0.1:{httpd.server_port}/", workers = 2, n = 3)
+    finally:
+        httpd.shutdown()
+
+    # Files finish in any order, so compare the merged rows as a set.
+    assert sorted(zip(best["STATION"], best["HourlyDryBulbTemperature"])) == [("A", 88), ("B", 88), ("B", 91)]
+
+
+class KeepAliveHandler(Handler):
+    # HTTP/1.1 keeps each connection open between requests, as real servers do.
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        KeepAliveHandler.requests.append((self.path, self.client_address))
+        super().do_GET()
+
+
+def test_run_batch_workers_open_their_own_connections(mocker):
+    stations = {f"/{i:011d}.csv": f'"STATION","DATE","HourlyDryBulbTemperature"\n"S{i}","d1","{i}"\n'.encode()
+                for i in range(40)}
+    listing = "".join(
+        f'<tr><td><a href="{path[1:]}">{path[1:]}</a></td><td align="right">2024-01-19 09:51  </td>'
+        f'<td align="right">1.0K</td><td>&nbsp;</td></tr>\n' for path in stations
+    ).encode()
+    mocker.patch.dict(STATIONS, stations, clear = True)
+    mocker.patch(f"{__name__}.LISTING", listing)
+    KeepAliveHandler.requests = []
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target = httpd.serve_forever, daemon = True).start()
+    try:
+        best = run_batch(f"http://127.0.0.1:{httpd.server_port}/", workers = 4, n = 40)
+    finally:
+        httpd.shutdown()
+
+    assert sorted(best["STATION"]) == sorted(f"S{i}" for i in range(40))
+    # No worker reused the parent's listing connection.
+    listing_client = [client for path, client in KeepAliveHandler.requests if path == "/"]
+    assert len(listing_client) == 1
+    assert all(client != listing_client[0] for path, client in KeepAliveHandler.requests if path != "/")
+
+
+class TruncatingHandler(Handler):
+    # Promises more bytes than it sends for one station, then hangs up.
+    def do_GET(self):
+        if self.path != "/01001099999.csv":
+            super().do_GET()
+            return
+        body = STATIONS[self.path]
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body) + 1000))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_run_batch_counts_a_truncated_file_as_failed():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), TruncatingHandler)
+    threading.Thread(target = httpd.serve_forever, daemon = True).start()
+    try:
+        best = run_batch(f"http://127.0.0.1:{httpd.server_port}/", workers = 2, n = 3)
+    finally:
+        httpd.shutdown()
+
+    assert sorted(zip(best["STATION"], best["HourlyDryBulbTemperature"])) == [("B", -4), ("B", 88), ("B", 91)]
@@ -3,22 +3,24 @@ import os
 import pytest
 import requests
 import pandas as pd
-from io import StringIO
+from io import BytesIO, StringIO
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
 from main import find_csv_filename, get_csv, get_highest_hourly_dry_bulb_temp
+from http_cache import CachedResponse
 
 def test_find_csv_filename(mocker):
     mock_res = mocker.MagicMock(spec = requests.Response)
     mock_res.content = b'<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 3.2 Final//EN">\n<html>\n <head>\n  <title>Index of /data/local-climatological-data/access/2021</title>\n </head>\n <body>\n<h1>Index of /data/local-climatological-data/access/2021</h1>\n  <table>\n   <tr><th><a href="?C=N;O=D">Name</a></th><th><a href="?C=M;O=A">Last modified</a></th><th><a href="?C=S;O=A">Size</a></th><th><a href="?C=D;O=A">Description</a></th></tr>\n   <tr><th colspan="4"><hr></th></tr>\n<tr><td><a href="/data/local-climatological-data/access/">Parent Directory</a></td><td>&nbsp;</td><td align="right">  - </td><td>&nbsp;</td></tr>\n<tr><td><a href="01001099999.csv">01001099999.csv</a></td><td align="right">2024-01-19 09:51  </td><td align="right">4.0M</td><td>&nbsp;</td></tr>'
     mock_res.raise_for_status.return_value = None
 
-    mocker.patch("requests.get", return_value = mock_res)
+    mock_res.status_code = 200
+    mocker.patch("requests.Session.get", return_value = mock_res)
 
     res = find_csv_filename("http://www.example.com", "2024-01-19 09:51  ")
 
-    requests.get.assert_called_once_with("http://www.example.com")
+    requests.Session.get.assert_called_once_with("http://www.example.com", timeout = (5, 60))
     
     assert res == "01001099999.csv"
 
@@ -28,11 +30,12 @@ def test_get_csv(mocker):
     mock_res.content = b"Don't get testy with me."
     mock_res.raise_for_status.return_value = None
 
-    mocker.patch("requests.get", return_value = mock_res)
+    mock_res.status_code = 200
+    mocker.patch("requests.Session.get", return_value = mock_res)
 
     res = get_csv("http://example.com/", "testfile.csv")
 
-    requests.get.assert_called_once_with("http://example.com/testfile.csv")
+    requests.Session.get.assert_called_once_with("http://example.com/testfile.csv", timeout = (5, 60))
 
     assert res.content == b"Don't get testy with me."
 
@@ -48,4 +51,88 @@ def test_get_highest_hourly_dry_bulb_temp(mocker):
     res = get_highest_hourly_dry_bulb_temp(mock_res)
 
     expected = pd.DataFrame({"col1": ["test1"], "HourlyDryBulbTemperature": [20]})
-    pd.testing.assert_frame_equal(res, expected)
\ No newline at end of file
+    pd.testing.assert_frame_equal(res, expected)
+
+
+def test_get_csv_uses_cache(mocker):
+    mock_cache = mocker.MagicMock()
+    mock_cache.fetch.return_value.content = b"cached"
+    mocker.patch("requests.Session.get")
+
+    res = get_csv("http://example.com/", "testfile.csv", cache = mock_cache)
+
+    mock_cache.fetch.assert_called_once_with("http://example.com/testfile.csv")
+    requests.Session.get.assert_not_called()
+    assert res.content == b"cached"
+
+
+def test_find_csv_filename_uses_cache(mocker):
+    mock_cache = mocker.MagicMock()
+    mock_cache.fetch.return_value.content = b'<table><tr><td><a href="01001099999.csv">01001099999.csv</a></td><td align="right">2024-01-19 09:51  </td></tr></table>'
+
+    res = find_csv_filename("http://www.example.com", "2024-01-19 09:51  ", cache = mock_cache)
+
+    mock_cache.fetch.assert_called_once_with("http://www.example.com")
+    assert res == "01001099999.csv"
+
+
+def test_get_csv_uses_given_fetcher(mocker):
+    fetcher = mocker.MagicMock()
+    fetcher.get.return_value.content = b"pooled"
+
+    res = get_csv("http://example.com/", "testfile.csv", fetcher = fetcher)
+
+    fetcher.get.assert_called_once_with("http://example.com/testfile.csv")
+    assert res.content == b"pooled"
+
+
+LCD_SAMPLE = (
+    b'"STATION","DATE","REPORT_TYPE","HourlyDryBulbTemperature","HourlyWindSpeed"\n'
+    b'"01001099999","2021-01-01T00:20:00","FM-15","-5","7"\n'
+    b'"01001099999","2021-01-01T01:20:00","FM-15","71s","7"\n'
+    b'"01001099999","2021-01-01T02:20:00","FM-15","M","7"\n'
+    b'"01001099999","2021-01-01T03:20:00","FM-15","","7"\n'
+    b'"01001099999","2021-01-01T04:20:00","FM-15","68","7"\n'
+    b'"01001099999","2021-01-01T05:20:00","FM-15","71","7"\n'
+    b'"01001099999","2021-01-01T06:20:00","FM-15","*","7"\n'
+)
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 3, 100])
+def test_get_highest_hourly_dry_bulb_temp_chunked(tmp_path, chunksize):
+    csv_path = tmp_path / "01001099999.csv"
+    csv_path.write_bytes(LCD_SAMPLE)
+
+    res = get_highest_hourly_dry_bulb_temp(CachedResponse("http://example.com/", csv_path, "hit"), chunksize = chunksize)
+
+    # Ties in different chunks are all kept, and only the requested columns are read.
+    assert list(res.columns) == ["STATION", "DATE", "HourlyDryBulbTemperature"]
+    assert list(res["DATE"]) == ["2021-01-01T01:20:00", "2021-01-01T05:20:00"]
+    assert list(res["HourlyDryBulbTemperature"]) == [71, 71]
+    assert list(res.index) == [1, 5]
+
+
+def test_get_highest_hourly_dry_bulb_temp_chunked_from_response(mocker):
+    mock_res = mocker.MagicMock(spec = requests.Response)
+    mock_res.raw = BytesIO(LCD_SAMPLE)
+
+    res = get_highest_hourly_dry_bulb_temp(mock_res, chunksize = 2)
+
+    assert list(res["HourlyDryBulbTemperature"]) == [71, 71]
+
+
+def test_get_highest_hourly_dry_bulb_temp_chunked_negative_only(mocker):
+    mock_res = mocker.MagicMock(spec = requests.Response)
+    mock_res.raw = BytesIO(b'"STATION","DATE","HourlyDryBulbTemperature"\n"a","d1","-12"\n"a","d2","-3s"\n')
+
+    res = get_highest_hourly_dry_bulb_temp(mock_res, chunksize = 1)
+
+    assert list(res["HourlyDryBulbTemperature"]) == [-3]
+
+
+def test_get_csv_stream(mocker):
+    fetcher = mocker.MagicMock()
+
+    get_csv("http://example.com/", "testfile.csv", fetcher = fetcher, stream = True)
+
+    fetcher.get.assert_called_once_with("http://example.com/testfile.csv", stream = True)
@@ -0,0 +1,95 @@
+import argparse
+import gzip
+import logging
+import os
+import random
+import sys
+import time
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from s3stream import iter_gzip_lines
+
+# Lines/s through gzip.open(Body) vs the ranged streaming iterator, with and
+# without background prefetch, against an in-process moto S3.
+
+BUCKET = "commoncrawl"
+KEY = "crawl-data/bench/CC-MAIN-bench.warc.wet.gz"
+WORDS = "the of and to in is was for on that with as by at from his her data crawl common web".split()
+
+
+class SlowClient:
+    # Adds a fixed delay to every GET to stand in for real S3 round trips.
+    def __init__(self, client, latency):
+        self._client = client
+        self._latency = latency
+
+    def get_object(self, **kwargs):
+        time.sleep(self._latency)
+        return self._client.get_object(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def make_wet(target_mb):
+    rng = random.Random(0)
+    members = []
+    total = 0
+    i = 0
+    while total < target_mb * 1024 * 1024:
+        lines = [" ".join(rng.choices(WORDS, k = rng.randint(5, 20))) for _ in range(rng.randint(20, 80))]
+        record = (
+            f"WARC/1.0\r\nWARC-Type: conversion\r\nWARC-Target-URI: http://site-{i % 997}.example.com/\r\n\r\n"
+            + "\n".join(lines) + "\n\r\n"
+        ).encode("utf-8")
+        members.append(gzip.compress(record, compresslevel = 6))
+        total += len(record)
+        i += 1
+    return b"".join(members), total
+
+
+def timed(label, lines, raw_mb):
+    start = time.perf_counter()
+    n = sum(1 for _ in lines)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>24}: {n / elapsed:10.0f} lines/s  {raw_mb / elapsed:6.1f} MB/s  ({n} lines, {elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "S3 gzip line streaming benchmark.")
+    parser.add_argument("--mb", type = int, default = 300, help = "decompressed size of the generated WET file")
+    parser.add_argument("--chunk-mb", type = int, default = 8)
+    parser.add_argument("--latency", type = float, default = 0.05, help = "seconds added to every GET")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"Generating ~{args.mb} MB WET file...")
+    body, raw_size = make_wet(args.mb)
+    raw_mb = raw_size / 1024 ** 2
+    print(f"{raw_mb:.0f} MB decompressed, {len(body) / 1024 ** 2:.0f} MB compressed")
+
+    with mock_aws():
+        s3 = boto3.client("s3", region_name = "us-east-1")
+        s3.create_bucket(Bucket = BUCKET)
+        s3.put_object(Bucket = BUCKET, Key = KEY, Body = body)
+        client = SlowClient(s3, args.latency)
+        chunk_size = args.chunk_mb * 1024 * 1024
+
+        def gzip_open():
+            with gzip.open(client.get_object(Bucket = BUCKET, Key = KEY)["Body"]) as z:
+                for line in z:
+                    yield line.decode("utf-8")[:-1]
+
+        timed("gzip.open(Body)", gzip_open(), raw_mb)
+        for prefetch in (0, 1, 4):
+            lines = iter_gzip_lines(BUCKET, KEY, client = client, chunk_size = chunk_size, prefetch = prefetch)
+            timed(f"ranged, prefetch={prefetch}", lines, raw_mb)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import argparse
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from s3stream import get_client, iter_gzip_lines
+
+# Fan-out over every WET file in a crawl's wet.paths.gz manifest. Keys are
+# spread over a process pool with a cap on how many downloads are in flight;
+# each worker streams its file through a reducer and the partial results are
+# merged in the parent. Completed keys are appended to a checkpoint file so
+# an interrupted run picks up where it stopped.
+
+BUCKET = "commoncrawl"
+MANIFEST = "crawl-data/CC-MAIN-2022-05/wet.paths.gz"
+
+
+class RecordCount:
+    # Reducer interface: update() per record, result() for a JSON-able
+    # partial, merge() to combine two partials.
+    def __init__(self):
+        self.n = 0
+
+    def update(self, headers):
+        self.n += 1
+
+    def result(self):
+        return self.n
+
+    @staticmethod
+    def merge(a, b):
+        return a + b
+
+
+class DomainTally:
+    def __init__(self):
+        self.counts = Counter()
+
+    def update(self, headers):
+        uri = headers.get("WARC-Target-URI")
+        if uri:
+            self.counts[urlsplit(uri).hostname or ""] += 1
+
+    def result(self):
+        return dict(self.counts)
+
+    @staticmethod
+    def merge(a, b):
+        merged = Counter(a)
+        merged.update(b)
+        return dict(merged)
+
+
+REDUCERS = {
+    "count": RecordCount,
+    "domains": DomainTally,
+}
+
+
+def read_manifest(bucket, key, client = None):
+    return [line for line in iter_gzip_lines(bucket, key, client = client) if line]
+
+
+def iter_records(lines):
+    # Yields the header block of each WARC record. A record starts with a
+    # "WARC/1.0" line at the top of the file or after a blank line.
+    headers = None
+    prev_blank = True
+    for line in lines:
+        if headers is not None:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name] = value.strip()
+            else:
+                yield headers
+                headers = None
+        elif prev_blank and line.startswith("WARC/"):
+            headers = {}
+        prev_blank = not line
+
+    if headers is not None:
+        yield headers
+
+
+def process_key(bucket, key, reducer, chunk_size):
+    start = time.perf_counter()
+    r = reducer()
+    for headers in iter_records(iter_gzip_lines(bucket, key, chunk_size = chunk_size)):
+        r.update(headers)
+    return key, r.result(), time.perf_counter() - start
+
+
+def load_checkpoint(path, reducer):
+    done = set()
+    result = reducer().result()
+    if path is None or not os.path.exists(path):
+        return done, result
+
+    with open(path, encoding = "utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line from a crash; that key simply gets redone.
+                continue
+            if entry["key"] not in done:
+                done.add(entry["key"])
+                result = reducer.merge(result, entry["result"])
+
+    logging.info(f"Resuming from checkpoint: {len(done)} keys already done.")
+    return done, result
+
+
+def open_checkpoint(path):
+    f = open(path, "a+", encoding = "utf-8")
+    # Terminate a torn last line so the next entry starts on its own line.
+    if f.tell() > 0:
+        f.seek(f.tell() - 1)
+        if f.read(1) != "\n":
+            f.write("\n")
+    return f
+
+
+def append_checkpoint(f, key, result):
+    f.write(json.dumps({"key": key, "result": result}) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def run_fanout(
+    bucket = BUCKET,
+    manifest = MANIFEST,
+    reducer = "count",
+    workers = 4,
+    max_in_flight = 8,
+    checkpoint = None,
+    limit = None,
+    chunk_size = 8 * 1024 * 1024,
+):
+    if isinstance(reducer, str):
+        reducer = REDUCERS[reducer]
+
+    keys = read_manifest(bucket, manifest)
+    if limit is not None:
+        keys = keys[:limit]
+
+    done, result = load_checkpoint(checkpoint, reducer)
+    pending = [key for key in keys if key not in done]
+    logging.info(f"{len(keys)} keys in manifest, {len(pending)} to process.")
+
+    completed = failed = 0
+    start = time.perf_counter()
+    ckpt = open_checkpoint(checkpoint) if checkpoint else None
+
+    # Workers build their own boto3 client; one inherited over fork isn't safe.
+    with ProcessPoolExecutor(max_workers = workers, initializer = get_client.cache_clear) as pool:
+        try:
+            queue = iter(pending)
+            in_flight = {}
+
+            while True:
+                while len(in_flight) < max_in_flight:
+                    key = next(queue, None)
+                    if key is None:
+                        break
+                    in_flight[pool.submit(process_key, bucket, key, reducer, chunk_size)] = key
+
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when = FIRST_COMPLETED)
+                for future in finished:
+                    key = in_flight.pop(future)
+                    try:
+                        _, partial, seconds = future.result()
+                    except Exception as e:
+                        failed += 1
+                        logging.error(f"Failed to process {key}: {e.__class__.__name__}: {e}")
+                        continue
+
+                    result = reducer.merge(result, partial)
+                    completed += 1
+                    if ckpt:
+                        append_checkpoint(ckpt, key, partial)
+
+                    elapsed = time.perf_counter() - start
+                    logging.info(
+                        f"{completed + failed}/{len(pending)} | {key} in {seconds:.1f}s | "
+                        f"{completed / elapsed:.2f} files/s | {failed} failed"
+                    )
+        finally:
+            if ckpt:
+                ckpt.close()
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Reduce every WET file in a Common Crawl manifest.")
+    parser.add_argument("--bucket", default = BUCKET)
+    parser.add_argument("--manifest", default = MANIFEST)
+    parser.add_argument("--reducer", choices = sorted(REDUCERS), default = "count")
+    parser.add_argument("--workers", type = int, default = 4)
+    parser.add_argument("--max-in-flight", type = int, default = 8)
+    parser.add_argument("--checkpoint", default = "fanout.checkpoint.jsonl")
+    parser.add_argument("--limit", type = int, help = "only process the first N keys")
+    parser.add_argument("--top", type = int, default = 20, help = "domains to print for --reducer domains")
+    args = parser.parse_args()
+
+    result = run_fanout(
+        args.bucket,
+        args.manifest,
+        args.reducer,
+        args.workers,
+        args.max_in_flight,
+        args.checkpoint,
+        args.limit,
+    )
+
+    if isinstance(result, dict):
+        for domain, n in Counter(result).most_common(args.top):
+            print(f"{n:10d}  {domain}")
+    else:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
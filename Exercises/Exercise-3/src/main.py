@@ -1,12 +1,16 @@
-import boto3
+import argparse
 import logging
 import gzip
+import zlib
+from itertools import islice
 from botocore.exceptions import (
     ClientError,
     NoCredentialsError,
     ParamValidationError,
 )
 
+from s3stream import get_client, iter_gzip_lines
+
 logging.basicConfig(
     format="{asctime} | {levelname} | {message}",
     style="{",
@@ -14,8 +18,8 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-def get_archive(bucket, object):  
-    s3 = boto3.client("s3")
+def get_archive(bucket, object, client = None):
+    s3 = client or get_client()
 
     try:
         logging.info("Retrieving file from S3...")
@@ -68,7 +72,32 @@ def display_cc_content(res):
         logging.error(e)
 
 
-def main():
+def stream_cc_content(bucket, key, line_limit = 30, prefetch = 0, client = None):
+    logging.info("Streaming Common Crawl contents...")
+
+    try:
+        lines = iter_gzip_lines(bucket, key, client = client, prefetch = prefetch)
+        for line in islice(lines, line_limit):
+            print(line)
+
+    except ClientError as e:
+        logging.error(f"ClientError: {e}")
+    except zlib.error as e:
+        logging.error(f"Decompression failed: {e}")
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {e.__class__.__name__}")
+        logging.error(e)
+
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description = "Print the first lines of a Common Crawl WET file.")
+    parser.add_argument("--lines", type = int, default = 30, help = "0 prints the whole file")
+    parser.add_argument("--prefetch", type = int, default = 2, help = "byte ranges to download ahead")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    args = parse_args(argv)
     bucket = "commoncrawl"
     object = "crawl-data/CC-MAIN-2022-05/wet.paths.gz"
 
@@ -82,8 +111,7 @@ def main():
     uri = extract_uri(res)
 
     try:
-        res = get_archive(bucket, uri)
-        display_cc_content(res)
+        stream_cc_content(bucket, uri, args.lines or None, args.prefetch)
 
     except Exception as e:
         logging.error(f"Pipeline failed due to an unexpected exception: {e.__class__.__name__}")
@@ -0,0 +1,97 @@
+import functools
+import logging
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+# Streaming access to gzipped S3 objects. The object is fetched as a series
+# of byte-range GETs, decompressed incrementally and split into lines, so
+# memory stays bounded by chunk_size no matter how large the object is.
+
+CHUNK_SIZE = 8 * 1024 * 1024
+INPUT_SIZE = 64 * 1024
+# Upper bound on how much decompressed output is produced per step.
+OUTPUT_SIZE = 1024 * 1024
+
+
+@functools.lru_cache(maxsize = None)
+def get_client():
+    # boto3 clients are thread safe and expensive to build; share one.
+    return boto3.client("s3")
+
+
+def iter_ranges(bucket, key, client = None, chunk_size = CHUNK_SIZE, prefetch = 0):
+    client = client or get_client()
+    size = client.head_object(Bucket = bucket, Key = key)["ContentLength"]
+    ranges = deque((start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size))
+
+    def fetch(byte_range):
+        res = client.get_object(Bucket = bucket, Key = key, Range = f"bytes={byte_range[0]}-{byte_range[1]}")
+        return res["Body"].read()
+
+    if not prefetch:
+        for byte_range in ranges:
+            yield fetch(byte_range)
+        return
+
+    # Keep up to `prefetch` ranges downloading on background threads while
+    # the caller decompresses the current one.
+    with ThreadPoolExecutor(max_workers = prefetch) as pool:
+        in_flight = deque()
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) <= prefetch:
+                    in_flight.append(pool.submit(fetch, ranges.popleft()))
+                yield in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def iter_gunzip(chunks):
+    # Handles multi-member gzip files (Common Crawl WET files are a
+    # concatenation of one gzip member per record).
+    d = zlib.decompressobj(wbits = zlib.MAX_WBITS | 16)
+
+    for chunk in chunks:
+        # Feed the chunk in small slices: every member boundary copies the
+        # rest of the input into unused_data, which goes quadratic over a
+        # whole chunk when members are only a few KB each.
+        view = memoryview(chunk)
+        for offset in range(0, len(view), INPUT_SIZE):
+            data = view[offset:offset + INPUT_SIZE]
+            while data:
+                out = d.decompress(data, OUTPUT_SIZE)
+                if out:
+                    yield out
+
+                if d.eof:
+                    data = d.unused_data
+                    d = zlib.decompressobj(wbits = zlib.MAX_WBITS | 16)
+                else:
+                    data = d.unconsumed_tail
+
+    tail = d.flush()
+    if tail:
+        yield tail
+
+
+def iter_lines(pieces, encoding = "utf-8"):
+    buf = b""
+    for piece in pieces:
+        buf += piece
+        lines = buf.split(b"\n")
+        buf = lines.pop()
+        for line in lines:
+            yield line.rstrip(b"\r").decode(encoding, errors = "replace")
+
+    if buf:
+        yield buf.rstrip(b"\r").decode(encoding, errors = "replace")
+
+
+def iter_gzip_lines(bucket, key, client = None, chunk_size = CHUNK_SIZE, prefetch = 0, encoding = "utf-8"):
+    logging.info(f"Streaming s3://{bucket}/{key}...")
+    chunks = iter_ranges(bucket, key, client, chunk_size, prefetch)
+    return iter_lines(iter_gunzip(chunks), encoding)
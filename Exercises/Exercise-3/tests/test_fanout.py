@@ -0,0 +1,78 @@
+import boto3
+from moto import mock_aws
+import pytest
+import gzip
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.s3stream import get_client
+from src.fanout import DomainTally, RecordCount, iter_records, load_checkpoint, run_fanout
+
+BUCKET = "commoncrawl"
+MANIFEST = "crawl-data/TEST/wet.paths.gz"
+
+
+def wet_file(domains):
+    records = [
+        f"WARC/1.0\r\nWARC-Type: conversion\r\nWARC-Target-URI: https://{d}/page\r\nContent-Length: 5\r\n\r\nhello\r\n\r\n"
+        for d in domains
+    ]
+    return b"".join(gzip.compress(r.encode("utf-8")) for r in records)
+
+
+FILES = {
+    "wet/0.warc.wet.gz": ["a.com", "b.com", "a.com"],
+    "wet/1.warc.wet.gz": ["b.com"],
+    "wet/2.warc.wet.gz": ["c.com", "a.com"],
+}
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        get_client.cache_clear()
+        client = boto3.client("s3", region_name = "us-east-1")
+        client.create_bucket(Bucket = BUCKET)
+        for key, domains in FILES.items():
+            client.put_object(Bucket = BUCKET, Key = key, Body = wet_file(domains))
+        client.put_object(Bucket = BUCKET, Key = MANIFEST, Body = gzip.compress("\n".join(FILES).encode() + b"\n"))
+        yield client
+    get_client.cache_clear()
+
+
+def test_iter_records_reads_headers():
+    lines = ["WARC/1.0", "WARC-Target-URI: https://a.com/x", "", "body", "WARC/1.0 in body text", "", "WARC/1.0", "WARC-Type: conversion", ""]
+
+    assert list(iter_records(lines)) == [
+        {"WARC-Target-URI": "https://a.com/x"},
+        {"WARC-Type": "conversion"},
+    ]
+
+
+def test_reducers_merge():
+    assert RecordCount.merge(2, 3) == 5
+    assert DomainTally.merge({"a.com": 1}, {"a.com": 2, "b.com": 1}) == {"a.com": 3, "b.com": 1}
+
+
+@pytest.mark.parametrize("reducer,expected", [
+    ("count", 6),
+    ("domains", {"a.com": 3, "b.com": 2, "c.com": 1}),
+])
+def test_run_fanout(s3, reducer, expected):
+    assert run_fanout(BUCKET, MANIFEST, reducer, workers = 2, max_in_flight = 2) == expected
+
+
+def test_run_fanout_resumes_from_checkpoint(s3, tmp_path):
+    checkpoint = tmp_path / "ckpt.jsonl"
+    # A previous run finished key 0 and crashed mid-write on the next line.
+    checkpoint.write_text(json.dumps({"key": "wet/0.warc.wet.gz", "result": {"a.com": 2, "b.com": 1}}) + "\n{\"key\": \"wet/1")
+
+    result = run_fanout(BUCKET, MANIFEST, "domains", workers = 2, checkpoint = str(checkpoint))
+
+    assert result == {"a.com": 3, "b.com": 2, "c.com": 1}
+    done, merged = load_checkpoint(str(checkpoint), DomainTally)
+    assert done == set(FILES)
+    assert merged == result
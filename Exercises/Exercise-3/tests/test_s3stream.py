@@ -0,0 +1,88 @@
+import boto3
+from moto import mock_aws
+import pytest
+import gzip
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.s3stream import get_client, iter_ranges, iter_gunzip, iter_lines, iter_gzip_lines
+
+BUCKET = "commoncrawl"
+KEY = "crawl-data/CC-MAIN-2022-05/segments/0/wet/CC-MAIN-0.warc.wet.gz"
+
+
+def make_wet(n_records = 50):
+    # One gzip member per record, like the real WET files.
+    records = []
+    for i in range(n_records):
+        text = (
+            f"WARC/1.0\r\nWARC-Type: conversion\r\nWARC-Target-URI: http://site-{i % 7}.example.com/{i}\r\n\r\n"
+            + "".join(f"line {i}-{j} ünïcödé\n" for j in range(i % 5 + 1))
+        )
+        records.append(text)
+    body = b"".join(gzip.compress(r.encode("utf-8")) for r in records)
+    expected = "".join(records).replace("\r\n", "\n").split("\n")[:-1]
+    return body, expected
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        get_client.cache_clear()
+        client = boto3.client("s3", region_name = "us-east-1")
+        client.create_bucket(Bucket = BUCKET)
+        yield client
+    get_client.cache_clear()
+
+
+def test_get_client_is_reused(s3):
+    assert get_client() is get_client()
+
+
+@pytest.mark.parametrize("chunk_size", [61, 1000, 10 ** 6])
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+def test_iter_gzip_lines_multi_member(s3, chunk_size, prefetch):
+    body, expected = make_wet()
+    s3.put_object(Bucket = BUCKET, Key = KEY, Body = body)
+
+    lines = list(iter_gzip_lines(BUCKET, KEY, client = s3, chunk_size = chunk_size, prefetch = prefetch))
+
+    assert lines == expected
+
+
+def test_iter_ranges_covers_object_exactly(s3):
+    body = bytes(range(256)) * 10
+    s3.put_object(Bucket = BUCKET, Key = "blob", Body = body)
+
+    chunks = list(iter_ranges(BUCKET, "blob", client = s3, chunk_size = 300, prefetch = 2))
+
+    assert b"".join(chunks) == body
+    assert max(len(c) for c in chunks) == 300
+
+
+def test_iter_gunzip_bounds_output_size():
+    # 32 MiB of zeros compresses to a few KB; output must still come out in
+    # bounded pieces rather than one huge buffer.
+    compressed = gzip.compress(b"\0" * (32 * 1024 * 1024))
+
+    pieces = list(iter_gunzip([compressed]))
+
+    assert sum(len(p) for p in pieces) == 32 * 1024 * 1024
+    assert max(len(p) for p in pieces) <= 1024 * 1024
+
+
+def test_iter_lines_joins_split_lines():
+    assert list(iter_lines([b"ab", b"c\r\nd", b"e\n", b"f"])) == ["abc", "de", "f"]
+
+
+def test_early_stop_with_prefetch(s3):
+    body, expected = make_wet(200)
+    s3.put_object(Bucket = BUCKET, Key = KEY, Body = body)
+
+    lines = iter_gzip_lines(BUCKET, KEY, client = s3, chunk_size = 128, prefetch = 2)
+    first = [next(lines) for _ in range(5)]
+    lines.close()
+
+    assert first == expected[:5]
@@ -0,0 +1,132 @@
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from flatten_json import flatten
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import columnar
+import main as converter
+
+# files/s for the original serial json.load + flatten_json loop vs the
+# parallel converter and the single-Parquet output, over a generated ragged
+# tree of nested JSON files.
+
+
+def make_doc(rng, i):
+    return {
+        "name": f"meteorite-{i}",
+        "id": str(i),
+        "nametype": rng.choice(["Valid", "Relict"]),
+        "recclass": rng.choice(["L5", "H6", "LL6", "CM2"]),
+        "mass": str(rng.randint(1, 100000)),
+        "year": "1880-01-01T00:00:00.000",
+        "geolocation": {"type": "Point", "coordinates": [rng.uniform(-180, 180), rng.uniform(-90, 90)]},
+        "meta": {
+            "source": {"agency": "NASA", "tags": [rng.choice("abcdef") for _ in range(rng.randint(1, 6))]},
+            "history": [{"ts": j, "note": "x" * rng.randint(0, 40)} for j in range(rng.randint(0, 5))],
+        },
+    }
+
+
+def generate_tree(root, n_files, seed = 0):
+    rng = random.Random(seed)
+    dirs = [root]
+    for i in range(n_files):
+        if rng.random() < 0.05:
+            d = rng.choice(dirs) / f"folder_{len(dirs)}"
+            d.mkdir(parents = True, exist_ok = True)
+            dirs.append(d)
+        with open(rng.choice(dirs) / f"file-{i}.json", "w", encoding = "utf-8") as f:
+            json.dump(make_doc(rng, i), f)
+
+
+def legacy_main(root, csv_dir):
+    # The loop Exercise-4's main() ran before the parallel converter.
+    csv_dir.mkdir(exist_ok = True)
+    for json_file in list(root.glob("**/*.json")):
+        with open(json_file, encoding = "utf-8") as f_json:
+            flat_json = flatten(json.load(f_json))
+            csv_name = json_file.name.split(".json")[0]
+
+        with open(f"{csv_dir}/{csv_name}.csv", "w", encoding = "utf-8") as f_csv:
+            writer = csv.DictWriter(f_csv, fieldnames = flat_json.keys())
+            writer.writeheader()
+            row = {}
+            for k, v in flat_json.items():
+                row[k] = v
+            writer.writerow(row)
+
+
+def timed(label, n_files, func, repeat):
+    # Best of `repeat`, each into a fresh output directory so file creation
+    # costs are the same for every run.
+    elapsed = float("inf")
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    print(f"{label:>32}: {n_files / elapsed:8.0f} files/s  ({elapsed:.2f}s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "JSON to CSV conversion benchmark.")
+    parser.add_argument("--files", type = int, default = 20000)
+    parser.add_argument("--workers", type = int, default = os.cpu_count())
+    parser.add_argument("--chunksize", type = int, default = 64)
+    parser.add_argument("--repeat", type = int, default = 3)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        root = tmp / "data"
+        root.mkdir()
+        print(f"Generating {args.files} JSON files...")
+        generate_tree(root, args.files)
+
+        runs = itertools.count()
+
+        def run(label, func):
+            return timed(label, args.files, lambda i: func(tmp / f"csv_data_{next(runs)}"), args.repeat)
+
+        def convert(out, workers = 1):
+            converter.convert_files(converter.find_json_files(root), out, workers, args.chunksize)
+
+        base = run("legacy main()", lambda out: legacy_main(root, out))
+
+        orjson = converter.orjson
+        converter.orjson = None
+        run("serial, stdlib json", convert)
+        converter.orjson = orjson
+
+        if orjson is not None:
+            run("serial, orjson", convert)
+
+        best = run(
+            f"{args.workers} processes, chunksize {args.chunksize}",
+            lambda out: convert(out, args.workers),
+        )
+        print(f"{'speedup vs legacy':>32}: {base / best:8.1f}x")
+
+        run(
+            f"one parquet, {args.workers} processes",
+            lambda out: columnar.convert_to_columnar(
+                converter.find_json_files(root), out / "flat.parquet", workers = args.workers, chunksize = args.chunksize
+            ),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from main import find_json_files, flatten_record, load_json
+
+# Consolidated output: every JSON file under the root becomes one row of a
+# single Parquet (or Arrow IPC) file instead of one tiny CSV per file.
+#
+# Two passes over the inputs keep memory bounded by the batch size rather
+# than the number of files. The first pass flattens each file only to learn
+# the union of keys and a type per key; the second flattens again and
+# writes the rows out batch by batch against that fixed schema. Each batch
+# is written as soon as it is flattened, so a row group never holds more
+# than one batch; row_group_size only splits a batch further.
+
+SOURCE_COLUMN = "_source_file"
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+ARROW_TYPES = {
+    "bool": pa.bool_(),
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "string": pa.string(),
+    # A key that is null in every file still gets a usable column type.
+    "null": pa.string(),
+}
+
+
+def leaf_type(value):
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int" if INT64_MIN <= value <= INT64_MAX else "string"
+    if isinstance(value, float):
+        return "float"
+    # Strings, plus the empty {} / [] leaves flatten_record keeps as values.
+    return "string"
+
+
+def merge_type(a, b):
+    if a == b or b == "null":
+        return a
+    if a == "null":
+        return b
+    if {a, b} == {"int", "float"}:
+        return "float"
+    return "string"
+
+
+def infer_file(json_file):
+    try:
+        return {k: leaf_type(v) for k, v in flatten_record(load_json(json_file)).items()}
+    except (ValueError, TypeError, AttributeError, OSError) as e:
+        logging.error(f"Skipping {json_file}: {e}")
+        return None
+
+
+def flatten_file(json_file):
+    try:
+        return flatten_record(load_json(json_file))
+    except (ValueError, TypeError, AttributeError, OSError) as e:
+        logging.error(f"Skipping {json_file}: {e}")
+        return None
+
+
+def iter_blocks(items, size):
+    items = iter(items)
+    while block := list(islice(items, size)):
+        yield block
+
+
+def map_blocks(func, json_files, pool, batch_size, chunksize):
+    # Map one batch at a time so results never pile up past batch_size,
+    # however many files there are.
+    for block in iter_blocks(json_files, batch_size):
+        if pool is None:
+            yield block, list(map(func, block))
+        else:
+            yield block, list(pool.map(func, block, chunksize = chunksize))
+
+
+def infer_schema(json_files, pool = None, batch_size = 10_000, chunksize = 64):
+    # Union of keys in order of first appearance, with one type per key.
+    types = {}
+    for _, results in map_blocks(infer_file, json_files, pool, batch_size, chunksize):
+        for file_types in results:
+            for k, t in (file_types or {}).items():
+                types[k] = merge_type(types.get(k, "null"), t)
+
+    fields = [pa.field(SOURCE_COLUMN, pa.string())]
+    fields += [pa.field(k, ARROW_TYPES[t]) for k, t in types.items() if k != SOURCE_COLUMN]
+    return pa.schema(fields)
+
+
+def to_batch(rows, schema, string_columns):
+    for row in rows:
+        # Columns widened to string hold values of mixed types; render them
+        # the way the CSV output does.
+        for k in string_columns.intersection(row):
+            v = row[k]
+            if v is not None and not isinstance(v, str):
+                row[k] = str(v)
+    return pa.RecordBatch.from_pylist(rows, schema = schema)
+
+
+def open_writer(path, schema, fmt):
+    if fmt == "parquet":
+        return pq.ParquetWriter(path, schema)
+    if fmt == "arrow":
+        return pa.ipc.new_file(path, schema)
+    raise ValueError(f"Unknown format {fmt!r}, expected 'parquet' or 'arrow'.")
+
+
+def write_batch(writer, batch, row_group_size):
+    table = pa.Table.from_batches([batch])
+    if isinstance(writer, pq.ParquetWriter):
+        writer.write_table(table, row_group_size = row_group_size)
+    else:
+        writer.write_table(table, max_chunksize = row_group_size)
+
+
+def convert_to_columnar(
+    json_files,
+    out_path,
+    fmt = "parquet",
+    workers = None,
+    batch_size = 10_000,
+    row_group_size = None,
+    chunksize = 64,
+):
+    if batch_size < 1 or (row_group_size is not None and row_group_size < 1):
+        raise ValueError("batch_size and row_group_size must be positive.")
+
+    json_files = list(json_files)
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents = True, exist_ok = True)
+
+    pool = None if workers == 1 else ProcessPoolExecutor(max_workers = workers)
+    try:
+        schema = infer_schema(json_files, pool, batch_size, chunksize)
+        string_columns = {f.name for f in schema if f.type == pa.string()}
+        logging.info(f"Unified schema has {len(schema)} columns.")
+
+        written = 0
+        writer = open_writer(out_path, schema, fmt)
+        try:
+            for block, flats in map_blocks(flatten_file, json_files, pool, batch_size, chunksize):
+                rows = []
+                for json_file, flat in zip(block, flats):
+                    if flat is not None:
+                        flat[SOURCE_COLUMN] = str(json_file)
+                        rows.append(flat)
+                if not rows:
+                    continue
+
+                write_batch(writer, to_batch(rows, schema, string_columns), row_group_size)
+                written += len(rows)
+        finally:
+            writer.close()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return written
+
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description = "Flatten every JSON file under a directory into one columnar file.")
+    parser.add_argument("--root", default = ".")
+    parser.add_argument("--out", help = "output file (default: ./flat_data.<format>)")
+    parser.add_argument("--format", choices = ["parquet", "arrow"], default = "parquet")
+    parser.add_argument("--workers", type = int, help = "processes to use (default: all cores, 1 = serial)")
+    parser.add_argument("--batch-size", type = int, default = 10_000, help = "files flattened per batch")
+    parser.add_argument(
+        "--row-group-size",
+        type = int,
+        help = "split each batch into row groups of at most N rows (default: one per batch)",
+    )
+    parser.add_argument("--chunksize", type = int, default = 64)
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    args = parse_args(argv)
+    out = args.out or f"./flat_data.{args.format}"
+
+    json_files = find_json_files(args.root)
+    logging.info(f"Found {len(json_files)} JSON files under {args.root}.")
+
+    start = time.perf_counter()
+    written = convert_to_columnar(
+        json_files,
+        out,
+        args.format,
+        args.workers,
+        args.batch_size,
+        args.row_group_size,
+        args.chunksize,
+    )
+    elapsed = time.perf_counter() - start
+
+    logging.info(f"Wrote {written}/{len(json_files)} rows to {out} in {elapsed:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
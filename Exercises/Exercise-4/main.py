@@ -1,38 +1,119 @@
+import argparse
 import json
 import csv
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
-from flatten_json import flatten
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
+logging.basicConfig(
+    format="{asctime} | {levelname} | {message}",
+    style="{",
+    datefmt="%Y-%m-%d %H:%M",
+    level=logging.INFO
+)
 
-def main():
-    p = Path(".")
 
-    csv_dir = Path("./csv_data")
+def find_json_files(root):
+    return sorted(Path(root).glob("**/*.json"))
 
-    if not csv_dir.exists():
-        csv_dir.mkdir()
 
-    json_files = list(p.glob("**/*.json"))
+def load_json(json_file):
+    # orjson is several times faster than the stdlib decoder; use it when installed.
+    if orjson is not None:
+        with open(json_file, "rb") as f:
+            return orjson.loads(f.read())
 
-    for json_file in json_files:
-        with open(json_file, encoding = "utf-8") as f_json:
-            json_tmp = json.load(f_json)
+    with open(json_file, encoding = "utf-8") as f:
+        return json.load(f)
 
-            flat_json = flatten(json_tmp)
 
-            csv_name = json_file.name.split(".json")[0]
+def flatten_record(obj, sep = "_"):
+    # Same output as flatten_json.flatten, but walks the document with an
+    # explicit stack and writes leaves straight into one dict instead of
+    # building and copying intermediate dicts per nesting level.
+    flat = {}
+    stack = [(None, obj)]
 
-        with open(f"{csv_dir}/{csv_name}.csv", 'w', encoding = "utf-8") as f_csv:
-            writer = csv.DictWriter(f_csv, fieldnames = flat_json.keys())
+    while stack:
+        prefix, value = stack.pop()
 
-            writer.writeheader()
-            
-            row = {}
-            for k, v in flat_json.items():
-                row[k] = v
+        if isinstance(value, dict) and value:
+            items = value.items()
+        elif isinstance(value, list) and value:
+            items = enumerate(value)
+        else:
+            if prefix is not None:
+                flat[prefix] = value
+            continue
 
-            writer.writerow(row)
+        # Push in reverse so keys come out in document order.
+        for k, v in reversed(list(items)):
+            stack.append((str(k) if prefix is None else f"{prefix}{sep}{k}", v))
+
+    return flat
+
+
+def write_csv(flat, csv_path):
+    with open(csv_path, "w", newline = "", encoding = "utf-8") as f_csv:
+        writer = csv.writer(f_csv)
+        writer.writerow(flat.keys())
+        writer.writerow(flat.values())
+
+
+def convert_file(json_file, csv_dir):
+    try:
+        flat = flatten_record(load_json(json_file))
+        csv_path = Path(csv_dir) / f"{Path(json_file).name.split('.json')[0]}.csv"
+        write_csv(flat, csv_path)
+        return True
+
+    except (ValueError, TypeError, AttributeError) as e:
+        logging.error(f"Could not convert {json_file}: {e}")
+    except OSError as e:
+        logging.error(f"I/O error on {json_file}: {e}")
+    return False
+
+
+def convert_files(json_files, csv_dir, workers = None, chunksize = 64):
+    csv_dir = Path(csv_dir)
+    csv_dir.mkdir(parents = True, exist_ok = True)
+    convert = partial(convert_file, csv_dir = csv_dir)
+
+    if workers == 1:
+        return sum(map(convert, json_files))
+
+    # Files are tiny, so hand them out in chunks to keep IPC overhead down.
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        return sum(pool.map(convert, json_files, chunksize = chunksize))
+
+
+def parse_args(argv = None):
+    parser = argparse.ArgumentParser(description = "Flatten every JSON file under a directory into CSV.")
+    parser.add_argument("--root", default = ".")
+    parser.add_argument("--out", default = "./csv_data")
+    parser.add_argument("--workers", type = int, help = "processes to use (default: all cores, 1 = serial)")
+    parser.add_argument("--chunksize", type = int, default = 64)
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    args = parse_args(argv)
+
+    json_files = find_json_files(args.root)
+    logging.info(f"Found {len(json_files)} JSON files under {args.root}.")
+
+    start = time.perf_counter()
+    converted = convert_files(json_files, args.out, args.workers, args.chunksize)
+    elapsed = time.perf_counter() - start
+
+    logging.info(f"Converted {converted}/{len(json_files)} files in {elapsed:.2f}s.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+import json
+import pytest
+import sys
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from columnar import SOURCE_COLUMN, convert_to_columnar, merge_type
+from main import find_json_files
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("int", "int", "int"),
+    ("null", "int", "int"),
+    ("float", "null", "float"),
+    ("int", "float", "float"),
+    ("bool", "int", "string"),
+    ("float", "string", "string"),
+])
+def test_merge_type(a, b, expected):
+    assert merge_type(a, b) == expected
+
+
+@pytest.fixture
+def json_tree(tmp_path):
+    data = tmp_path / "data"
+    (data / "some_folder").mkdir(parents = True)
+    docs = {
+        "file-1.json": {"id": 1, "mass": 21.5, "geolocation": {"coordinates": [6.1, 50.7]}},
+        "file-2.json": {"id": 2, "mass": 720, "fall": "Fell"},
+        "some_folder/file-3.json": {"id": 3, "fall": True, "tags": []},
+        "some_folder/file-4.json": {"id": 4, "mass": None},
+    }
+    for name, doc in docs.items():
+        (data / name).write_text(json.dumps(doc))
+    (data / "some_folder" / "bad.json").write_text("{not json")
+    return data
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_convert_to_parquet(tmp_path, json_tree, workers):
+    out = tmp_path / "out" / "flat.parquet"
+
+    written = convert_to_columnar(
+        find_json_files(json_tree), out, workers = workers, batch_size = 2, row_group_size = 3, chunksize = 1
+    )
+
+    assert written == 4
+    table = pq.read_table(out)
+    assert table.schema == pa.schema([
+        (SOURCE_COLUMN, pa.string()),
+        ("id", pa.int64()),
+        ("mass", pa.float64()),
+        ("geolocation_coordinates_0", pa.float64()),
+        ("geolocation_coordinates_1", pa.float64()),
+        ("fall", pa.string()),
+        ("tags", pa.string()),
+    ])
+
+    rows = {os.path.basename(r.pop(SOURCE_COLUMN)): r for r in table.to_pylist()}
+    assert rows["file-1.json"] == {
+        "id": 1, "mass": 21.5, "geolocation_coordinates_0": 6.1, "geolocation_coordinates_1": 50.7,
+        "fall": None, "tags": None,
+    }
+    assert rows["file-2.json"]["mass"] == 720.0
+    assert rows["file-3.json"]["fall"] == "True"
+    assert rows["file-3.json"]["tags"] == "[]"
+    assert rows["file-4.json"]["mass"] is None
+
+    # Each batch of 2 files is written as it is flattened, less bad.json;
+    # a row group never spans batches.
+    metadata = pq.ParquetFile(out).metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [2, 1, 1]
+
+
+def test_row_group_size_splits_batches(tmp_path, json_tree):
+    out = tmp_path / "flat.parquet"
+
+    convert_to_columnar(find_json_files(json_tree), out, workers = 1, batch_size = 5, row_group_size = 3)
+
+    metadata = pq.ParquetFile(out).metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [3, 1]
+
+
+def test_convert_to_arrow(tmp_path, json_tree):
+    out = tmp_path / "flat.arrow"
+
+    written = convert_to_columnar(find_json_files(json_tree), out, fmt = "arrow", workers = 1, batch_size = 3)
+
+    assert written == 4
+    with pa.ipc.open_file(out) as reader:
+        table = reader.read_all()
+    assert table.num_rows == 4
+    assert table.schema.field("id").type == pa.int64()
+
+
+def test_convert_to_columnar_bad_format(tmp_path, json_tree):
+    with pytest.raises(ValueError):
+        convert_to_columnar(find_json_files(json_tree), tmp_path / "flat.csv", fmt = "csv", workers = 1)
@@ -0,0 +1,53 @@
+import csv
+import json
+import pytest
+import sys
+import os
+from flatten_json import flatten
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import convert_files, find_json_files, flatten_record, load_json
+
+
+@pytest.mark.parametrize("doc", [
+    {"type": "Point", "coordinates": [-99.9, 16.88333]},
+    {"name": "Aachen", "geolocation": {"type": "Point", "coordinates": [6.08333, 50.775]}},
+    {"a": {}, "b": [], "c": [{"x": 1}, [2, 3]], "d": None, "e": {"f": {"g": [True, "s"]}}},
+    {},
+])
+def test_flatten_record_matches_flatten_json(doc):
+    flat = flatten_record(doc)
+
+    assert flat == flatten(doc)
+    assert list(flat) == list(flatten(doc))
+
+
+def test_load_json_without_orjson(tmp_path, mocker):
+    path = tmp_path / "x.json"
+    path.write_text('{"a": [1, 2]}')
+
+    mocker.patch("main.orjson", None)
+
+    assert load_json(path) == {"a": [1, 2]}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_convert_files(tmp_path, workers):
+    data = tmp_path / "data"
+    (data / "some_folder" / "deeper").mkdir(parents = True)
+    (data / "file-1.json").write_text(json.dumps({"id": "1", "geolocation": {"coordinates": [6.1, 50.7]}}))
+    (data / "some_folder" / "deeper" / "file-2.json").write_text(json.dumps({"id": "2"}))
+    (data / "some_folder" / "bad.json").write_text("{not json")
+    (data / "some_folder" / "test.csv").write_text("not a json file")
+
+    files = find_json_files(data)
+    converted = convert_files(files, tmp_path / "csv_data", workers = workers, chunksize = 1)
+
+    assert converted == 2
+    with open(tmp_path / "csv_data" / "file-1.csv", newline = "") as f:
+        assert list(csv.DictReader(f)) == [
+            {"id": "1", "geolocation_coordinates_0": "6.1", "geolocation_coordinates_1": "50.7"}
+        ]
+    assert (tmp_path / "csv_data" / "file-2.csv").exists()
+    assert not (tmp_path / "csv_data" / "bad.csv").exists()
@@ -0,0 +1,177 @@
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import psycopg2
+from psycopg2 import pool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main as loader
+
+# rows/s loading generated accounts/products/transactions CSVs into Postgres:
+# one COPY per table in sequence (the original ingest_data), against the
+# concurrent batched loader with and without deferred secondary indexes.
+# Then the incremental mode: a first load through staging, a re-run with
+# nothing changed, and a re-run after editing a small share of transactions.
+#
+#   docker-compose up bench
+
+STATES = ["Ohio", "Iowa", "Texas", "Maine", "Oregon", "Nevada", "Utah"]
+CITIES = ["Middleton", "BigTown", "Springfield", "Riverside", "Fairview", "Salem"]
+
+
+def write_csv(path, header, rows):
+    # Same ", " separated layout as the files in data/.
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(", ".join(header) + "\n")
+        for row in rows:
+            f.write(", ".join(map(str, row)) + "\n")
+
+
+def generate_data(data_dir, accounts, products, transactions, seed=0):
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+
+    write_csv(
+        data_dir / "accounts.csv",
+        ["customer_id", "first_name", "last_name", "address_1", "address_2", "city", "state", "zip_code", "join_date"],
+        (
+            (i, f"first{i}", f"last{i}", f"{rng.randint(1, 9999)} Main St.", "" if i % 3 else f"PO BOX {i}",
+             rng.choice(CITIES), rng.choice(STATES), f"{rng.randint(0, 99999):05d}",
+             (start + timedelta(days=rng.randint(0, 900))).strftime("%Y/%m/%d"))
+            for i in range(1, accounts + 1)
+        ),
+    )
+    write_csv(
+        data_dir / "products.csv",
+        ["product_id", "product_code", "product_description"],
+        ((i, f"{i:02d}", f"Widget {i}") for i in range(1, products + 1)),
+    )
+
+    def transaction(i):
+        product = rng.randint(1, products)
+        return (
+            f"T{i:012d}", (start + timedelta(days=rng.randint(0, 900))).strftime("%Y/%m/%d"),
+            product, f"{product:02d}", f"Widget {product}", rng.randint(1, 20), rng.randint(1, accounts),
+        )
+
+    write_csv(
+        data_dir / "transactions.csv",
+        ["transaction_id", "transaction_date", "product_id", "product_code", "product_description", "quantity",
+         "account_id"],
+        (transaction(i) for i in range(transactions)),
+    )
+
+
+def reset(db_pool, defer_indexes):
+    conn = db_pool.getconn()
+    try:
+        loader.run_ddl(conn, [
+            "DROP TABLE IF EXISTS transactions, products, accounts, load_checksums CASCADE",
+            "DROP TABLE IF EXISTS transactions_staging, products_staging, accounts_staging",
+        ])
+        loader.create_tables(conn, indexes=not defer_indexes)
+    finally:
+        db_pool.putconn(conn)
+
+
+def change_transactions(path, share, seed=1):
+    # Bump the quantity on roughly `share` of the transactions in place.
+    rng = random.Random(seed)
+    with open(path, encoding="utf-8") as f:
+        lines = f.readlines()
+    changed = 0
+    for i in range(1, len(lines)):
+        if rng.random() < share:
+            fields = lines[i].rstrip("\n").split(", ")
+            fields[5] = str(int(fields[5]) + 1)
+            lines[i] = ", ".join(fields) + "\n"
+            changed += 1
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    return changed
+
+
+def timed(label, db_pool, total_rows, load, defer_indexes=False, fresh=True):
+    if fresh:
+        reset(db_pool, defer_indexes)
+
+    start = time.perf_counter()
+    load()
+    if defer_indexes:
+        conn = db_pool.getconn()
+        try:
+            loader.create_indexes(conn)
+        finally:
+            db_pool.putconn(conn)
+    elapsed = time.perf_counter() - start
+
+    print(f"{label:>40}: {total_rows / elapsed:10.0f} rows/s  ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise-5 COPY loader benchmark.")
+    parser.add_argument("--host", default=loader.CONN_PARAMS["host"])
+    parser.add_argument("--accounts", type=int, default=100_000)
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--transactions", type=int, default=2_000_000)
+    parser.add_argument("--batch-size", type=int, default=loader.BATCH_SIZE)
+    parser.add_argument("--change", type=float, default=0.01, help="share of transactions edited for the delta run")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    total_rows = args.accounts + args.products + args.transactions
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        print(f"Generating {total_rows} rows...")
+        generate_data(data_dir, args.accounts, args.products, args.transactions)
+
+        db_pool = pool.ThreadedConnectionPool(1, 2, **dict(loader.CONN_PARAMS, host=args.host))
+        try:
+            # A single batch per table run one table at a time is the
+            # original ingest_data: one COPY each, one connection.
+            serial = [[table] for stage in loader.LOAD_STAGES for table in stage]
+            timed(
+                "serial, one COPY per table",
+                db_pool,
+                total_rows,
+                lambda: loader.ingest_data(db_pool, data_dir, total_rows, serial),
+            )
+            timed(
+                f"concurrent, batches of {args.batch_size}",
+                db_pool,
+                total_rows,
+                lambda: loader.ingest_data(db_pool, data_dir, args.batch_size),
+            )
+            timed(
+                f"concurrent, batches of {args.batch_size}, deferred",
+                db_pool,
+                total_rows,
+                lambda: loader.ingest_data(db_pool, data_dir, args.batch_size),
+                defer_indexes=True,
+            )
+
+            def incremental():
+                return loader.ingest_data(db_pool, data_dir, args.batch_size, load=loader.merge_table)
+
+            timed("incremental, first load", db_pool, total_rows, incremental)
+            timed("incremental, nothing changed", db_pool, total_rows, incremental, fresh=False)
+            changed = change_transactions(data_dir / "transactions.csv", args.change)
+            timed(f"incremental, {changed} transactions changed", db_pool, total_rows, incremental, fresh=False)
+        except psycopg2.Error as e:
+            logging.error(f"Benchmark failed: {e}")
+            raise
+        finally:
+            db_pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,17 @@
-import psycopg2
+import argparse
+import csv
+import hashlib
+import io
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import psycopg2
+from psycopg2 import pool, sql
+
+from validate import seed_references, validate_dir
 
 logging.basicConfig(
     format="{asctime} | {levelname} | {message}",
@@ -8,131 +20,361 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-def create_tables(conn):
-    cmds = [
-        """
-        CREATE TABLE IF NOT EXISTS accounts (
-            customer_id INTEGER PRIMARY KEY,
-            first_name VARCHAR(50) NOT NULL,
-            last_name VARCHAR(50) NOT NULL,
-            address_1 VARCHAR(100) NOT NULL,
-            address_2 VARCHAR(100),
-            city VARCHAR(50) NOT NULL,
-            state VARCHAR(20) NOT NULL,
-            zip_code VARCHAR(5) NOT NULL,
-            join_date DATE NOT NULL
-        );
-        """,
-
-        "CREATE INDEX IF NOT EXISTS accounts_city_idx ON accounts (city);",
-        "CREATE INDEX IF NOT EXISTS accounts_state_idx ON accounts (state);",
-        
-        """
-        CREATE TABLE IF NOT EXISTS products (
-            product_id INTEGER PRIMARY KEY,
-            product_code INTEGER NOT NULL,
-            product_description VARCHAR(255) NOT NULL
-            CONSTRAINT unique_product_code UNIQUE (product_code)
-        );
-        """,
-
-        "CREATE INDEX IF NOT EXISTS products_code_idx ON products (product_code);",
-
-        """
-        CREATE TABLE IF NOT EXISTS transactions (
-            transaction_id VARCHAR(30) PRIMARY KEY,
-            transaction_date DATE NOT NULL,
-            product_id INTEGER NOT NULL,
-            product_code INTEGER NOT NULL,
-            product_description VARCHAR(255) NOT NULL,
-            quantity INTEGER NOT NULL CHECK (quantity > 0),
-            account_id INTEGER NOT NULL REFERENCES accounts (customer_id),
-            CONSTRAINT fk_product FOREIGN KEY (product_id, product_code)
-                REFERENCES products (product_id, product_code)
-        );
-        """,
-
-        "CREATE INDEX IF NOT EXISTS transactions_date_idx ON transactions (transaction_date)",
-        "CREATE INDEX IF NOT EXISTS transactions_account_idx ON transactions (account_id)",
-        "CREATE INDEX IF NOT EXISTS transactions_product_idx ON transactions (product_id)",
-    ]
-    
+CONN_PARAMS = {
+    "host": "postgres",
+    "database": "postgres",
+    "user": "postgres",
+    "password": "postgres",
+}
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+VALIDATED_DIR = Path(__file__).resolve().parent / "validated"
+BATCH_SIZE = 50_000
+
+# Tables within a stage have no FKs on each other and load concurrently;
+# a stage only starts once every table it references is in.
+LOAD_STAGES = [
+    ["accounts", "products"],
+    ["transactions"],
+]
+
+PRIMARY_KEYS = {
+    "accounts": "customer_id",
+    "products": "product_id",
+    "transactions": "transaction_id",
+}
+
+TABLE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS accounts (
+        customer_id INTEGER PRIMARY KEY,
+        first_name VARCHAR(50) NOT NULL,
+        last_name VARCHAR(50) NOT NULL,
+        address_1 VARCHAR(100) NOT NULL,
+        address_2 VARCHAR(100),
+        city VARCHAR(50) NOT NULL,
+        state VARCHAR(20) NOT NULL,
+        zip_code VARCHAR(5) NOT NULL,
+        join_date DATE NOT NULL
+    );
+    """,
+
+    """
+    CREATE TABLE IF NOT EXISTS products (
+        product_id INTEGER PRIMARY KEY,
+        product_code INTEGER NOT NULL,
+        product_description VARCHAR(255) NOT NULL,
+        CONSTRAINT unique_product_code UNIQUE (product_code),
+        CONSTRAINT unique_product_id_code UNIQUE (product_id, product_code)
+    );
+    """,
+
+    """
+    CREATE TABLE IF NOT EXISTS transactions (
+        transaction_id VARCHAR(30) PRIMARY KEY,
+        transaction_date DATE NOT NULL,
+        product_id INTEGER NOT NULL,
+        product_code INTEGER NOT NULL,
+        product_description VARCHAR(255) NOT NULL,
+        quantity INTEGER NOT NULL CHECK (quantity > 0),
+        account_id INTEGER NOT NULL REFERENCES accounts (customer_id),
+        CONSTRAINT fk_product FOREIGN KEY (product_id, product_code)
+            REFERENCES products (product_id, product_code)
+    );
+    """,
+
+    # One row per CSV that has been merged by an incremental load.
+    """
+    CREATE TABLE IF NOT EXISTS load_checksums (
+        file_name VARCHAR(255) PRIMARY KEY,
+        checksum CHAR(64) NOT NULL,
+        loaded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    """,
+]
+
+# Secondary indexes only; keys and constraints stay with the tables. These
+# can be built after a bulk load, which is cheaper than maintaining them
+# row by row during COPY.
+INDEX_DDL = [
+    "CREATE INDEX IF NOT EXISTS accounts_city_idx ON accounts (city);",
+    "CREATE INDEX IF NOT EXISTS accounts_state_idx ON accounts (state);",
+    "CREATE INDEX IF NOT EXISTS products_code_idx ON products (product_code);",
+    "CREATE INDEX IF NOT EXISTS transactions_date_idx ON transactions (transaction_date)",
+    "CREATE INDEX IF NOT EXISTS transactions_account_idx ON transactions (account_id)",
+    "CREATE INDEX IF NOT EXISTS transactions_product_idx ON transactions (product_id)",
+]
+
+
+def run_ddl(conn, cmds):
     try:
         with conn.cursor() as cur:
             for cmd in cmds:
                 cur.execute(cmd)
         conn.commit()
+    except psycopg2.Error:
+        conn.rollback()
+        raise
+
+
+def create_tables(conn, indexes=True):
+    try:
+        run_ddl(conn, TABLE_DDL + (INDEX_DDL if indexes else []))
         logging.info("Successfully created tables.")
     except psycopg2.Error as e:
         logging.error(f"Error creating tables: {e}")
-        cur.rollback()
         raise
 
 
-def ingest_data(conn):
+def index_name(ddl):
+    # "CREATE INDEX IF NOT EXISTS <name> ON ..."
+    return ddl.split()[5]
+
+
+def drop_indexes(conn):
+    try:
+        run_ddl(conn, [f"DROP INDEX IF EXISTS {index_name(cmd)}" for cmd in INDEX_DDL])
+        logging.info(f"Dropped {len(INDEX_DDL)} indexes for the load.")
+    except psycopg2.Error as e:
+        logging.error(f"Error dropping indexes: {e}")
+        raise
+
+
+def create_indexes(conn):
+    start = time.perf_counter()
+    try:
+        run_ddl(conn, INDEX_DDL)
+        logging.info(f"Built {len(INDEX_DDL)} indexes in {time.perf_counter() - start:.2f}s.")
+    except psycopg2.Error as e:
+        logging.error(f"Error creating indexes: {e}")
+        raise
+
+
+def read_batches(path, batch_size=BATCH_SIZE):
+    # The CSVs separate fields with ", ", which COPY would keep as leading
+    # spaces (and overflow zip_code VARCHAR(5)). Parse them here and re-emit
+    # clean CSV, batch_size rows at a time.
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f, skipinitialspace=True)
+        header = [name.strip() for name in next(reader)]
+        rows = (row for row in reader if row)
+
+        while batch := list(islice(rows, batch_size)):
+            buf = io.StringIO()
+            csv.writer(buf, lineterminator="\n").writerows(batch)
+            buf.seek(0)
+            yield header, buf, len(batch)
+
+
+def copy_statement(table, columns):
+    return sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '')").format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(map(sql.Identifier, columns)),
+    )
+
+
+def load_table(db_pool, table, path, batch_size=BATCH_SIZE):
+    # One pooled connection per table, one COPY and commit per batch, so a
+    # failure only loses the batch in flight.
+    conn = db_pool.getconn()
+    start = time.perf_counter()
+    rows = 0
+    try:
+        with conn.cursor() as cur:
+            for header, buf, n in read_batches(path, batch_size):
+                cur.copy_expert(copy_statement(table, header).as_string(conn), buf)
+                conn.commit()
+                rows += n
+        return table, rows, time.perf_counter() - start
+
+    except psycopg2.Error as e:
+        conn.rollback()
+        logging.error(f"Error loading {table} after {rows} rows: {e}")
+        raise
+
+    finally:
+        db_pool.putconn(conn)
+
+
+def file_checksum(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def merge_statement(table, columns):
+    # Only rows that are new or differ from what is stored get written;
+    # DISTINCT ON keeps the first copy of a key repeated within the file,
+    # the same row validate.py keeps when it rejects the later duplicates.
+    key = PRIMARY_KEYS[table]
+    updates = [column for column in columns if column != key]
+    return sql.SQL("""
+        INSERT INTO {table} AS t ({columns})
+        SELECT DISTINCT ON ({key}) {columns} FROM {staging} ORDER BY {key}, ctid
+        ON CONFLICT ({key}) DO UPDATE SET ({updates}) = ROW({excluded})
+        WHERE ({current}) IS DISTINCT FROM ({excluded})
+    """).format(
+        table=sql.Identifier(table),
+        staging=sql.Identifier(f"{table}_staging"),
+        key=sql.Identifier(key),
+        columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        updates=sql.SQL(", ").join(map(sql.Identifier, updates)),
+        excluded=sql.SQL(", ").join(sql.Identifier("excluded", column) for column in updates),
+        current=sql.SQL(", ").join(sql.Identifier("t", column) for column in updates),
+    )
+
+
+def merge_table(db_pool, table, path, batch_size=BATCH_SIZE):
+    # Incremental load: skip the file if it is unchanged since the last
+    # merge, otherwise COPY it into an UNLOGGED staging table and upsert
+    # from there. Staging, merge and checksum commit together, so a failed
+    # merge leaves the file to be picked up again next run.
+    conn = db_pool.getconn()
+    start = time.perf_counter()
     try:
-        with conn.cursor as cur:
-            
-            logging.info("Ingesting accounts data.")
-            with open("data/accounts.csv") as f:
-                f.next() # Skip header
-                cur.copy_expert(
-                    "COPY accounts FROM STDIN WITH (FORMAT csv, NULL '')",
-                    f
-                )
-
-            logging.info("Ingesting products data.")
-            with open("data/products.csv") as f:
-                f.next()
-                cur.copy_expert(
-                    "COPY products FROM STDIN WITH (FORMAT csv, NULL '')",
-                    f
-                )
-
-            logging.info("Ingesting transactions data.")
-            with open("data/transactions.csv") as f:
-                f.next()
-                cur.copy_expert(
-                    "COPY transactions FROM STDIN WITH (FORMAT csv, NULL '')",
-                    f
-                )
-
-            conn.commit()
-            logging.info("Successfully ingested CSV data.")
-
-            for table in ["accounts", "products", "transactions"]:
-                cur.execute(psycopg2.sql.SQL("SELECT COUNT(*) FROM {}").format(psycopg2.sql.Identifier(table)))
-                count = cur.fetchone()[0]
-                logging.info(f"Loaded {count} rows into {table}.")
+        checksum = file_checksum(path)
+        with conn.cursor() as cur:
+            cur.execute("SELECT checksum FROM load_checksums WHERE file_name = %s", (path.name,))
+            row = cur.fetchone()
+            if row and row[0] == checksum:
+                logging.info(f"{path.name} is unchanged since the last load, skipping {table}.")
+                conn.rollback()
+                return table, 0, time.perf_counter() - start
+
+            staging = sql.Identifier(f"{table}_staging")
+            cur.execute(sql.SQL("CREATE UNLOGGED TABLE IF NOT EXISTS {} (LIKE {} INCLUDING DEFAULTS)").format(
+                staging, sql.Identifier(table)
+            ))
+            cur.execute(sql.SQL("TRUNCATE {}").format(staging))
 
+            columns = None
+            for header, buf, n in read_batches(path, batch_size):
+                columns = header
+                cur.copy_expert(copy_statement(f"{table}_staging", header).as_string(conn), buf)
+
+            rows = 0
+            if columns:
+                cur.execute(merge_statement(table, columns))
+                rows = cur.rowcount
+
+            cur.execute(
+                """
+                INSERT INTO load_checksums (file_name, checksum) VALUES (%s, %s)
+                ON CONFLICT (file_name) DO UPDATE SET checksum = excluded.checksum, loaded_at = now()
+                """,
+                (path.name, checksum),
+            )
+        conn.commit()
+        return table, rows, time.perf_counter() - start
 
     except psycopg2.Error as e:
-        logging.error(f"Error ingesting data: {e}")
-        cur.rollback()
+        conn.rollback()
+        logging.error(f"Error merging {table}: {e}")
         raise
 
+    finally:
+        db_pool.putconn(conn)
+
+
+def ingest_data(db_pool, data_dir=DATA_DIR, batch_size=BATCH_SIZE, stages=LOAD_STAGES, load=None):
+    load = load or load_table
+    results = []
+    with ThreadPoolExecutor(max_workers=max(len(stage) for stage in stages)) as executor:
+        for stage in stages:
+            logging.info(f"Ingesting {', '.join(stage)} data.")
+            futures = [
+                executor.submit(load, db_pool, table, Path(data_dir) / f"{table}.csv", batch_size)
+                for table in stage
+            ]
+            results += [future.result() for future in futures]
+
+    for table, rows, seconds in results:
+        logging.info(f"Wrote {rows} rows to {table} in {seconds:.2f}s ({rows / max(seconds, 1e-9):.0f} rows/s).")
+    logging.info("Successfully ingested CSV data.")
+    return results
+
 
+def log_counts(conn):
+    with conn.cursor() as cur:
+        for table in [table for stage in LOAD_STAGES for table in stage]:
+            cur.execute(sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(table)))
+            count = cur.fetchone()[0]
+            logging.info(f"Loaded {count} rows into {table}.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Create the Exercise-5 tables and load the CSVs.")
+    parser.add_argument("--data-dir", default=DATA_DIR, type=Path)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per COPY and commit")
+    parser.add_argument(
+        "--defer-indexes", action="store_true", help="drop secondary indexes for the load and rebuild them after"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="upsert changed rows through staging tables and skip unchanged files",
+    )
+    parser.add_argument(
+        "--skip-validation",
+        action="store_true",
+        help="COPY the CSVs as they are instead of validating them into --validated-dir first",
+    )
+    parser.add_argument("--validated-dir", default=VALIDATED_DIR, type=Path)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
 
-def main():
-    host = "postgres"
-    database = "postgres"
-    user = "postgres"
-    pas = "postgres"
-    
     try:
-        conn = psycopg2.connect(host=host, database=database, user=user, password=pas)
+        # One connection per concurrently loading table.
+        db_pool = pool.ThreadedConnectionPool(1, max(map(len, LOAD_STAGES)), **CONN_PARAMS)
+
+        conn = db_pool.getconn()
+        try:
+            create_tables(conn, indexes=not args.defer_indexes)
+            if args.defer_indexes:
+                # Indexes left from an earlier run would still be
+                # maintained row by row during COPY.
+                drop_indexes(conn)
+        finally:
+            db_pool.putconn(conn)
+
+        data_dir = args.data_dir
+        if not args.skip_validation:
+            refs = None
+            if args.incremental:
+                conn = db_pool.getconn()
+                try:
+                    refs = seed_references(conn)
+                finally:
+                    db_pool.putconn(conn)
+
+            tables = [table for stage in LOAD_STAGES for table in stage]
+            validate_dir(data_dir, args.validated_dir, tables, refs)
+            data_dir = args.validated_dir
+
+        load = merge_table if args.incremental else load_table
+        ingest_data(db_pool, data_dir, args.batch_size, load=load)
 
-        create_tables(conn)
-        ingest_data(conn)
+        conn = db_pool.getconn()
+        try:
+            if args.defer_indexes:
+                create_indexes(conn)
+            log_counts(conn)
+        finally:
+            db_pool.putconn(conn)
 
     except psycopg2.Error as e:
         logging.error(f"Data pipeline failed with the following error: {e}")
         raise
 
     finally:
-        if "conn" in locals():
-            conn.close()
-            logging.info("Database connection closed.")
+        if "db_pool" in locals():
+            db_pool.closeall()
+            logging.info("Database connections closed.")
 
 
 
@@ -0,0 +1,97 @@
+import csv
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from main import DATA_DIR, ingest_data, read_batches
+
+
+def test_read_batches_strips_separator_spaces():
+    batches = list(read_batches(DATA_DIR / "accounts.csv"))
+
+    assert len(batches) == 1
+    header, buf, n = batches[0]
+    assert header[:3] == ["customer_id", "first_name", "last_name"]
+    assert n == 2
+    assert list(csv.reader(buf)) == [
+        ["4321", "john", "doe", "1532 East Main St.", "PO BOX 5", "Middleton", "Ohio", "50045", "2022/01/16"],
+        ["5677", "jane", "doe", "543 Oak Rd.", "", "BigTown", "Iowa", "84432", "2021/05/07"],
+    ]
+
+
+@pytest.mark.parametrize("batch_size, expected", [(1, [1, 1, 1]), (2, [2, 1]), (10, [3])])
+def test_read_batches_sizes(tmp_path, batch_size, expected):
+    path = tmp_path / "products.csv"
+    path.write_text("product_id, product_code, product_description\n1, 01, a\n2, 02, b\n\n3, 03, c")
+
+    assert [n for _, _, n in read_batches(path, batch_size)] == expected
+
+
+def test_ingest_data_waits_for_parent_tables(mocker):
+    calls = []
+
+    def fake_load(db_pool, table, path, batch_size):
+        calls.append(table)
+        return table, 1, 0.1
+
+    mocker.patch("main.load_table", side_effect=fake_load)
+
+    results = ingest_data(None, DATA_DIR, 10)
+
+    assert calls[-1] == "transactions"
+    assert sorted(calls[:2]) == ["accounts", "products"]
+    assert [table for table, _, _ in results] == ["accounts", "products", "transactions"]
+
+
+def test_file_checksum(tmp_path):
+    path = tmp_path / "accounts.csv"
+    path.write_text("a, b\n1, 2\n")
+    before = main.file_checksum(path, block_size=3)
+
+    assert before == main.file_checksum(path)
+    path.write_text("a, b\n1, 3\n")
+    assert main.file_checksum(path) != before
+
+
+def test_ingest_data_uses_given_loader(mocker):
+    load = mocker.Mock(side_effect=lambda db_pool, table, path, batch_size: (table, 0, 0.0))
+
+    ingest_data(None, DATA_DIR, 10, load=load)
+
+    assert load.call_count == 3
+    assert {call.args[2].name for call in load.call_args_list} == {
+        "accounts.csv", "products.csv", "transactions.csv"
+    }
+
+
+def test_drop_indexes(mocker):
+    conn = mocker.MagicMock()
+
+    main.drop_indexes(conn)
+
+    execute = conn.cursor.return_value.__enter__.return_value.execute
+    assert [c.args[0] for c in execute.call_args_list] == [
+        "DROP INDEX IF EXISTS accounts_city_idx",
+        "DROP INDEX IF EXISTS accounts_state_idx",
+        "DROP INDEX IF EXISTS products_code_idx",
+        "DROP INDEX IF EXISTS transactions_date_idx",
+        "DROP INDEX IF EXISTS transactions_account_idx",
+        "DROP INDEX IF EXISTS transactions_product_idx",
+    ]
+    conn.commit.assert_called_once()
+
+
+def test_defer_indexes_drops_them_before_the_load(mocker):
+    mocker.patch("main.pool.ThreadedConnectionPool")
+    steps = mocker.Mock()
+    for name in ["create_tables", "drop_indexes", "ingest_data", "create_indexes", "log_counts"]:
+        mocker.patch(f"main.{name}", getattr(steps, name))
+
+    main.main(["--defer-indexes", "--skip-validation"])
+
+    assert [c[0] for c in steps.mock_calls] == [
+        "create_tables", "drop_indexes", "ingest_data", "create_indexes", "log_counts"
+    ]
@@ -0,0 +1,144 @@
+import csv
+import uuid
+import pytest
+import sys
+import os
+
+import psycopg2
+from psycopg2 import pool, sql
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from validate import COLUMNS, check_row, validate_dir
+
+TABLES = ["accounts", "products", "transactions"]
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "accounts.csv").write_text(
+        "customer_id, first_name, last_name, address_1, address_2, city, state, zip_code, join_date\n"
+        "4321, john, doe, 1532 East Main St., PO BOX 5, Middleton, Ohio, 50045, 2022/01/16\n"
+        "5677, jane, doe, 543 Oak Rd.,,BigTown, Iowa, 84432, 2021/05/07\n"
+        "5678, jim, doe, 1 Elm St.,,BigTown, Iowa, 844321, 2021/05/07\n"
+    )
+    (data / "products.csv").write_text(
+        "product_id, product_code, product_description\n"
+        "345, 01, Widget Medium\n"
+        "241, 02, Widget Large\n"
+        "242, 02, Widget Copy\n"
+    )
+    (data / "transactions.csv").write_text(
+        "transaction_id, transaction_date, product_id, product_code, product_description, quantity, account_id\n"
+        "T1, 2022/06/01, 345, 01, Widget Medium, 5, 4321\n"
+        "T2, 2022/06/02, 241, 02, Widget Large, 0, 5677\n"
+        "T3, 2022/06/02, 241, 01, Widget Large, 1, 5677\n"
+        "T4, 2022/06/02, 241, 02, Widget Large, 1, 5678\n"
+        "T5, 2022-06-31, 241, 02, Widget Large, 1, 5677\n"
+        "T1, 2022/06/03, 345, 01, Widget Medium, 2, 4321\n"
+        "T6, 2022/06/03, 345, 01, Widget Medium, 2\n"
+        "T7, 2022/06/03, 242, 02, Widget Copy, 2, 4321\n"
+        "T8, 2022/06/04, 241, 2, Widget Large, 3, 5677\n"
+    )
+    return data
+
+
+@pytest.mark.parametrize("row, reason", [
+    (["1", "2022/06/01", "1", "1", "x", "1", "1"], None),
+    (["1", "2022/06/01", "1", "1", "x", "abc", "1"], "quantity is not an integer"),
+    (["1", "2022/06/01", "1", "1", "x", "3000000000", "1"], "quantity is out of range"),
+    (["1", "06/01/2022", "1", "1", "x", "1", "1"], "transaction_date is not a date"),
+    (["x" * 31, "2022/06/01", "1", "1", "x", "1", "1"], "transaction_id is longer than 30"),
+    (["1", "2022/06/01", "1", "1", "", "1", "1"], "product_description is empty"),
+])
+def test_check_row(row, reason):
+    assert check_row(COLUMNS["transactions"], row)[1] == reason
+
+
+def test_validate_dir(tmp_path, data_dir):
+    out = tmp_path / "validated"
+
+    results = validate_dir(data_dir, out, TABLES)
+
+    assert results == [("accounts", 2, 1), ("products", 2, 1), ("transactions", 2, 7)]
+    assert [row[0] for row in read_rows(out / "transactions.csv")] == ["T1", "T8"]
+    assert read_rows(out / "accounts.csv")[1][4] == ""
+
+    reasons = {row[1]: row[-1] for row in read_rows(out / "rejects" / "transactions.csv")}
+    assert reasons == {
+        "T2": "quantity is below 1",
+        "T3": "product_id, product_code not found in products",
+        "T4": "account_id not found in accounts",
+        "T5": "transaction_date is not a date",
+        "T1": "duplicate transaction_id",
+        "T6": "expected 7 fields, got 6",
+        "T7": "product_id, product_code not found in products",
+    }
+    assert read_rows(out / "rejects" / "accounts.csv")[0][-1] == "zip_code is longer than 5"
+    assert read_rows(out / "rejects" / "products.csv")[0][-1] == "duplicate product_code"
+
+
+def test_validate_dir_seeded_references(tmp_path, data_dir):
+    (data_dir / "accounts.csv").write_text(
+        "customer_id, first_name, last_name, address_1, address_2, city, state, zip_code, join_date\n"
+    )
+    refs = {("accounts", ("customer_id",)): {(4321,), (5677,), (5678,)}}
+
+    results = validate_dir(data_dir, tmp_path / "validated", TABLES, refs)
+
+    assert results[2] == ("transactions", 3, 6)
+
+
+@pytest.fixture
+def db_pool():
+    # Runs against the compose Postgres, in a schema of its own.
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    try:
+        conn = psycopg2.connect(**main.CONN_PARAMS, connect_timeout=3)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres not reachable: {e}")
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(schema)))
+
+    db_pool = pool.ThreadedConnectionPool(1, 2, **main.CONN_PARAMS, options=f"-c search_path={schema}")
+    yield db_pool
+    db_pool.closeall()
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(schema)))
+    conn.close()
+
+
+def test_validate_and_merge_keep_the_same_duplicate(tmp_path, db_pool):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "accounts.csv").write_text(
+        "customer_id, first_name, last_name, address_1, address_2, city, state, zip_code, join_date\n"
+        "4321, john, doe, 1532 East Main St., PO BOX 5, Middleton, Ohio, 50045, 2022/01/16\n"
+        "4321, johnny, doe, 1 Elm St.,,BigTown, Iowa, 84432, 2021/05/07\n"
+    )
+
+    validate_dir(data, tmp_path / "validated", ["accounts"])
+    assert [row[1] for row in read_rows(tmp_path / "validated" / "rejects" / "accounts.csv")] == ["4321"]
+
+    conn = db_pool.getconn()
+    main.create_tables(conn)
+    db_pool.putconn(conn)
+
+    # Validated or not, the first copy of the key is the one stored.
+    for path in [tmp_path / "validated" / "accounts.csv", data / "accounts.csv"]:
+        main.merge_table(db_pool, "accounts", path)
+        conn = db_pool.getconn()
+        with conn.cursor() as cur:
+            cur.execute("SELECT customer_id, first_name FROM accounts")
+            assert cur.fetchall() == [(4321, "john")]
+        conn.rollback()
+        db_pool.putconn(conn)
@@ -0,0 +1,187 @@
+import csv
+import logging
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+from psycopg2 import sql
+
+# Streaming pre-load validation. Each CSV is read row by row and checked
+# against the column types, lengths and CHECKs of the DDL in main.py, its
+# unique keys and, for transactions, the keys of the parent tables. Clean
+# rows go to <out_dir>/<table>.csv for COPY, rejected rows (with a reason)
+# to <out_dir>/rejects/<table>.csv. Memory is the key sets only.
+
+Column = namedtuple("Column", ["name", "type", "length", "nullable", "minimum"], defaults=[None, False, None])
+
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+DATE_FORMATS = ["%Y/%m/%d", "%Y-%m-%d"]
+
+# Mirrors TABLE_DDL in main.py.
+COLUMNS = {
+    "accounts": [
+        Column("customer_id", "int"),
+        Column("first_name", "varchar", 50),
+        Column("last_name", "varchar", 50),
+        Column("address_1", "varchar", 100),
+        Column("address_2", "varchar", 100, nullable=True),
+        Column("city", "varchar", 50),
+        Column("state", "varchar", 20),
+        Column("zip_code", "varchar", 5),
+        Column("join_date", "date"),
+    ],
+    "products": [
+        Column("product_id", "int"),
+        Column("product_code", "int"),
+        Column("product_description", "varchar", 255),
+    ],
+    "transactions": [
+        Column("transaction_id", "varchar", 30),
+        Column("transaction_date", "date"),
+        Column("product_id", "int"),
+        Column("product_code", "int"),
+        Column("product_description", "varchar", 255),
+        Column("quantity", "int", minimum=1),
+        Column("account_id", "int"),
+    ],
+}
+
+UNIQUE_KEYS = {
+    "accounts": [("customer_id",)],
+    "products": [("product_id",), ("product_code",)],
+    "transactions": [("transaction_id",)],
+}
+
+# table: [(columns, parent table, parent columns)]
+FOREIGN_KEYS = {
+    "transactions": [
+        (("account_id",), "accounts", ("customer_id",)),
+        (("product_id", "product_code"), "products", ("product_id", "product_code")),
+    ],
+}
+
+
+def parse_value(column, value):
+    # Returns (typed value, reason); reason is None when the value is valid.
+    if value == "":
+        return None, None if column.nullable else f"{column.name} is empty"
+
+    if column.type == "int":
+        try:
+            typed = int(value)
+        except ValueError:
+            return None, f"{column.name} is not an integer"
+        if not INT_MIN <= typed <= INT_MAX:
+            return None, f"{column.name} is out of range"
+        if column.minimum is not None and typed < column.minimum:
+            return None, f"{column.name} is below {column.minimum}"
+        return typed, None
+
+    if column.type == "date":
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt).date(), None
+            except ValueError:
+                pass
+        return None, f"{column.name} is not a date"
+
+    if len(value) > column.length:
+        return None, f"{column.name} is longer than {column.length}"
+    return value, None
+
+
+def check_row(columns, row):
+    if len(row) != len(columns):
+        return None, f"expected {len(columns)} fields, got {len(row)}"
+
+    typed = {}
+    for column, value in zip(columns, row):
+        typed[column.name], reason = parse_value(column, value)
+        if reason:
+            return None, reason
+    return typed, None
+
+
+def referenced_keys():
+    return {(parent, cols) for fks in FOREIGN_KEYS.values() for _, parent, cols in fks}
+
+
+def seed_references(conn):
+    # Parent keys already in the database, for incremental loads where the
+    # parent CSV may be unchanged (or hold only a delta).
+    refs = {}
+    for parent, cols in referenced_keys():
+        with conn.cursor(name=f"seed_{parent}") as cur:
+            cur.itersize = 50_000
+            cur.execute(sql.SQL("SELECT {} FROM {}").format(
+                sql.SQL(", ").join(map(sql.Identifier, cols)), sql.Identifier(parent)
+            ))
+            refs[(parent, cols)] = {tuple(row) for row in cur}
+    conn.commit()
+    return refs
+
+
+def validate_table(table, path, out_dir, refs):
+    columns = COLUMNS[table]
+    names = [column.name for column in columns]
+    seen = {cols: set() for cols in UNIQUE_KEYS.get(table, [])}
+    exported = [cols for parent, cols in refs if parent == table]
+    valid = rejected = 0
+
+    out_dir = Path(out_dir)
+    (out_dir / "rejects").mkdir(parents=True, exist_ok=True)
+
+    with open(path, newline="", encoding="utf-8") as f, \
+            open(out_dir / f"{table}.csv", "w", newline="", encoding="utf-8") as f_clean, \
+            open(out_dir / "rejects" / f"{table}.csv", "w", newline="", encoding="utf-8") as f_rejects:
+        reader = csv.reader(f, skipinitialspace=True)
+        header = [name.strip() for name in next(reader)]
+        if header != names:
+            raise ValueError(f"{path} has columns {header}, expected {names}")
+
+        clean = csv.writer(f_clean, lineterminator="\n")
+        clean.writerow(names)
+        rejects = csv.writer(f_rejects, lineterminator="\n")
+        rejects.writerow(["line"] + names + ["reason"])
+
+        for line, row in enumerate(reader, start=2):
+            if not row:
+                continue
+
+            typed, reason = check_row(columns, row)
+            if typed is not None:
+                for cols in seen:
+                    if tuple(typed[c] for c in cols) in seen[cols]:
+                        reason = f"duplicate {', '.join(cols)}"
+                        break
+                for cols, parent, parent_cols in FOREIGN_KEYS.get(table, []):
+                    if reason:
+                        break
+                    if tuple(typed[c] for c in cols) not in refs[(parent, parent_cols)]:
+                        reason = f"{', '.join(cols)} not found in {parent}"
+
+            if reason:
+                rejects.writerow([line] + row + [reason])
+                rejected += 1
+                continue
+
+            for cols in seen:
+                seen[cols].add(tuple(typed[c] for c in cols))
+            for cols in exported:
+                refs[(table, cols)].add(tuple(typed[c] for c in cols))
+            clean.writerow(row)
+            valid += 1
+
+    log = logging.warning if rejected else logging.info
+    log(f"Validated {table}: {valid} clean rows, {rejected} rejected.")
+    return table, valid, rejected
+
+
+def validate_dir(data_dir, out_dir, tables, refs=None):
+    # Tables must come parents first so their keys are indexed before the
+    # rows that reference them are checked.
+    refs = refs or {}
+    for key in referenced_keys():
+        refs.setdefault(key, set())
+
+    return [validate_table(table, Path(data_dir) / f"{table}.csv", out_dir, refs) for table in tables]
@@ -0,0 +1,123 @@
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main as job
+
+# Wall time, Spark jobs and stages for the six reports computed two ways:
+# each report from its own fresh read of the zips, as six independent
+# queries would, against one cached parse feeding the shared rollups.
+#
+#   docker-compose run bench
+#   /spark/bin/spark-submit benchmarks/bench_reports.py --data-dir data
+
+HEADER_2019 = [
+    "trip_id", "start_time", "end_time", "bikeid", "tripduration", "from_station_id", "from_station_name",
+    "to_station_id", "to_station_name", "usertype", "gender", "birthyear",
+]
+HEADER_2020 = [
+    "ride_id", "rideable_type", "started_at", "ended_at", "start_station_name", "start_station_id",
+    "end_station_name", "end_station_id", "start_lat", "start_lng", "end_lat", "end_lng", "member_casual",
+]
+
+
+def write_zip(path, header, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    writer.writerows(rows)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(os.path.basename(path).replace(".zip", ".csv"), buf.getvalue())
+
+
+def generate_data(data_dir, rows, stations=600, seed=0):
+    # Half the trips in the 2019 layout, half in the 2020 one.
+    rng = random.Random(seed)
+
+    def trip(start):
+        start_time = start + timedelta(seconds=rng.randint(0, 90 * 86400))
+        duration = rng.randint(60, 7200)
+        return start_time, start_time + timedelta(seconds=duration), duration, rng.randrange(stations), \
+            rng.randrange(stations)
+
+    def rows_2019():
+        for i in range(rows // 2):
+            start, end, duration, a, b = trip(datetime(2019, 10, 1))
+            yield [
+                i, start, end, rng.randint(1, 6000), f"{duration:,.1f}", a, f"Station {a}", b, f"Station {b}",
+                "Subscriber", rng.choice(["Male", "Female", ""]), rng.choice([""] + list(range(1940, 2004))),
+            ]
+
+    def rows_2020():
+        for i in range(rows // 2):
+            start, end, _, a, b = trip(datetime(2020, 1, 1))
+            yield [
+                f"R{i:015X}", "docked_bike", start, end, f"Station {a}", a, f"Station {b}", b,
+                41.9, -87.6, 41.9, -87.6, "member",
+            ]
+
+    write_zip(os.path.join(data_dir, "Divvy_Trips_2019_Q4.zip"), HEADER_2019, rows_2019())
+    write_zip(os.path.join(data_dir, "Divvy_Trips_2020_Q1.zip"), HEADER_2020, rows_2020())
+
+
+def timed(spark, label, func):
+    sc = spark.sparkContext
+    spark.catalog.clearCache()
+    sc.setJobGroup(label, label)
+
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    tracker = sc.statusTracker()
+    jobs = tracker.getJobIdsForGroup(label)
+    stages = {stage for job_id in jobs for stage in tracker.getJobInfo(job_id).stageIds}
+    print(f"{label:>20}: {elapsed:7.1f}s  {len(jobs):3d} jobs  {len(stages):3d} stages")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise-6 report job benchmark.")
+    parser.add_argument("--data-dir", help="directory of Divvy zips (default: generate them)")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="trips to generate")
+    args = parser.parse_args()
+
+    spark = job.get_spark()
+    spark.sparkContext.setLogLevel("WARN")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = os.path.join(tmp, "data")
+            os.mkdir(data_dir)
+            print(f"Generating {args.rows} trips...")
+            generate_data(data_dir, args.rows)
+
+        reports_dir = os.path.join(tmp, "reports")
+
+        def separate_scans():
+            for name, (rollup, report) in job.REPORTS.items():
+                job.write_report(report(rollup(job.read_trips(spark, data_dir))), name, reports_dir)
+
+        def shared_scan():
+            trips = job.read_trips(spark, data_dir).cache()
+            for name, report in job.build_reports(trips):
+                job.write_report(report, name, reports_dir)
+
+        try:
+            timed(spark, "six separate scans", separate_scans)
+            timed(spark, "one cached scan", shared_scan)
+        finally:
+            spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+
+# Parquet cache for zipped Spark inputs. Exercise-7 carries an identical
+# copy of this file; keep the two in sync.
+#
+# Zip is not splittable: every run over a zipped CSV decompresses each
+# archive in one task and parses all of its text again. This cache pays
+# that once. The first read of a zip transcodes it to Parquet under
+# <cache_dir>/<zip name>/<checksum>/; later runs read that Parquet, which
+# Spark splits across every core and prunes to the columns a query uses.
+# A changed zip gets a new checksum, and its old entry is removed.
+#
+# The cache directory is on the local filesystem, next to the zips.
+
+CHUNK_SIZE = 1024 * 1024
+MARKER = "_SUCCESS"
+
+
+def file_checksum(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def zip_checksum(zip_path, entry_dir):
+    # Hashing a multi-GB zip on every run would cost a full read, so the
+    # checksum is remembered alongside the size and mtime it was taken at.
+    stat = os.stat(zip_path)
+    memo_path = entry_dir / "checksum.json"
+    try:
+        with open(memo_path) as f:
+            memo = json.load(f)
+        if memo["size"] == stat.st_size and memo["mtime_ns"] == stat.st_mtime_ns:
+            return memo["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    checksum = file_checksum(zip_path)
+    entry_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = memo_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": checksum}, f)
+    os.replace(tmp_path, memo_path)
+    return checksum
+
+
+def remove_stale(entry_dir, keep):
+    for path in entry_dir.iterdir():
+        if path.is_dir() and path.name != keep:
+            logging.info(f"Removing stale cache entry {path}.")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def cached_parquet(zip_path, cache_dir, write):
+    # write(zip_path, out_path) transcodes one zip to Parquet at out_path.
+    zip_path = Path(zip_path)
+    entry_dir = Path(cache_dir) / zip_path.name
+    checksum = zip_checksum(zip_path, entry_dir)
+    out_path = entry_dir / checksum
+
+    if (out_path / MARKER).exists():
+        logging.info(f"Input cache hit for {zip_path.name}.")
+        return out_path
+
+    logging.info(f"Input cache miss for {zip_path.name}, transcoding to {out_path}...")
+    remove_stale(entry_dir, checksum)
+
+    # Written aside and renamed into place, so an interrupted run never
+    # leaves an entry that looks complete.
+    tmp_path = entry_dir / f"_{checksum}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    write(str(zip_path), str(tmp_path))
+    (tmp_path / MARKER).touch()
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def cached_inputs(data_dir, cache_dir, write, pattern="*.zip"):
+    zip_paths = sorted(Path(data_dir).glob(pattern))
+    if not zip_paths:
+        raise FileNotFoundError(f"No {pattern} in {data_dir}")
+    return [str(cached_parquet(path, cache_dir, write)) for path in zip_paths]
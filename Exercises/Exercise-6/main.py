@@ -1,9 +1,266 @@
-from pyspark.sql import SparkSession
+import csv
+import io
+import logging
+import time
+import zipfile
+from pathlib import Path
+
+from pyspark.sql import SparkSession, Window
+import pyspark.sql.functions as F
+from pyspark.sql.types import StructField, StructType, StringType
+
+from input_cache import cached_inputs
+
+logging.basicConfig(
+    format="{asctime} | {levelname} | {message}",
+    style="{",
+    datefmt="%Y-%m-%d %H:%M",
+    level=logging.INFO
+)
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+REPORTS_DIR = BASE_DIR / "reports"
+CACHE_DIR = BASE_DIR / "cache"
+
+FIELDS = [
+    "trip_id",
+    "start_time",
+    "end_time",
+    "duration",
+    "start_station_id",
+    "start_station_name",
+    "end_station_id",
+    "end_station_name",
+    "gender",
+    "birth_year",
+]
+
+# Source column for each field, per Divvy export layout. The 2020 exports
+# dropped trip duration and rider demographics; those fields stay null.
+LAYOUTS = [
+    {
+        "trip_id": "trip_id",
+        "start_time": "start_time",
+        "end_time": "end_time",
+        "duration": "tripduration",
+        "start_station_id": "from_station_id",
+        "start_station_name": "from_station_name",
+        "end_station_id": "to_station_id",
+        "end_station_name": "to_station_name",
+        "gender": "gender",
+        "birth_year": "birthyear",
+    },
+    {
+        "trip_id": "ride_id",
+        "start_time": "started_at",
+        "end_time": "ended_at",
+        "start_station_id": "start_station_id",
+        "start_station_name": "start_station_name",
+        "end_station_id": "end_station_id",
+        "end_station_name": "end_station_name",
+    },
+]
+
+RAW_SCHEMA = StructType([StructField(name, StringType(), True) for name in FIELDS])
+
+
+def get_spark():
+    return SparkSession.builder.appName("Exercise6").enableHiveSupport().getOrCreate()
+
+
+def layout_index(header):
+    header = [name.strip() for name in header]
+    for layout in LAYOUTS:
+        if all(column in header for column in layout.values()):
+            return [header.index(layout[field]) if field in layout else None for field in FIELDS]
+    return None
+
+
+def unzip_rows(path_content):
+    # Runs on the executors: each task gets one zip's bytes from binaryFiles
+    # and yields its CSV rows mapped onto FIELDS, as strings.
+    path, content = path_content
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        for member in archive.namelist():
+            if not member.endswith(".csv") or member.startswith("__MACOSX"):
+                continue
+
+            with archive.open(member) as f:
+                reader = csv.reader(io.TextIOWrapper(f, encoding="utf-8-sig", newline=""))
+                header = next(reader, None)
+                if header is None:
+                    continue
+
+                index = layout_index(header)
+                if index is None:
+                    raise ValueError(f"Unrecognised columns in {path}!{member}: {header}")
+
+                for row in reader:
+                    if len(row) != len(header):
+                        continue
+                    yield tuple((row[i] or None) if i is not None else None for i in index)
+
+
+def parse_trips(spark, path, partitions=None):
+    # The zips stay zipped: binaryFiles hands whole files to the executors,
+    # which unzip and parse them in parallel instead of on the driver.
+    sc = spark.sparkContext
+    rows = sc.binaryFiles(str(path)).flatMap(unzip_rows)
+    # One partition per zip is too coarse for everything downstream.
+    rows = rows.repartition(partitions or sc.defaultParallelism)
+
+    raw = spark.createDataFrame(rows, RAW_SCHEMA)
+    start_time = F.to_timestamp("start_time")
+    end_time = F.to_timestamp("end_time")
+
+    return raw.select(
+        "trip_id",
+        start_time.alias("start_time"),
+        end_time.alias("end_time"),
+        F.to_date(start_time).alias("date"),
+        # 2019 durations are quoted with thousands separators ("1,090.0");
+        # 2020 rows have none, so fall back to end - start.
+        F.coalesce(
+            F.regexp_replace("duration", ",", "").cast("double"),
+            (F.unix_timestamp(end_time) - F.unix_timestamp(start_time)).cast("double"),
+        ).alias("duration"),
+        F.col("start_station_id").cast("int").alias("start_station_id"),
+        "start_station_name",
+        F.col("end_station_id").cast("int").alias("end_station_id"),
+        "end_station_name",
+        "gender",
+        (F.year(start_time) - F.col("birth_year").cast("int")).alias("age"),
+    )
+
+
+def read_trips(spark, data_dir=DATA_DIR, partitions=None, cache_dir=None):
+    if cache_dir is None:
+        return parse_trips(spark, f"{data_dir}/*.zip", partitions)
+
+    def write(zip_path, out_path):
+        parse_trips(spark, zip_path, partitions).write.parquet(out_path)
+
+    return spark.read.parquet(*cached_inputs(data_dir, cache_dir, write))
+
+
+def daily_station_rollup(trips):
+    # Feeds the four date and station reports.
+    return trips.groupBy("date", F.col("start_station_name").alias("station")).agg(
+        F.count("*").alias("trips"),
+        F.sum("duration").alias("duration_sum"),
+        F.count("duration").alias("duration_count"),
+    )
+
+
+def demographic_rollup(trips):
+    # Feeds the gender and age reports; only 2019 rows carry demographics.
+    return trips.where(F.col("gender").isNotNull() | F.col("age").isNotNull()).groupBy("gender", "age").agg(
+        F.count("*").alias("trips"),
+        F.sum("duration").alias("duration_sum"),
+        F.count("duration").alias("duration_count"),
+    )
+
+
+def average_duration():
+    return (F.sum("duration_sum") / F.sum("duration_count")).alias("avg_duration_seconds")
+
+
+def average_trip_duration_per_day(daily_station):
+    return daily_station.groupBy("date").agg(average_duration()).orderBy("date")
+
+
+def trips_per_day(daily_station):
+    return daily_station.groupBy("date").agg(F.sum("trips").alias("trips")).orderBy("date")
+
+
+def top_station_per_month(daily_station):
+    monthly = daily_station.where(F.col("station").isNotNull()).groupBy(
+        F.date_format("date", "yyyy-MM").alias("month"), "station"
+    ).agg(F.sum("trips").alias("trips"))
+
+    rank = F.row_number().over(Window.partitionBy("month").orderBy(F.desc("trips"), "station"))
+    return monthly.withColumn("rank", rank).where("rank = 1").drop("rank").orderBy("month")
+
+
+def top_stations_last_two_weeks(daily_station, days=14, n=3):
+    last_date = daily_station.agg(F.max("date")).first()[0]
+    recent = daily_station.where(
+        F.col("station").isNotNull() & (F.col("date") > F.date_sub(F.lit(last_date), days))
+    )
+
+    rank = F.row_number().over(Window.partitionBy("date").orderBy(F.desc("trips"), "station"))
+    return recent.select("date", "station", "trips", rank.alias("rank")).where(F.col("rank") <= n).orderBy(
+        "date", "rank"
+    )
+
+
+def duration_by_gender(demographics):
+    return demographics.where(F.col("gender").isNotNull()).groupBy("gender").agg(
+        F.sum("trips").alias("trips"), average_duration()
+    ).orderBy(F.desc("avg_duration_seconds"))
+
+
+def top_ages(demographics, n=10):
+    by_age = demographics.where(F.col("age").between(0, 120)).groupBy("age").agg(
+        F.sum("trips").alias("trips"), average_duration()
+    ).cache()
+
+    def ranked(label, order):
+        rank = F.row_number().over(Window.orderBy(order, "age"))
+        return by_age.select(F.lit(label).alias("trip_length"), rank.alias("rank"), "age", "trips",
+                             "avg_duration_seconds").where(F.col("rank") <= n)
+
+    return ranked("longest", F.desc("avg_duration_seconds")).unionByName(
+        ranked("shortest", F.asc("avg_duration_seconds"))
+    )
+
+
+# report name: (shared rollup it is computed from, report)
+REPORTS = {
+    "average_trip_duration_per_day": (daily_station_rollup, average_trip_duration_per_day),
+    "trips_per_day": (daily_station_rollup, trips_per_day),
+    "top_start_station_per_month": (daily_station_rollup, top_station_per_month),
+    "top_3_start_stations_last_two_weeks": (daily_station_rollup, top_stations_last_two_weeks),
+    "average_duration_by_gender": (demographic_rollup, duration_by_gender),
+    "top_10_ages_by_trip_duration": (demographic_rollup, top_ages),
+}
+
+
+def build_reports(trips):
+    # Each rollup is computed once from the cached trips and shared by every
+    # report that needs it.
+    rollups = {}
+    for name, (rollup, report) in REPORTS.items():
+        if rollup not in rollups:
+            rollups[rollup] = rollup(trips).cache()
+        yield name, report(rollups[rollup])
+
+
+def write_report(df, name, reports_dir=REPORTS_DIR):
+    # Reports are small; one CSV part file per report.
+    df.coalesce(1).write.mode("overwrite").csv(f"{reports_dir}/{name}", header=True)
 
 
 def main():
-    spark = SparkSession.builder.appName("Exercise6").enableHiveSupport().getOrCreate()
-    # your code here
+    spark = get_spark()
+    start = time.perf_counter()
+
+    try:
+        trips = read_trips(spark, cache_dir=CACHE_DIR).cache()
+        logging.info(f"Parsed {trips.count()} trips.")
+
+        for name, report in build_reports(trips):
+            write_report(report, name)
+            logging.info(f"Wrote report {name}.")
+
+    except Exception as e:
+        logging.error(f"Report job failed: {e.__class__.__name__}: {e}")
+        raise
+
+    finally:
+        logging.info(f"Finished in {time.perf_counter() - start:.1f}s.")
+        spark.stop()
 
 
 if __name__ == "__main__":
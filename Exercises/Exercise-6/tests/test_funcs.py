@@ -0,0 +1,108 @@
+import zipfile
+import pytest
+import sys
+import os
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import build_reports, layout_index, read_trips, unzip_rows
+
+HEADER_2019 = ("trip_id,start_time,end_time,bikeid,tripduration,from_station_id,from_station_name,"
+               "to_station_id,to_station_name,usertype,gender,birthyear")
+HEADER_2020 = ("ride_id,rideable_type,started_at,ended_at,start_station_name,start_station_id,"
+               "end_station_name,end_station_id,start_lat,start_lng,end_lat,end_lng,member_casual")
+
+
+def make_zip(path, name, lines):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(name, "\n".join(lines) + "\n")
+    return path
+
+
+@pytest.fixture(scope="module")
+def spark():
+    from pyspark.sql import SparkSession
+    spark = SparkSession.builder.master("local[2]").appName("Exercise6-tests").getOrCreate()
+    yield spark
+    spark.stop()
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    make_zip(tmp_path / "Divvy_Trips_2019_Q4.zip", "Divvy_Trips_2019_Q4.csv", [
+        HEADER_2019,
+        '1,2019-10-01 00:01:39,2019-10-01 00:17:20,2215,"1,090.0",20,Sheffield Ave,309,Leavitt St,Subscriber,Male,1987',
+        "2,2019-10-01 00:02:16,2019-10-01 00:06:34,6328,258.0,19,Throop St,241,Morgan St,Subscriber,Female,1998",
+        "3,2019-10-02 08:00:00,2019-10-02 08:10:00,6329,600.0,19,Throop St,241,Morgan St,Customer,,",
+    ])
+    make_zip(tmp_path / "Divvy_Trips_2020_Q1.zip", "Divvy_Trips_2020_Q1.csv", [
+        HEADER_2020,
+        "A1,docked_bike,2020-01-21 20:06:59,2020-01-21 20:14:30,Western Ave,239,Clark St,234,41.9,-87.6,41.9,-87.6,member",
+    ])
+    return tmp_path
+
+
+def test_layout_index():
+    assert layout_index(HEADER_2019.split(","))[:4] == [0, 1, 2, 4]
+    assert layout_index(HEADER_2020.split(","))[:4] == [0, 2, 3, None]
+    assert layout_index(["a", "b"]) is None
+
+
+def test_unzip_rows(data_dir):
+    path = data_dir / "Divvy_Trips_2019_Q4.zip"
+    rows = list(unzip_rows((str(path), path.read_bytes())))
+
+    assert len(rows) == 3
+    assert rows[0] == ("1", "2019-10-01 00:01:39", "2019-10-01 00:17:20", "1,090.0", "20", "Sheffield Ave", "309",
+                       "Leavitt St", "Male", "1987")
+    assert rows[2][-2:] == (None, None)
+
+
+def test_unzip_rows_unknown_layout(tmp_path):
+    path = make_zip(tmp_path / "x.zip", "x.csv", ["a,b", "1,2"])
+
+    with pytest.raises(ValueError):
+        list(unzip_rows((str(path), path.read_bytes())))
+
+
+def test_read_trips(spark, data_dir):
+    trips = {row.trip_id: row for row in read_trips(spark, data_dir, partitions=2).collect()}
+
+    assert trips["1"].duration == 1090.0
+    assert trips["1"].age == 32
+    assert trips["1"].date == date(2019, 10, 1)
+    assert trips["A1"].duration == 451.0
+    assert trips["A1"].start_station_id == 239
+    assert trips["A1"].gender is None
+
+
+def test_build_reports(spark, data_dir):
+    reports = {name: df.collect() for name, df in build_reports(read_trips(spark, data_dir, partitions=2).cache())}
+
+    assert len(reports) == 6
+    assert [(r.date, r.trips) for r in reports["trips_per_day"]] == [
+        (date(2019, 10, 1), 2), (date(2019, 10, 2), 1), (date(2020, 1, 21), 1)
+    ]
+    assert reports["average_trip_duration_per_day"][0].avg_duration_seconds == pytest.approx((1090 + 258) / 2)
+    assert [(r.month, r.station) for r in reports["top_start_station_per_month"]] == [
+        ("2019-10", "Throop St"), ("2020-01", "Western Ave")
+    ]
+    # Only 2020-01-21 falls in the last two weeks of the data.
+    assert [(r.date, r.station) for r in reports["top_3_start_stations_last_two_weeks"]] == [
+        (date(2020, 1, 21), "Western Ave")
+    ]
+    assert [r.gender for r in reports["average_duration_by_gender"]] == ["Male", "Female"]
+    ages = reports["top_10_ages_by_trip_duration"]
+    assert [(r.trip_length, r.age) for r in ages if r.rank == 1] == [("longest", 32), ("shortest", 21)]
+
+
+def test_read_trips_cached(spark, data_dir, tmp_path_factory):
+    cache_dir = tmp_path_factory.mktemp("cache")
+    uncached = sorted(read_trips(spark, data_dir, partitions=2).collect())
+
+    assert sorted(read_trips(spark, data_dir, partitions=2, cache_dir=cache_dir).collect()) == uncached
+    entries = sorted(p.name for p in cache_dir.iterdir())
+    assert entries == ["Divvy_Trips_2019_Q4.zip", "Divvy_Trips_2020_Q1.zip"]
+    # Served from the Parquet entries now.
+    assert sorted(read_trips(spark, data_dir, partitions=2, cache_dir=cache_dir).collect()) == uncached
@@ -0,0 +1,100 @@
+import zipfile
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import input_cache
+from input_cache import MARKER, cached_inputs, cached_parquet
+
+ZIP_NAME = "Divvy_Trips_2019_Q4.zip"
+
+
+def make_zip(path, text):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(path.name.replace(".zip", ".csv"), text)
+    return path
+
+
+class Writer:
+    # Stands in for the Spark transcode: records calls, writes one file.
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, zip_path, out_path):
+        self.calls.append(zip_path)
+        os.makedirs(out_path)
+        with open(os.path.join(out_path, "part-0.parquet"), "w") as f:
+            f.write(zip_path)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    make_zip(data / ZIP_NAME, "a,b\n1,2\n")
+    return data
+
+
+def test_miss_then_hit(data_dir, tmp_path):
+    write = Writer()
+    first = cached_parquet(data_dir / ZIP_NAME, tmp_path / "cache", write)
+    second = cached_parquet(data_dir / ZIP_NAME, tmp_path / "cache", write)
+
+    assert first == second
+    assert write.calls == [str(data_dir / ZIP_NAME)]
+    assert (first / MARKER).exists()
+    assert first.name == input_cache.file_checksum(data_dir / ZIP_NAME)
+
+
+def test_changed_zip_replaces_stale_entry(data_dir, tmp_path):
+    write = Writer()
+    old = cached_parquet(data_dir / ZIP_NAME, tmp_path / "cache", write)
+
+    make_zip(data_dir / ZIP_NAME, "a,b\n1,2\n3,4\n")
+    os.utime(data_dir / ZIP_NAME, ns=(1, 1))
+    new = cached_parquet(data_dir / ZIP_NAME, tmp_path / "cache", write)
+
+    assert new != old
+    assert len(write.calls) == 2
+    assert not old.exists()
+    assert sorted(p.name for p in new.parent.iterdir() if p.is_dir()) == [new.name]
+
+
+def test_checksum_is_remembered(data_dir, tmp_path, mocker):
+    cached_parquet(data_dir / ZIP_NAME, tmp_path / "cache", Writer())
+
+    spy = mocker.spy(input_cache, "file_checksum")
+    cached_parquet(data_dir / ZIP_NAME, tmp_path / "cache", Writer())
+    assert spy.call_count == 0
+
+    os.utime(data_dir / ZIP_NAME, ns=(2, 2))
+    cached_parquet(data_dir / ZIP_NAME, tmp_path / "cache", Writer())
+    assert spy.call_count == 1
+
+
+def test_failed_write_leaves_no_entry(data_dir, tmp_path):
+    def failing(zip_path, out_path):
+        os.makedirs(out_path)
+        raise RuntimeError("executor lost")
+
+    with pytest.raises(RuntimeError):
+        cached_parquet(data_dir / ZIP_NAME, tmp_path / "cache", failing)
+
+    write = Writer()
+    entry = cached_parquet(data_dir / ZIP_NAME, tmp_path / "cache", write)
+    assert len(write.calls) == 1
+    assert (entry / MARKER).exists()
+
+
+def test_cached_inputs(data_dir, tmp_path):
+    make_zip(data_dir / "Divvy_Trips_2020_Q1.zip", "c\n5\n")
+    paths = cached_inputs(data_dir, tmp_path / "cache", Writer())
+
+    names = [os.path.basename(os.path.dirname(p)) for p in paths]
+    assert names == ["Divvy_Trips_2019_Q4.zip", "Divvy_Trips_2020_Q1.zip"]
+
+    (tmp_path / "empty").mkdir()
+    with pytest.raises(FileNotFoundError):
+        cached_inputs(tmp_path / "empty", tmp_path / "cache", Writer())
@@ -0,0 +1,112 @@
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main as job
+
+# Wall time and join strategy for the Exercise-7 features computed two ways:
+# all ~180 columns parsed and the rankings joined back with a plain join,
+# against the pruned read with a broadcast ranking table. Broadcasting by
+# size is switched off for both runs, so only the explicit broadcast keeps
+# the join from becoming a SortMergeJoin; the run fails if it does not.
+#
+#   docker-compose run bench
+
+SMART_IDS = [
+    1, 2, 3, 4, 5, 7, 8, 9, 10, 11, 12, 13, 15, 16, 17, 18, 22, 23, 24, 160, 161, 163, 164, 165, 166, 167, 168, 169,
+    170, 171, 172, 173, 174, 175, 176, 177, 178, 179, 180, 181, 182, 183, 184, 187, 188, 189, 190, 191, 192, 193, 194,
+    195, 196, 197, 198, 199, 200, 201, 202, 206, 210, 218, 220, 222, 223, 224, 225, 226, 230, 231, 232, 233, 234, 235,
+    240, 241, 242, 244, 245, 246, 247, 248, 250, 251, 252, 254, 255,
+]
+HEADER = ["date", "serial_number", "model", "capacity_bytes", "failure"] + [
+    f"smart_{i}_{kind}" for i in SMART_IDS for kind in ("normalized", "raw")
+]
+
+
+def generate_zip(path, rows, models=80, seed=0):
+    rng = random.Random(seed)
+    catalog = [
+        (f"{rng.choice(['ST', 'TOSHIBA MG', 'HGST HUH', 'WDC WUH'])}{i:04d}", rng.choice([4, 8, 12, 14, 16]) * 10 ** 12)
+        for i in range(models)
+    ]
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(HEADER)
+    for i in range(rows):
+        model, capacity = rng.choice(catalog)
+        smart = [rng.randint(0, 200) if rng.random() < 0.3 else "" for _ in range(len(HEADER) - 5)]
+        writer.writerow(["2022-01-01", f"Z{i:09d}", model, capacity, int(rng.random() < 0.001)] + smart)
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(os.path.basename(path)[:-len(".zip")], buf.getvalue())
+
+
+def all_columns(spark, data_dir):
+    # Every column parsed and typed, the way an inferred-schema read would.
+    df = job.read_drives(spark, data_dir, HEADER)
+    return df.select(*[
+        df[name].cast("bigint").alias(name) if name.startswith("smart_") else df[name] for name in df.columns
+    ])
+
+
+def shuffle_join_features(df):
+    df = job.add_brand(job.add_file_date(df))
+    return job.add_primary_key(df.join(job.storage_rankings(df), on="model", how="left"))
+
+
+def join_strategy(plan):
+    for strategy in ("BroadcastHashJoin", "SortMergeJoin", "ShuffledHashJoin", "BroadcastNestedLoopJoin"):
+        if strategy in plan:
+            return strategy
+    return "none"
+
+
+def timed(spark, label, build):
+    spark.catalog.clearCache()
+    df = build()
+    plan = job.executed_plan(df)
+
+    start = time.perf_counter()
+    df.write.format("noop").mode("overwrite").save()
+    elapsed = time.perf_counter() - start
+
+    print(f"{label:>32}: {elapsed:7.1f}s  join: {join_strategy(plan)}")
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise-7 feature pipeline benchmark.")
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    spark = job.get_spark()
+    spark.sparkContext.setLogLevel("WARN")
+    spark.conf.set("spark.sql.autoBroadcastJoinThreshold", -1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.rows} rows x {len(HEADER)} columns...")
+        generate_zip(os.path.join(tmp, "hard-drive-2022-01-01-failures.csv.zip"), args.rows)
+
+        try:
+            timed(spark, "all columns, shuffle join", lambda: shuffle_join_features(all_columns(spark, tmp).cache()))
+            plan = timed(
+                spark, "pruned columns, broadcast", lambda: job.build_features(job.read_drives(spark, tmp).cache())
+            )
+        finally:
+            spark.stop()
+
+    assert "SortMergeJoin" not in plan, plan
+    assert "BroadcastHashJoin" in plan, plan
+
+
+if __name__ == "__main__":
+    main()
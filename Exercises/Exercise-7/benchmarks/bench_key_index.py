@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+import key_index
+
+# Seconds per daily ingest into the primary key state as history grows,
+# with and without the Bloom pre-check. Each day carries --keys drive-days,
+# a --overlap share of them re-delivered from the day before. The lookup
+# should stay flat while the state grows to --days times --keys; appends
+# include the segment merges, whose cost is amortised over the days.
+#
+#   python benchmarks/bench_key_index.py
+
+
+def daily_batches(days, keys, overlap, seed=0):
+    rng = np.random.default_rng(seed)
+    previous = np.empty(0, dtype=key_index.KEY_DTYPE)
+    for _ in range(days):
+        repeated = rng.choice(previous, int(len(previous) * overlap), replace=False)
+        fresh = rng.bytes((keys - len(repeated)) * key_index.KEY_BYTES)
+        batch = np.concatenate([repeated, np.frombuffer(fresh, dtype=key_index.KEY_DTYPE)])
+        yield batch
+        previous = batch
+
+
+def run(days, keys, overlap, bloom):
+    with tempfile.TemporaryDirectory() as state_dir:
+        manifest = key_index.load_manifest(state_dir)
+        lookups, appends = [], []
+        for day, batch in enumerate(daily_batches(days, keys, overlap)):
+            start = time.perf_counter()
+            fresh = key_index.new_keys(state_dir, manifest, batch)
+            looked_up = time.perf_counter()
+            manifest = key_index.append_keys(state_dir, manifest, fresh, f"day-{day}", bloom)
+            lookups.append(looked_up - start)
+            appends.append(time.perf_counter() - looked_up)
+        return lookups, appends, manifest
+
+
+def window_means(timings, windows=6):
+    step = max(len(timings) // windows, 1)
+    chunks = [timings[i:i + step] for i in range(0, len(timings), step)]
+    return "  ".join(f"{sum(chunk) / len(chunk):5.2f}" for chunk in chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise-7 incremental key state benchmark.")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--keys", type=int, default=50_000)
+    parser.add_argument("--overlap", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for bloom in (True, False):
+        lookups, appends, manifest = run(args.days, args.keys, args.overlap, bloom)
+        print(f"bloom={bloom}: {key_index.key_count(manifest):,} keys in {len(manifest['segments'])} segments")
+        print(f"  lookup s/day, oldest to newest: {window_means(lookups)}")
+        print(f"  append s/day, oldest to newest: {window_means(appends)}")
+
+
+if __name__ == "__main__":
+    main()
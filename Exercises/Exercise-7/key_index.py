@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+# Persistent state of every primary_key already ingested, so each daily
+# Backblaze file can be deduplicated without rescanning history.
+#
+# Keys are stored as fixed-width binary in sorted segment files, one per
+# ingested batch, each with an optional Bloom filter beside it. A lookup
+# checks each segment's filter and binary-searches only the keys that may
+# be in it, through a memory map, so it reads a few pages per key rather
+# than the whole history. Segments of similar size are merged as they are
+# appended, which keeps their number logarithmic in the history.
+#
+# manifest.json names the live segments and the sources they came from.
+# New segments are written aside and the manifest is replaced in one
+# rename, so a crashed append leaves the previous state intact.
+
+# primary_key is a hex sha256; its first 16 bytes are plenty to tell
+# apart the keys of every drive-day Backblaze will ever publish. Opaque
+# 16-byte values sort and compare bytewise.
+KEY_BYTES = 16
+KEY_DTYPE = np.dtype(f"V{KEY_BYTES}")
+BLOOM_BITS_PER_KEY = 10
+BLOOM_HASHES = 7
+BLOOM_CHUNK = 1_000_000
+MERGE_FACTOR = 2
+# Merges happen in memory; segments past this size are left as they are.
+MAX_MERGE_KEYS = 50_000_000
+MANIFEST = "manifest.json"
+
+
+def encode_keys(primary_keys):
+    data = b"".join(bytes.fromhex(key[:2 * KEY_BYTES]) for key in primary_keys)
+    return np.frombuffer(data, dtype=KEY_DTYPE)
+
+
+def decode_key(key):
+    return bytes(key).hex()
+
+
+def load_manifest(state_dir):
+    try:
+        with open(Path(state_dir) / MANIFEST) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"next_segment": 0, "segments": [], "sources": []}
+
+
+def save_manifest(state_dir, manifest):
+    path = Path(state_dir) / MANIFEST
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def key_count(manifest):
+    return sum(segment["keys"] for segment in manifest["segments"])
+
+
+def bloom_positions(keys, size):
+    # Keys are already hashes: their two halves give the probe sequence.
+    halves = np.ascontiguousarray(keys).view("<u8").reshape(-1, 2)
+    h1, h2 = halves[:, :1], halves[:, 1:] | np.uint64(1)
+    return (h1 + np.arange(BLOOM_HASHES, dtype=np.uint64) * h2) % np.uint64(size)
+
+
+def build_bloom(keys):
+    # Set as one byte per bit, then packed: a plain scatter is far quicker
+    # than or-ing bits into shared bytes.
+    size = max(len(keys) * BLOOM_BITS_PER_KEY // 8, 8) * 8
+    flags = np.zeros(size, dtype=bool)
+    for start in range(0, len(keys), BLOOM_CHUNK):
+        flags[bloom_positions(keys[start:start + BLOOM_CHUNK], size).ravel()] = True
+    return np.packbits(flags, bitorder="little")
+
+
+def bloom_may_contain(bits, keys):
+    p = bloom_positions(keys, len(bits) * 8)
+    return ((bits[p >> np.uint64(3)] >> (p & np.uint64(7)).astype(np.uint8)) & 1).all(axis=1)
+
+
+def open_array(path, dtype):
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def write_file(path, data):
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_segment(state_dir, manifest, keys, bloom):
+    # keys is a sorted array of unique keys.
+    name = f"segment-{manifest['next_segment']:06d}"
+    manifest["next_segment"] += 1
+    path = Path(state_dir) / f"{name}.keys"
+
+    write_file(path, keys.tobytes())
+    if bloom:
+        write_file(path.with_suffix(".bloom"), build_bloom(keys).tobytes())
+    return {"name": name, "keys": len(keys), "bloom": bloom}
+
+
+def segment_keys(state_dir, segment):
+    return open_array(Path(state_dir) / f"{segment['name']}.keys", KEY_DTYPE)
+
+
+def merge_segments(state_dir, manifest, bloom):
+    # Merges the newest segments while the older of the last two is no more
+    # than MERGE_FACTOR times the size of the newer. Every key is rewritten
+    # O(log n) times over its life, and lookups see O(log n) segments.
+    segments = manifest["segments"]
+    while len(segments) >= 2 and segments[-2]["keys"] <= MERGE_FACTOR * segments[-1]["keys"]:
+        older, newer = segments[-2], segments[-1]
+        if older["keys"] + newer["keys"] > MAX_MERGE_KEYS:
+            break
+        # Segments never share a key, so a sort of the two is the merge.
+        merged = np.sort(np.concatenate([segment_keys(state_dir, older), segment_keys(state_dir, newer)]))
+        segments[-2:] = [write_segment(state_dir, manifest, merged, bloom)]
+        logging.info(f"Merged key segments {older['name']} and {newer['name']} ({len(merged)} keys).")
+
+
+def remove_unreferenced(state_dir, manifest):
+    live = {segment["name"] for segment in manifest["segments"]}
+    for path in Path(state_dir).glob("segment-*"):
+        if path.name.split(".")[0] not in live:
+            path.unlink()
+
+
+def new_keys(state_dir, manifest, keys):
+    # Returns the keys not yet in the state, sorted and unique. The work is
+    # per key in this batch, times a binary search per segment at most.
+    candidates = np.unique(np.asarray(keys, dtype=KEY_DTYPE))
+    for segment in manifest["segments"]:
+        if not len(candidates):
+            break
+        existing = segment_keys(state_dir, segment)
+        if segment["bloom"]:
+            bits = open_array(Path(state_dir) / f"{segment['name']}.bloom", np.uint8)
+            maybe = np.flatnonzero(bloom_may_contain(bits, candidates))
+        else:
+            maybe = np.arange(len(candidates))
+
+        checked = candidates[maybe]
+        index = np.minimum(np.searchsorted(existing, checked), len(existing) - 1)
+        found = existing[index] == checked if len(existing) else np.zeros(len(checked), dtype=bool)
+        candidates = np.delete(candidates, maybe[found])
+    return candidates
+
+
+def append_keys(state_dir, manifest, keys, source, bloom=True):
+    # keys must come from new_keys; source names the file they came from.
+    Path(state_dir).mkdir(parents=True, exist_ok=True)
+    manifest = json.loads(json.dumps(manifest))
+    if len(keys):
+        manifest["segments"].append(write_segment(state_dir, manifest, keys, bloom))
+        merge_segments(state_dir, manifest, bloom)
+    manifest["sources"].append(source)
+    save_manifest(state_dir, manifest)
+    remove_unreferenced(state_dir, manifest)
+    return manifest
@@ -1,10 +1,262 @@
-from pyspark.sql import SparkSession
+import argparse
+import csv
+import io
+import logging
+import os
+import zipfile
+from pathlib import Path
+
+from pyspark.sql import SparkSession, Window
 import pyspark.sql.functions as F
+from pyspark.sql.types import StructField, StructType, StringType
+
+import key_index
+from input_cache import cached_inputs
+
+logging.basicConfig(
+    format="{asctime} | {levelname} | {message}",
+    style="{",
+    datefmt="%Y-%m-%d %H:%M",
+    level=logging.INFO
+)
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+RESULTS_DIR = BASE_DIR / "results"
+CACHE_DIR = BASE_DIR / "cache"
+INCREMENTAL_DIR = RESULTS_DIR / "incremental"
+STATE_DIR = RESULTS_DIR / "key_state"
+RANKINGS_DIR = RESULTS_DIR / "storage_rankings"
+
+# The Backblaze files carry ~180 columns, almost all SMART counters. Only
+# these are parsed and typed; the rest are dropped while unzipping.
+COLUMNS = ["date", "serial_number", "model", "capacity_bytes", "failure"]
+TYPES = {
+    "date": "date",
+    "serial_number": "string",
+    "model": "string",
+    "capacity_bytes": "bigint",
+    "failure": "int",
+}
+
+# The SMART attributes, normalised and raw, are all counters.
+SMART_TYPE = "bigint"
+
+# A drive reports once per day.
+KEY_COLUMNS = ["date", "serial_number"]
+
+
+def get_spark():
+    return SparkSession.builder.appName("Exercise7").enableHiveSupport().getOrCreate()
+
+
+def raw_schema(columns):
+    return StructType([StructField("source_file", StringType(), False)] + [
+        StructField(name, StringType(), True) for name in columns
+    ])
+
+
+def column_type(name):
+    return TYPES.get(name, SMART_TYPE if name.startswith("smart_") else "string")
+
+
+def csv_members(archive):
+    return [name for name in archive.namelist() if name.endswith(".csv") and not name.startswith("__MACOSX")]
+
+
+def zip_header(path):
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(csv_members(archive)[0]) as f:
+            return next(csv.reader(io.TextIOWrapper(f, encoding="utf-8-sig", newline="")))
+
+
+def unzip_columns(path_content, columns=COLUMNS):
+    # Runs on the executors: yields (file name, *columns) for every CSV row
+    # in one zip, as strings, without building the other columns.
+    path, content = path_content
+    source_file = os.path.basename(path)
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        for member in csv_members(archive):
+            with archive.open(member) as f:
+                reader = csv.reader(io.TextIOWrapper(f, encoding="utf-8-sig", newline=""))
+                header = next(reader, None)
+                if header is None:
+                    continue
+
+                missing = [name for name in columns if name not in header]
+                if missing:
+                    raise ValueError(f"{path}!{member} has no column(s) {missing}")
+                index = [header.index(name) for name in columns]
+
+                for row in reader:
+                    if len(row) != len(header):
+                        continue
+                    yield (source_file,) + tuple(row[i] or None for i in index)
+
+
+def parse_drives(spark, path, columns=COLUMNS):
+    rows = spark.sparkContext.binaryFiles(str(path)).flatMap(lambda pc: unzip_columns(pc, columns))
+    raw = spark.createDataFrame(rows, raw_schema(columns))
+    typed = [F.col(name).cast(column_type(name)).alias(name) for name in columns]
+    return raw.select("source_file", *typed)
+
+
+def read_drives(spark, data_dir=DATA_DIR, columns=COLUMNS, cache_dir=None):
+    if cache_dir is None:
+        return parse_drives(spark, f"{data_dir}/*.zip", columns)
+
+    # The cache keeps every column, typed, so any later column choice is
+    # served from it; Parquet reads back only the ones selected.
+    def write(zip_path, out_path):
+        parse_drives(spark, zip_path, zip_header(zip_path)).repartition(
+            spark.sparkContext.defaultParallelism
+        ).write.parquet(out_path)
+
+    return spark.read.parquet(*cached_inputs(data_dir, cache_dir, write)).select("source_file", *columns)
+
+
+def add_file_date(df):
+    return df.withColumn("file_date", F.to_date(F.regexp_extract("source_file", r"(\d{4}-\d{2}-\d{2})", 1)))
+
+
+def add_brand(df):
+    return df.withColumn(
+        "brand",
+        F.when(F.instr("model", " ") > 0, F.substring_index("model", " ", 1)).otherwise(F.lit("unknown")),
+    )
+
+
+def storage_rankings(df):
+    # One row per model: a few hundred rows at most, whatever the size of df.
+    capacities = df.groupBy("model").agg(F.max("capacity_bytes").alias("capacity_bytes"))
+    return capacities.select(
+        "model",
+        F.dense_rank().over(Window.orderBy(F.desc("capacity_bytes"))).alias("storage_ranking"),
+    )
+
+
+def add_storage_ranking(df):
+    # Broadcast the tiny ranking table so the join back never shuffles df.
+    return df.join(F.broadcast(storage_rankings(df)), on="model", how="left")
+
+
+def add_primary_key(df, key_columns=KEY_COLUMNS):
+    key = F.concat_ws("||", *[F.col(c).cast("string") for c in key_columns])
+    return df.withColumn("primary_key", F.sha2(key, 256))
+
+
+def build_features(df, storage_ranking=True):
+    df = add_brand(add_file_date(df))
+    if storage_ranking:
+        df = add_storage_ranking(df)
+    return add_primary_key(df)
+
+
+def executed_plan(df):
+    return df._jdf.queryExecution().executedPlan().toString()
+
+
+def dedup_file(spark, zip_path, state_dir, manifest):
+    # One day's drives, less the primary keys already ingested. Only this
+    # file's keys are collected and looked up; the history stays on disk.
+    drives = build_features(parse_drives(spark, zip_path), storage_ranking=False)
+    drives = drives.dropDuplicates(["primary_key"]).cache()
+    keys = key_index.encode_keys(row.primary_key for row in drives.select("primary_key").toLocalIterator())
+    fresh = key_index.new_keys(state_dir, manifest, keys)
+    if len(fresh) == len(keys):
+        return drives, fresh
+
+    prefixes = spark.createDataFrame([(key_index.decode_key(key),) for key in fresh], "key_prefix string")
+    prefix = F.substring("primary_key", 1, 2 * key_index.KEY_BYTES)
+    return drives.join(F.broadcast(prefixes), prefix == prefixes.key_prefix, "left_semi"), fresh
+
+
+def merge_capacities(capacities, drives):
+    # Largest capacity seen per model, over every file ingested so far.
+    merged = dict(capacities)
+    for row in drives.groupBy("model").agg(F.max("capacity_bytes").alias("capacity_bytes")).collect():
+        if row.model is not None and row.capacity_bytes is not None:
+            merged[row.model] = max(merged.get(row.model, 0), row.capacity_bytes)
+    return merged
+
+
+def write_storage_rankings(spark, capacities, rankings_dir=RANKINGS_DIR):
+    capacities = spark.createDataFrame(list(capacities.items()), "model string, capacity_bytes bigint")
+    storage_rankings(capacities).write.mode("overwrite").parquet(str(rankings_dir))
+
+
+def ingest_incremental(
+    spark, data_dir=DATA_DIR, out_dir=INCREMENTAL_DIR, state_dir=STATE_DIR, bloom=True, rankings_dir=RANKINGS_DIR
+):
+    # Each daily zip is written once, as only the rows whose primary_key is
+    # new. Re-delivered days then cost their own size, not the history's.
+    #
+    # A ranking taken within one day's file would mean something different
+    # per day, so the daily output has no storage_ranking. The capacity per
+    # model is kept in the key state instead, and rankings_dir holds one
+    # ranking over every day ingested, to join on model.
+    manifest = key_index.load_manifest(state_dir)
+    ingested = []
+
+    for zip_path in sorted(Path(data_dir).glob("*.zip")):
+        if zip_path.name in manifest["sources"]:
+            logging.info(f"Skipping {zip_path.name}, already ingested.")
+            continue
+
+        drives, fresh = dedup_file(spark, zip_path, state_dir, manifest)
+        # Rows first, keys second: a crash in between rewrites this file's
+        # output on the next run instead of losing it.
+        drives.write.mode("overwrite").parquet(f"{out_dir}/{zip_path.stem}")
+        capacities = merge_capacities(manifest.get("capacities", {}), drives)
+        manifest = key_index.append_keys(state_dir, dict(manifest, capacities=capacities), fresh, zip_path.name, bloom)
+        spark.catalog.clearCache()
+
+        logging.info(
+            f"Ingested {zip_path.name}: {len(fresh)} new keys, {key_index.key_count(manifest)} in the state."
+        )
+        ingested.append((zip_path.name, len(fresh)))
+
+    if ingested:
+        write_storage_rankings(spark, manifest["capacities"], rankings_dir)
+        logging.info(f"Ranked {len(manifest['capacities'])} models by storage in {rankings_dir}.")
+    return ingested
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backblaze drive features with PySpark.")
+    parser.add_argument("--data", default=DATA_DIR, type=Path)
+    parser.add_argument(
+        "--incremental", action="store_true", help="append only primary keys not seen in earlier daily files"
+    )
+    parser.add_argument("--state", default=STATE_DIR, type=Path, help="primary key state for --incremental")
+    parser.add_argument("--no-bloom", action="store_true", help="skip the Bloom filter pre-check")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    spark = get_spark()
+
+    try:
+        if args.incremental:
+            ingest_incremental(spark, args.data, INCREMENTAL_DIR, args.state, bloom=not args.no_bloom)
+            return
+
+        # Cached because the ranking table is computed from the same rows.
+        drives = build_features(read_drives(spark, args.data, cache_dir=CACHE_DIR).cache())
+        if "SortMergeJoin" in executed_plan(drives):
+            logging.warning("Storage ranking join planned as a SortMergeJoin.")
+
+        drives.write.mode("overwrite").parquet(f"{RESULTS_DIR}/drives")
+        logging.info(f"Wrote drive features to {RESULTS_DIR}/drives.")
+        drives.show(5, truncate=False)
 
+    except Exception as e:
+        logging.error(f"Feature job failed: {e.__class__.__name__}: {e}")
+        raise
 
-def main():
-    spark = SparkSession.builder.appName("Exercise7").enableHiveSupport().getOrCreate()
-    # your code here
+    finally:
+        spark.stop()
 
 
 if __name__ == "__main__":
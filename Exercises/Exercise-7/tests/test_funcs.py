@@ -0,0 +1,103 @@
+import zipfile
+import pytest
+import sys
+import os
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import build_features, executed_plan, ingest_incremental, read_drives, unzip_columns
+
+HEADER = "date,serial_number,model,capacity_bytes,failure,smart_1_normalized,smart_1_raw"
+ROWS = [
+    "2022-01-01,ZLW18P9K,ST14000NM001G,14000519643136,0,73,20467240",
+    "2022-01-01,ZLW0EGC7,ST12000NM001G,12000138625024,0,84,228715872",
+    "2022-01-01,X0GE5KSC,TOSHIBA MG07ACA14TA,14000519643136,1,100,0",
+    "2022-01-01,PL1331LAHG1S4H,HGST HMS5C4040ALE640,4000787030016,0,,",
+]
+
+
+@pytest.fixture(scope="module")
+def spark():
+    from pyspark.sql import SparkSession
+    spark = SparkSession.builder.master("local[2]").appName("Exercise7-tests").getOrCreate()
+    spark.conf.set("spark.sql.autoBroadcastJoinThreshold", -1)
+    yield spark
+    spark.stop()
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    with zipfile.ZipFile(tmp_path / "hard-drive-2022-01-01-failures.csv.zip", "w") as archive:
+        archive.writestr("hard-drive-2022-01-01-failures.csv", "\n".join([HEADER] + ROWS) + "\n")
+    return tmp_path
+
+
+def test_unzip_columns_prunes(data_dir):
+    path = data_dir / "hard-drive-2022-01-01-failures.csv.zip"
+    rows = list(unzip_columns((str(path), path.read_bytes()), ["serial_number", "capacity_bytes"]))
+
+    assert rows[0] == ("hard-drive-2022-01-01-failures.csv.zip", "ZLW18P9K", "14000519643136")
+    assert len(rows) == 4
+
+
+def test_unzip_columns_missing_column(data_dir):
+    path = data_dir / "hard-drive-2022-01-01-failures.csv.zip"
+
+    with pytest.raises(ValueError):
+        list(unzip_columns((str(path), path.read_bytes()), ["serial_number", "nope"]))
+
+
+def test_build_features(spark, data_dir):
+    df = build_features(read_drives(spark, data_dir).cache())
+    rows = {row.serial_number: row for row in df.collect()}
+
+    assert rows["ZLW18P9K"].file_date == date(2022, 1, 1)
+    assert rows["ZLW18P9K"].brand == "unknown"
+    assert rows["X0GE5KSC"].brand == "TOSHIBA"
+    assert [rows[s].storage_ranking for s in ["ZLW18P9K", "X0GE5KSC", "ZLW0EGC7", "PL1331LAHG1S4H"]] == [1, 1, 2, 3]
+    assert len({row.primary_key for row in rows.values()}) == 4
+    assert "smart_1_raw" not in df.columns
+
+
+def test_storage_ranking_is_broadcast(spark, data_dir):
+    plan = executed_plan(build_features(read_drives(spark, data_dir)))
+
+    assert "BroadcastHashJoin" in plan
+    assert "SortMergeJoin" not in plan
+
+
+def test_read_drives_cached(spark, data_dir, tmp_path_factory):
+    cache_dir = tmp_path_factory.mktemp("cache")
+    uncached = sorted(read_drives(spark, data_dir).collect())
+
+    assert sorted(read_drives(spark, data_dir, cache_dir=cache_dir).collect()) == uncached
+    df = read_drives(spark, data_dir, columns=["serial_number", "smart_1_raw"], cache_dir=cache_dir)
+    rows = {row.serial_number: row.smart_1_raw for row in df.collect()}
+    assert rows["ZLW0EGC7"] == 228715872
+    assert rows["PL1331LAHG1S4H"] is None
+
+
+def test_ingest_incremental(spark, data_dir, tmp_path):
+    # The next day re-delivers two of the first day's drive-days.
+    with zipfile.ZipFile(data_dir / "hard-drive-2022-01-02-failures.csv.zip", "w") as archive:
+        archive.writestr("hard-drive-2022-01-02-failures.csv", "\n".join([HEADER] + ROWS[:2] + [
+            ROWS[0].replace("2022-01-01", "2022-01-02"),
+        ]) + "\n")
+    out_dir, state_dir, rankings_dir = tmp_path / "out", tmp_path / "state", tmp_path / "rankings"
+
+    assert ingest_incremental(spark, data_dir, out_dir, state_dir, rankings_dir=rankings_dir) == [
+        ("hard-drive-2022-01-01-failures.csv.zip", 4), ("hard-drive-2022-01-02-failures.csv.zip", 1)
+    ]
+    second = spark.read.parquet(str(out_dir / "hard-drive-2022-01-02-failures.csv"))
+    assert [(row.serial_number, row.date) for row in second.collect()] == [("ZLW18P9K", date(2022, 1, 2))]
+    assert "storage_ranking" not in second.columns
+
+    # One ranking over both days, not one per file.
+    rankings = {row.model: row.storage_ranking for row in spark.read.parquet(str(rankings_dir)).collect()}
+    assert rankings == {
+        "ST14000NM001G": 1, "TOSHIBA MG07ACA14TA": 1, "ST12000NM001G": 2, "HGST HMS5C4040ALE640": 3,
+    }
+
+    # Already ingested files are skipped.
+    assert ingest_incremental(spark, data_dir, out_dir, state_dir, rankings_dir=rankings_dir) == []
@@ -0,0 +1,80 @@
+import hashlib
+import numpy as np
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import key_index
+from key_index import append_keys, encode_keys, key_count, load_manifest, new_keys
+
+
+def keys(*values):
+    return encode_keys(hashlib.sha256(str(v).encode()).hexdigest() for v in values)
+
+
+def ingest(state_dir, batch, source, bloom=True):
+    manifest = load_manifest(state_dir)
+    fresh = new_keys(state_dir, manifest, batch)
+    return fresh, append_keys(state_dir, manifest, fresh, source, bloom)
+
+
+@pytest.mark.parametrize("bloom", [True, False])
+def test_only_unseen_keys_are_new(tmp_path, bloom):
+    fresh, _ = ingest(tmp_path, keys(1, 2, 3, 3), "day-1", bloom)
+    assert np.array_equal(fresh, np.sort(keys(1, 2, 3)))
+
+    # An overlapping re-delivery: only 4 and 5 are new.
+    fresh, manifest = ingest(tmp_path, keys(2, 3, 4, 5), "day-2", bloom)
+    assert np.array_equal(fresh, np.sort(keys(4, 5)))
+    assert key_count(manifest) == 5
+    assert manifest["sources"] == ["day-1", "day-2"]
+
+
+def test_state_survives_reload(tmp_path):
+    ingest(tmp_path, keys(*range(100)), "day-1")
+    manifest = load_manifest(tmp_path)
+
+    fresh = new_keys(tmp_path, manifest, keys(*range(90, 110)))
+    assert np.array_equal(fresh, np.sort(keys(*range(100, 110))))
+
+
+def test_segments_are_merged(tmp_path):
+    for day in range(16):
+        ingest(tmp_path, keys(*range(day * 10, day * 10 + 10)), f"day-{day}")
+    manifest = load_manifest(tmp_path)
+
+    # 16 appends leave a few merged segments and no orphaned files.
+    assert len(manifest["segments"]) <= 3
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert names == sorted(["manifest.json"] + [f"{s['name']}.{ext}" for s in manifest["segments"]
+                                                 for ext in ("bloom", "keys")])
+
+    stored_keys = []
+    for segment in manifest["segments"]:
+        stored = key_index.segment_keys(tmp_path, segment)
+        assert np.array_equal(stored, np.sort(stored))
+        stored_keys.append(stored)
+    assert np.array_equal(np.sort(np.concatenate(stored_keys)), np.sort(keys(*range(160))))
+
+
+def test_failed_append_keeps_previous_state(tmp_path, mocker):
+    ingest(tmp_path, keys(1, 2), "day-1")
+    mocker.patch("key_index.save_manifest", side_effect=OSError("disk full"))
+
+    with pytest.raises(OSError):
+        ingest(tmp_path, keys(3), "day-2")
+
+    manifest = load_manifest(tmp_path)
+    assert manifest["sources"] == ["day-1"]
+    assert np.array_equal(new_keys(tmp_path, manifest, keys(1, 3)), keys(3))
+
+
+def test_bloom_filter_has_no_false_negatives():
+    present = keys(*range(1000))
+    bits = key_index.build_bloom(present)
+
+    assert key_index.bloom_may_contain(bits, present).all()
+    # About 1% at ten bits per key.
+    assert key_index.bloom_may_contain(bits, keys(*range(1000, 11000))).sum() < 300
@@ -0,0 +1,135 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import main as job
+from query_service import QueryService
+
+# Load test for the read-only query service: --threads clients issue
+# parameterised queries for --seconds, cities and model years drawn with a
+# Zipf-like skew the way real lookups cluster on the big cities. Reports
+# QPS and p50/p99 latency with the result cache on and off.
+#
+#   docker-compose run bench
+
+YEARS = list(range(1998, 2025))
+
+
+def generate_csv(path, rows, cities):
+    # Built and written by DuckDB itself; the header is skipped on load.
+    con = job.connect(":memory:")
+    con.execute(f"""
+        COPY (
+            SELECT
+                'VIN' || i AS vin,
+                'King' AS county,
+                'City ' || (floor(pow(random(), 3) * {cities}))::INTEGER AS city,
+                'WA' AS state,
+                lpad((98000 + i % 900)::VARCHAR, 5, '0') AS postal_code,
+                {YEARS[0]} + (i * 7) % {len(YEARS)} AS model_year,
+                ['TESLA', 'NISSAN', 'BMW', 'KIA', 'FORD'][1 + i % 5] AS make,
+                'MODEL ' || i % 13 AS model,
+                'Battery Electric Vehicle (BEV)' AS electric_vehicle_type,
+                'Eligible' AS cafv_eligibility,
+                i % 330 AS electric_range,
+                0 AS base_msrp,
+                i % 49 AS legislative_district,
+                i AS dol_vehicle_id,
+                'POINT (-122.3 47.6)' AS vehicle_location,
+                'PUGET SOUND ENERGY INC' AS electric_utility,
+                '53033' || lpad((i % 100000)::VARCHAR, 6, '0') AS census_tract_2020
+            FROM range({rows}) t(i)
+        ) TO {job.quote(path)} (HEADER true)
+    """)
+    con.close()
+
+
+def requests_for(rng, cities):
+    # Skewed towards low-numbered cities, as the data is.
+    while True:
+        city = f"City {min(int(rng.paretovariate(1.2)) - 1, cities - 1)}"
+        year = rng.choice(YEARS)
+        roll = rng.random()
+        if roll < 0.6:
+            yield "cars_in_city", (city,)
+        elif roll < 0.9:
+            yield "cars_in_model_year", (year,)
+        else:
+            yield "cars_in_city_and_model_year", (city, year)
+
+
+def load_test(service, threads, seconds, cities):
+    latencies = [[] for _ in range(threads)]
+    deadline = time.perf_counter() + seconds
+
+    def client(n):
+        rng = random.Random(n)
+        for name, params in requests_for(rng, cities):
+            start = time.perf_counter()
+            service.query(name, *params)
+            end = time.perf_counter()
+            latencies[n].append(end - start)
+            if end >= deadline:
+                return
+
+    workers = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    samples = sorted(latency for thread in latencies for latency in thread)
+    return len(samples) / elapsed, samples
+
+
+def percentile(samples, p):
+    return samples[min(int(len(samples) * p / 100), len(samples) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise-8 query service load test.")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--cities", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--cache-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, db_path = Path(tmp) / "cars.csv", Path(tmp) / "cars.duckdb"
+        print(f"Generating {args.rows} cars...")
+        generate_csv(csv_path, args.rows, args.cities)
+        con = job.connect(db_path)
+        job.create_tables(con)
+        job.load_csv(con, csv_path)
+        con.close()
+
+        print(f"{args.threads} threads, {args.seconds:.0f}s per run, {os.cpu_count()} CPUs")
+        for cache_size in (args.cache_size, 0):
+            service = QueryService(db_path, cache_size=cache_size)
+            try:
+                qps, samples = load_test(service, args.threads, args.seconds, args.cities)
+            finally:
+                service.close()
+
+            requests = service.stats["hits"] + service.stats["misses"]
+            hit_rate = f"{service.stats['hits'] / requests:6.1%}" if requests else "   off"
+            print(
+                f"cache {'on ' if cache_size else 'off'}: {qps:9.0f} QPS  "
+                f"p50 {percentile(samples, 50) * 1000:7.2f} ms  p99 {percentile(samples, 99) * 1000:7.2f} ms  "
+                f"mean {statistics.fmean(samples) * 1000:7.2f} ms  hit rate {hit_rate}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,224 @@
+import argparse
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
 import duckdb
 
+logging.basicConfig(
+    format="{asctime} | {levelname} | {message}",
+    style="{",
+    datefmt="%Y-%m-%d %H:%M",
+    level=logging.INFO
+)
+
+BASE_DIR = Path(__file__).resolve().parent
+CSV_PATH = BASE_DIR / "data" / "electric-cars.csv"
+DB_PATH = BASE_DIR / "electric_cars.duckdb"
+RESULTS_DIR = BASE_DIR / "results"
+
+TABLE = "electric_cars"
+
+# In CSV column order. Postal codes and census tracts are identifiers with
+# meaningful leading zeros, so they stay text.
+COLUMNS = [
+    ("vin", "VARCHAR"),
+    ("county", "VARCHAR"),
+    ("city", "VARCHAR"),
+    ("state", "VARCHAR"),
+    ("postal_code", "VARCHAR"),
+    ("model_year", "SMALLINT"),
+    ("make", "VARCHAR"),
+    ("model", "VARCHAR"),
+    ("electric_vehicle_type", "VARCHAR"),
+    ("cafv_eligibility", "VARCHAR"),
+    ("electric_range", "SMALLINT"),
+    ("base_msrp", "INTEGER"),
+    ("legislative_district", "SMALLINT"),
+    ("dol_vehicle_id", "BIGINT"),
+    ("vehicle_location", "VARCHAR"),
+    ("electric_utility", "VARCHAR"),
+    ("census_tract_2020", "VARCHAR"),
+]
+
+QUERIES = {
+    "cars_per_city": f"""
+        SELECT city, count(*) AS cars
+        FROM {TABLE}
+        GROUP BY city
+        ORDER BY cars DESC, city
+    """,
+    "top_3_vehicles": f"""
+        SELECT make, model, count(*) AS cars
+        FROM {TABLE}
+        GROUP BY make, model
+        ORDER BY cars DESC, make, model
+        LIMIT 3
+    """,
+    # One pass: aggregate per (postal code, vehicle) and keep the top row
+    # per postal code with QUALIFY, no join back onto the counts.
+    "most_popular_vehicle_per_postal_code": f"""
+        SELECT postal_code, make, model, count(*) AS cars
+        FROM {TABLE}
+        GROUP BY postal_code, make, model
+        QUALIFY row_number() OVER (PARTITION BY postal_code ORDER BY cars DESC, make, model) = 1
+        ORDER BY postal_code
+    """,
+    "cars_by_model_year": f"""
+        SELECT model_year, count(*) AS cars
+        FROM {TABLE}
+        GROUP BY model_year
+        ORDER BY model_year
+    """,
+}
+
+
+def quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def connect(db_path=DB_PATH):
+    return duckdb.connect(str(db_path))
+
+
+def create_tables(con):
+    columns = ",\n    ".join(f"{name} {type_}" for name, type_ in COLUMNS)
+    con.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} (\n    {columns}\n)")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_log (
+            path VARCHAR PRIMARY KEY,
+            size BIGINT NOT NULL,
+            mtime_ns BIGINT NOT NULL,
+            rows BIGINT NOT NULL,
+            loaded_at TIMESTAMP NOT NULL DEFAULT current_timestamp
+        )
+    """)
+
+
+def is_loaded(con, csv_path):
+    stat = os.stat(csv_path)
+    row = con.execute(
+        "SELECT size, mtime_ns FROM ingest_log WHERE path = ?", [str(csv_path)]
+    ).fetchone()
+    return row == (stat.st_size, stat.st_mtime_ns)
+
+
+def load_csv(con, csv_path=CSV_PATH, force=False):
+    # The database file persists between runs; skip the load when this exact
+    # file (same size and mtime) is what the table holds. Every load replaces
+    # the table, so ingest_log only keeps the latest one.
+    if not force and is_loaded(con, csv_path):
+        logging.info(f"{csv_path} already loaded, skipping ingest.")
+        return 0
+
+    # read_csv with the DDL's names and types, so DuckDB's parallel reader
+    # parses straight into the table types without sniffing.
+    columns = "{" + ", ".join(f"{quote(name)}: {quote(type_)}" for name, type_ in COLUMNS) + "}"
+    stat = os.stat(csv_path)
+
+    con.execute("BEGIN TRANSACTION")
+    try:
+        con.execute(f"DELETE FROM {TABLE}")
+        con.execute(
+            f"INSERT INTO {TABLE} SELECT * FROM read_csv({quote(csv_path)}, header = true, columns = {columns})"
+        )
+        rows = con.execute(f"SELECT count(*) FROM {TABLE}").fetchone()[0]
+        con.execute("DELETE FROM ingest_log")
+        con.execute(
+            "INSERT INTO ingest_log (path, size, mtime_ns, rows) VALUES (?, ?, ?, ?)",
+            [str(csv_path), stat.st_size, stat.st_mtime_ns, rows],
+        )
+        con.execute("COMMIT")
+    except duckdb.Error:
+        con.execute("ROLLBACK")
+        raise
+
+    return rows
+
+
+@contextmanager
+def timed(stage, timings):
+    start = time.perf_counter()
+    yield
+    timings[stage] = time.perf_counter() - start
+    logging.info(f"{stage}: {timings[stage] * 1000:.1f} ms")
+
+
+def run_query(con, name):
+    return con.execute(QUERIES[name]).fetchall()
+
+
+def export_cars_by_model_year(con, out_dir=RESULTS_DIR):
+    # Each export is written whole to a temporary directory and swapped in,
+    # so a model year that has left the data takes its partition with it,
+    # and a failed export leaves the previous one in place.
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    export_dir = out_dir / "cars_by_model_year"
+    tmp_dir = out_dir / ".cars_by_model_year.tmp"
+    old_dir = out_dir / ".cars_by_model_year.old"
+    for path in (tmp_dir, old_dir):
+        shutil.rmtree(path, ignore_errors=True)
+
+    con.execute(f"""
+        COPY ({QUERIES["cars_by_model_year"]})
+        TO {quote(tmp_dir)}
+        (FORMAT PARQUET, PARTITION_BY (model_year))
+    """)
+    if export_dir.exists():
+        os.replace(export_dir, old_dir)
+    os.replace(tmp_dir, export_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def run(db_path=DB_PATH, csv_path=CSV_PATH, out_dir=RESULTS_DIR, force=False):
+    timings = {}
+    results = {}
+    con = connect(db_path)
+    try:
+        create_tables(con)
+
+        with timed("load", timings):
+            rows = load_csv(con, csv_path, force)
+        if rows:
+            logging.info(f"Loaded {rows} rows.")
+
+        for name in QUERIES:
+            with timed(name, timings):
+                results[name] = run_query(con, name)
+
+        with timed("export_cars_by_model_year", timings):
+            export_cars_by_model_year(con, out_dir)
+    finally:
+        con.close()
+
+    return results, timings
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Electric car analytics with DuckDB.")
+    parser.add_argument("--db", default=DB_PATH, type=Path, help="persistent DuckDB database file")
+    parser.add_argument("--csv", default=CSV_PATH, type=Path)
+    parser.add_argument("--out", default=RESULTS_DIR, type=Path)
+    parser.add_argument("--force-reload", action="store_true", help="re-ingest even if the CSV is unchanged")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        results, _ = run(args.db, args.csv, args.out, args.force_reload)
+    except duckdb.Error as e:
+        logging.error(f"DuckDB error: {e}")
+        raise
 
-def main():
-    pass
+    for name, rows in results.items():
+        print(f"\n{name}")
+        for row in rows[:10]:
+            print("  " + " | ".join(map(str, row)))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,170 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import duckdb
+
+import main
+
+# Concurrent read-only queries over the Exercise-8 database, with an LRU
+# cache of results in front.
+#
+# One read-only connection is shared; each thread gets its own cursor on
+# it, with every query PREPAREd once per cursor, so a request skips the
+# parse and plan and only executes. DuckDB releases the GIL while a query
+# runs, so threads overlap in the engine.
+#
+# Cached results are keyed by the load generation from ingest_log. A
+# writer cannot open the file while it is open read-only, even in this
+# process, so reload() drains the readers, reloads through main.load_csv,
+# reopens and drops the cache.
+
+TABLE = main.TABLE
+
+PREPARED = {
+    **main.QUERIES,
+    "cars_in_city": f"""
+        SELECT make, model, count(*) AS cars
+        FROM {TABLE}
+        WHERE city = $1
+        GROUP BY make, model
+        ORDER BY cars DESC, make, model
+    """,
+    "cars_in_model_year": f"""
+        SELECT city, count(*) AS cars
+        FROM {TABLE}
+        WHERE model_year = $1
+        GROUP BY city
+        ORDER BY cars DESC, city
+    """,
+    "cars_in_city_and_model_year": f"""
+        SELECT make, model, count(*) AS cars
+        FROM {TABLE}
+        WHERE city = $1 AND model_year = $2
+        GROUP BY make, model
+        ORDER BY cars DESC, make, model
+    """,
+}
+
+
+def load_generation(con):
+    # Changes whenever load_csv replaces the table; ingest_log holds one row.
+    return con.execute("SELECT path, size, mtime_ns, loaded_at FROM ingest_log").fetchone()
+
+
+class QueryService:
+    def __init__(self, db_path=main.DB_PATH, cache_size=1024):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "reloads": 0}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._active = 0
+        self._reloading = False
+        self._local = threading.local()
+        self._cursors = []
+        self._open()
+
+    def _open(self):
+        self.con = duckdb.connect(str(self.db_path), read_only=True)
+        self.generation = load_generation(self.con)
+        self._cursors = []
+
+    def _close(self):
+        for cursor in self._cursors:
+            cursor.close()
+        self._cursors = []
+        self.con.close()
+
+    def _cursor(self):
+        # A cursor per thread and per connection: reload() replaces the
+        # connection, and the next query on each thread prepares afresh.
+        local = self._local
+        if getattr(local, "con", None) is not self.con:
+            cursor = self.con.cursor()
+            for name, sql in PREPARED.items():
+                cursor.execute(f"PREPARE {name} AS {sql}")
+            with self._lock:
+                self._cursors.append(cursor)
+            local.con, local.cursor = self.con, cursor
+        return local.cursor
+
+    def _execute(self, name, params):
+        # EXECUTE takes its arguments as literals, not bound parameters.
+        args = ", ".join(main.quote(param) for param in params)
+        statement = f"EXECUTE {name}({args})" if params else f"EXECUTE {name}"
+        return self._cursor().execute(statement).fetchall()
+
+    def _cache_get(self, key):
+        with self._lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return self.cache[key]
+            self.stats["misses"] += 1
+            return None
+
+    def _cache_put(self, key, rows):
+        with self._lock:
+            # A reload may have finished while this query ran.
+            if not self.cache_size or key[0] != self.generation:
+                return
+            self.cache[key] = rows
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def query(self, name, *params):
+        if name not in PREPARED:
+            raise KeyError(f"Unknown query {name}")
+
+        with self._lock:
+            while self._reloading:
+                self._idle.wait()
+            self._active += 1
+            key = (self.generation, name, params)
+
+        try:
+            rows = self._cache_get(key) if self.cache_size else None
+            if rows is None:
+                rows = self._execute(name, params)
+                self._cache_put(key, rows)
+            return rows
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._idle.notify_all()
+
+    def reload(self, csv_path=main.CSV_PATH, force=False):
+        with self._lock:
+            while self._reloading:
+                self._idle.wait()
+            self._reloading = True
+            while self._active:
+                self._idle.wait()
+
+        previous = self.generation
+        try:
+            self._close()
+            con = main.connect(self.db_path)
+            try:
+                main.create_tables(con)
+                rows = main.load_csv(con, csv_path, force)
+            finally:
+                con.close()
+        finally:
+            self._open()
+            with self._lock:
+                if self.generation != previous:
+                    self.cache.clear()
+                    self.stats["reloads"] += 1
+                    logging.info(f"Reloaded {TABLE}, result cache cleared.")
+                self._reloading = False
+                self._idle.notify_all()
+        return rows
+
+    def close(self):
+        with self._lock:
+            self._close()
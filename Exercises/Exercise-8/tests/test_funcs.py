@@ -0,0 +1,136 @@
+import os
+import sys
+
+import duckdb
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+
+HEADER = (
+    "VIN (1-10),County,City,State,Postal Code,Model Year,Make,Model,Electric Vehicle Type,"
+    "Clean Alternative Fuel Vehicle (CAFV) Eligibility,Electric Range,Base MSRP,Legislative District,"
+    "DOL Vehicle ID,Vehicle Location,Electric Utility,2020 Census Tract\n"
+)
+
+
+def car(vin, city, postal_code, year, make, model, vehicle_id, tract="53077000904", district="14"):
+    return (
+        f"{vin},King,{city},WA,{postal_code},{year},{make},{model},Battery Electric Vehicle (BEV),"
+        f"Clean Alternative Fuel Vehicle Eligible,322,0,{district},{vehicle_id},"
+        f"POINT (-120.56916 46.58514),PUGET SOUND ENERGY INC,{tract}\n"
+    )
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "electric-cars.csv"
+    path.write_text(
+        HEADER
+        + car("5YJ3E1EB4L", "Seattle", "98101", 2020, "TESLA", "MODEL 3", 1)
+        + car("5YJ3E1EB4M", "Seattle", "98101", 2021, "TESLA", "MODEL 3", 2)
+        + car("1N4AZ0CP0F", "Seattle", "98101", 2015, "NISSAN", "LEAF", 3)
+        + car("1N4AZ0CP1F", "Bothell", "98011", 2015, "NISSAN", "LEAF", 4, district="")
+        + car("5YJYGDEE1M", "Bothell", "98011", 2021, "TESLA", "MODEL Y", 5)
+        + car("5YJYGDEE2M", "Bothell", "98011", 2021, "TESLA", "MODEL Y", 6, tract="06073005102")
+        + car("WBY8P6C05L", "Kent", "", 2020, "BMW", "I3", 7)
+    )
+    return path
+
+
+@pytest.fixture
+def con(tmp_path):
+    con = main.connect(tmp_path / "cars.duckdb")
+    main.create_tables(con)
+    yield con
+    con.close()
+
+
+def test_load_csv_uses_ddl_types(con, csv_path):
+    assert main.load_csv(con, csv_path) == 7
+
+    types = dict(con.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = 'electric_cars'"
+    ).fetchall())
+    assert types["model_year"] == "SMALLINT"
+    assert types["postal_code"] == "VARCHAR"
+
+    tract = con.execute("SELECT census_tract_2020 FROM electric_cars WHERE dol_vehicle_id = 6").fetchone()[0]
+    assert tract == "06073005102"
+    assert con.execute("SELECT count(*) FROM electric_cars WHERE legislative_district IS NULL").fetchone()[0] == 1
+
+
+def test_load_csv_skips_unchanged_file(con, csv_path):
+    assert main.load_csv(con, csv_path) == 7
+    assert main.load_csv(con, csv_path) == 0
+    assert main.load_csv(con, csv_path, force=True) == 7
+    assert con.execute("SELECT count(*) FROM electric_cars").fetchone()[0] == 7
+
+
+def test_load_csv_reloads_changed_file(con, csv_path):
+    main.load_csv(con, csv_path)
+    with open(csv_path, "a") as f:
+        f.write(car("5YJ3E1EB5L", "Kent", "98030", 2022, "TESLA", "MODEL 3", 8))
+
+    assert main.load_csv(con, csv_path) == 8
+    assert con.execute("SELECT count(*) FROM electric_cars").fetchone()[0] == 8
+
+
+def test_load_csv_reloads_a_file_loaded_before_another(con, csv_path, tmp_path):
+    other_path = tmp_path / "other.csv"
+    other_path.write_text(HEADER + car("5YJ3E1EB5L", "Kent", "98030", 2022, "TESLA", "MODEL 3", 8))
+
+    assert main.load_csv(con, csv_path) == 7
+    assert main.load_csv(con, other_path) == 1
+    assert main.load_csv(con, csv_path) == 7
+    assert con.execute("SELECT count(*) FROM electric_cars").fetchone()[0] == 7
+    assert con.execute("SELECT count(*) FROM ingest_log").fetchone()[0] == 1
+
+def test_queries(con, csv_path):
+    main.load_csv(con, csv_path)
+
+    assert main.run_query(con, "cars_per_city") == [("Bothell", 3), ("Seattle", 3), ("Kent", 1)]
+    assert main.run_query(con, "top_3_vehicles") == [
+        ("NISSAN", "LEAF", 2), ("TESLA", "MODEL 3", 2), ("TESLA", "MODEL Y", 2),
+    ]
+    assert main.run_query(con, "most_popular_vehicle_per_postal_code") == [
+        ("98011", "TESLA", "MODEL Y", 2),
+        ("98101", "TESLA", "MODEL 3", 2),
+        (None, "BMW", "I3", 1),
+    ]
+
+
+def test_run_persists_and_exports_by_model_year(tmp_path, csv_path):
+    db_path = tmp_path / "cars.duckdb"
+    out_dir = tmp_path / "results"
+
+    _, timings = main.run(db_path, csv_path, out_dir)
+    assert set(timings) == {"load", "export_cars_by_model_year"} | set(main.QUERIES)
+
+    years = sorted(p.name for p in (out_dir / "cars_by_model_year").iterdir())
+    assert years == ["model_year=2015", "model_year=2020", "model_year=2021"]
+
+    results, _ = main.run(db_path, csv_path, out_dir)
+    assert results["cars_by_model_year"] == [(2015, 2), (2020, 2), (2021, 3)]
+
+    exported = duckdb.sql(
+        f"SELECT model_year, cars FROM read_parquet('{out_dir}/cars_by_model_year/*/*.parquet', "
+        "hive_partitioning = true) ORDER BY model_year"
+    ).fetchall()
+    assert exported == [(2015, 2), (2020, 2), (2021, 3)]
+
+
+def test_export_drops_model_years_no_longer_in_the_data(tmp_path, csv_path):
+    db_path = tmp_path / "cars.duckdb"
+    out_dir = tmp_path / "results"
+    main.run(db_path, csv_path, out_dir)
+
+    # Every 2015 car leaves the data.
+    lines = [line for line in csv_path.read_text().splitlines(keepends=True) if ",2015," not in line]
+    csv_path.write_text("".join(lines))
+    main.run(db_path, csv_path, out_dir)
+
+    years = sorted(p.name for p in (out_dir / "cars_by_model_year").iterdir())
+    assert years == ["model_year=2020", "model_year=2021"]
+    assert sorted(p.name for p in out_dir.iterdir()) == ["cars_by_model_year"]
@@ -0,0 +1,140 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from query_service import QueryService
+from tests.test_funcs import HEADER, car, csv_path  # noqa: F401
+
+
+@pytest.fixture
+def db_path(tmp_path, csv_path):  # noqa: F811
+    db_path = tmp_path / "cars.duckdb"
+    con = main.connect(db_path)
+    main.create_tables(con)
+    main.load_csv(con, csv_path)
+    con.close()
+    return db_path
+
+
+@pytest.fixture
+def service(db_path):
+    service = QueryService(db_path, cache_size=4)
+    yield service
+    service.close()
+
+
+def test_parameterized_queries(service):
+    assert service.query("cars_in_city", "Seattle") == [("TESLA", "MODEL 3", 2), ("NISSAN", "LEAF", 1)]
+    assert service.query("cars_in_model_year", 2021) == [("Bothell", 2), ("Seattle", 1)]
+    assert service.query("cars_in_city_and_model_year", "Bothell", 2015) == [("NISSAN", "LEAF", 1)]
+    assert service.query("cars_in_city", "O'Brien") == []
+    assert service.query("cars_per_city") == [("Bothell", 3), ("Seattle", 3), ("Kent", 1)]
+
+    with pytest.raises(KeyError):
+        service.query("drop_table")
+
+
+def test_results_are_cached(service):
+    first = service.query("cars_in_city", "Seattle")
+    assert service.query("cars_in_city", "Seattle") is first
+    assert service.stats["hits"] == 1
+    assert service.stats["misses"] == 1
+
+    for city in ["Kent", "Bothell", "Tacoma", "Spokane"]:
+        service.query("cars_in_city", city)
+    # The oldest entry is evicted once the cache is over its size.
+    assert service.stats["evictions"] == 1
+    assert ("cars_in_city", ("Seattle",)) not in {key[1:] for key in service.cache}
+
+
+def test_cache_off(db_path):
+    service = QueryService(db_path, cache_size=0)
+    try:
+        assert service.query("cars_in_city", "Kent") == service.query("cars_in_city", "Kent")
+        assert not service.cache
+        assert service.stats["hits"] == 0
+    finally:
+        service.close()
+
+
+def test_reload_invalidates_cache(service, csv_path):  # noqa: F811
+    assert service.query("cars_in_city", "Kent") == [("BMW", "I3", 1)]
+    assert service.reload(csv_path) == 0
+    assert service.stats["reloads"] == 0
+    assert service.query("cars_in_city", "Kent") == [("BMW", "I3", 1)]
+    assert service.stats["hits"] == 1
+
+    with open(csv_path, "a") as f:
+        f.write(car("5YJ3E1EB5L", "Kent", "98030", 2022, "TESLA", "MODEL 3", 8))
+    assert service.reload(csv_path) == 8
+    assert service.stats["reloads"] == 1
+    assert not service.cache
+    assert service.query("cars_in_city", "Kent") == [("BMW", "I3", 1), ("TESLA", "MODEL 3", 1)]
+
+
+def test_reload_back_to_an_earlier_file(service, csv_path, tmp_path):  # noqa: F811
+    other_path = tmp_path / "other.csv"
+    other_path.write_text(HEADER + car("5YJ3E1EB5L", "Tacoma", "98402", 2022, "TESLA", "MODEL 3", 8))
+
+    assert service.reload(other_path) == 1
+    assert service.query("cars_in_city", "Kent") == []
+    assert service.reload(csv_path) == 7
+    assert service.stats["reloads"] == 2
+    assert service.query("cars_in_city", "Kent") == [("BMW", "I3", 1)]
+
+def test_concurrent_queries(service):
+    expected = {city: service.query("cars_in_city", city) for city in ["Seattle", "Bothell", "Kent"]}
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(50):
+                for city, rows in expected.items():
+                    assert service.query("cars_in_city", city) == rows
+                    assert service.query("cars_in_model_year", 2020) == [("Kent", 1), ("Seattle", 1)]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # One cursor per thread that missed the cache, plus the main thread's.
+    assert 1 <= len(service._cursors) <= 9
+
+
+def test_reload_while_querying(db_path, csv_path):  # noqa: F811
+    service = QueryService(db_path, cache_size=0)
+    stop = threading.Event()
+    errors = []
+
+    def worker():
+        try:
+            while not stop.is_set():
+                assert len(service.query("cars_in_city", "Kent")) in (1, 2)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        with open(csv_path, "a") as f:
+            f.write(car("5YJ3E1EB5L", "Kent", "98030", 2022, "TESLA", "MODEL 3", 8))
+        assert service.reload(csv_path) == 8
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    assert len(service.query("cars_in_city", "Kent")) == 2
+    service.close()
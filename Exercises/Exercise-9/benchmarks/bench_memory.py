@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import polars as pl
+
+import main as job
+
+# Peak memory of the daily/weekly ride counts over a synthetic Divvy CSV
+# larger than RAM. Each engine runs in its own child process so its peak
+# is measured alone. Polars memory-maps the CSV, so peak RSS includes page
+# cache that the kernel can drop at will; peak anonymous memory (heap) is
+# what has to stay flat however big the file is. The in-memory engine is
+# only tried on files that fit.
+#
+#   docker-compose run bench
+#   python3 benchmarks/bench_memory.py --size-gb 24
+
+BASE = 1672531200  # 2023-01-01 00:00:00 UTC
+CHUNK_ROWS = 1_000_000
+
+
+def total_memory():
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+def chunk(offset, rows):
+    ids = pl.int_range(offset, offset + rows)
+    started = pl.from_epoch(BASE + (ids * 7919) % (365 * 86400), time_unit="s")
+    return pl.select(
+        ids.hash(0).cast(pl.String).alias("ride_id"),
+        pl.when(ids % 2 == 0).then(pl.lit("electric_bike")).otherwise(pl.lit("classic_bike")).alias("rideable_type"),
+        started.dt.strftime("%Y-%m-%d %H:%M:%S").alias("started_at"),
+        (started + pl.duration(seconds=60 + ids % 3600)).dt.strftime("%Y-%m-%d %H:%M:%S").alias("ended_at"),
+        (pl.lit("Station ") + (ids % 600).cast(pl.String)).alias("start_station_name"),
+        (ids % 600).cast(pl.String).alias("start_station_id"),
+        (pl.lit("Station ") + (ids % 601).cast(pl.String)).alias("end_station_name"),
+        (ids % 601).cast(pl.String).alias("end_station_id"),
+        (41.6 + (ids % 500) / 1000).alias("start_lat"),
+        (-87.9 + (ids % 400) / 1000).alias("start_lng"),
+        (41.6 + (ids % 499) / 1000).alias("end_lat"),
+        (-87.9 + (ids % 399) / 1000).alias("end_lng"),
+        pl.when(ids % 3 == 0).then(pl.lit("casual")).otherwise(pl.lit("member")).alias("member_casual"),
+    )
+
+
+def generate_csv(path, size):
+    with open(path, "wb") as f:
+        offset = 0
+        while f.tell() < size:
+            chunk(offset, CHUNK_ROWS).write_csv(f, include_header=offset == 0)
+            offset += CHUNK_ROWS
+    return offset
+
+
+def anon_rss():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def child(path, engine):
+    peak = [0]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.05):
+            peak[0] = max(peak[0], anon_rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    start = time.perf_counter()
+    results = job.run(path, engine)
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+
+    print(json.dumps({
+        "seconds": elapsed,
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "peak_anon": max(peak[0], anon_rss()),
+        "rides": results["rides_per_day"]["rides"].sum(),
+    }))
+
+
+def measure(path, engine):
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", engine, "--input", path],
+        check=True, stdout=subprocess.PIPE, universal_newlines=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise-9 streaming memory benchmark.")
+    parser.add_argument("--input", help="existing Divvy CSV (default: generate one)")
+    parser.add_argument("--size-gb", type=float, help="size of the generated CSV (default: 3x RAM)")
+    parser.add_argument("--child", choices=["streaming", "in-memory"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.input, args.child)
+        return
+
+    ram = total_memory()
+    with tempfile.TemporaryDirectory(dir=os.getcwd()) as tmp:
+        path = args.input
+        if path is None:
+            size = int(args.size_gb * 2 ** 30) if args.size_gb else 3 * ram
+            path = os.path.join(tmp, "trips.csv")
+            print(f"Generating a {size / 2 ** 30:.1f} GiB CSV (RAM: {ram / 2 ** 30:.1f} GiB)...")
+            rows = generate_csv(path, size)
+            print(f"Wrote {rows} rows.")
+
+        file_size = os.path.getsize(path)
+        engines = ["streaming"] + (["in-memory"] if file_size < ram // 4 else [])
+        for engine in engines:
+            result = measure(path, engine)
+            print(
+                f"{engine:>10}: {result['seconds']:7.1f}s  peak RSS {result['peak_rss'] / 2 ** 20:7.0f} MiB  "
+                f"peak heap {result['peak_anon'] / 2 ** 20:6.0f} MiB "
+                f"({result['peak_anon'] / file_size:.1%} of the {file_size / 2 ** 30:.1f} GiB file, "
+                f"{result['rides']} rides)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import polars as pl
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+
+HEADER = (
+    '"ride_id","rideable_type","started_at","ended_at","start_station_name","start_station_id",'
+    '"end_station_name","end_station_id","start_lat","start_lng","end_lat","end_lng","member_casual"\n'
+)
+
+# 2023-06-01 is a Thursday. No rides at all on 06-04 or 06-09.
+RIDES = {
+    date(2023, 6, 1): 3,
+    date(2023, 6, 2): 1,
+    date(2023, 6, 3): 2,
+    date(2023, 6, 5): 4,
+    date(2023, 6, 6): 1,
+    date(2023, 6, 7): 1,
+    date(2023, 6, 8): 5,
+    date(2023, 6, 10): 1,
+}
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    lines = [HEADER]
+    for day, n in RIDES.items():
+        for i in range(n):
+            start = datetime.combine(day, datetime.min.time()) + timedelta(hours=8, minutes=i)
+            end = start + timedelta(minutes=12)
+            lines.append(
+                f'"{day:%m%d}{i:012d}","electric_bike","{start:%Y-%m-%d %H:%M:%S}","{end:%Y-%m-%d %H:%M:%S}",'
+                f',,,,41.91,-87.69,41.91,-87.7,"member"\n'
+            )
+    path = tmp_path / "trips.csv"
+    path.write_text("".join(lines))
+    return path
+
+
+def test_read_trips_types(csv_path):
+    schema = main.read_trips(csv_path).collect_schema()
+    assert schema["started_at"] == pl.Datetime("us")
+    assert schema["ended_at"] == pl.Datetime("us")
+    assert schema["start_lat"] == pl.Float64
+
+
+def test_only_started_at_is_read(csv_path):
+    plan = main.build_queries(main.read_trips(csv_path))["week_over_week"].explain()
+    assert "PROJECT 1/13 COLUMNS" in plan
+
+
+def test_rides_per_day_fills_calendar(csv_path):
+    daily = main.run(csv_path)["rides_per_day"]
+    assert daily["date"].to_list() == [date(2023, 6, 1) + timedelta(days=n) for n in range(10)]
+    assert daily.filter(pl.col("date") == date(2023, 6, 4))["rides"].item() == 0
+    assert daily["rides"].sum() == sum(RIDES.values())
+
+
+def test_week_over_week(csv_path):
+    wow = main.run(csv_path)["week_over_week"]
+    assert wow["rides_same_day_last_week"][:7].null_count() == 7
+
+    # Thursday 06-08 against Thursday 06-01, and Sunday 06-11 is past the end.
+    row = wow.filter(pl.col("date") == date(2023, 6, 8)).row(0, named=True)
+    assert (row["rides"], row["rides_same_day_last_week"], row["difference"]) == (5, 3, 2)
+    # Saturday 06-10 against Saturday 06-03, across the empty 06-09.
+    row = wow.filter(pl.col("date") == date(2023, 6, 10)).row(0, named=True)
+    assert (row["rides"], row["rides_same_day_last_week"], row["difference"]) == (1, 2, -1)
+
+
+def test_weekly_stats(csv_path):
+    weekly = main.run(csv_path, engine="in-memory")["weekly_stats"]
+    assert weekly.rows() == [
+        (date(2023, 5, 29), 6, 1.5, 3, 0),
+        (date(2023, 6, 5), 12, 2.0, 5, 0),
+    ]